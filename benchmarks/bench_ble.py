@@ -0,0 +1,71 @@
+'''
+Benchmark of BLE hand commands against a FakeBleakClient: one run_until_complete round trip per write
+(previous BLEDevice) vs persistent event loop with queued writes without response.
+
+Run from the repository root:
+    python -m benchmarks.bench_ble [n_gestures]
+'''
+import sys
+import time
+import asyncio
+import numpy as np
+
+from control.ble_client import BLEDevice
+from control.fake_ble import FakeBleakClient
+
+SERVICE = "6E400001-C352-11E5-953D-0002A5D5C51B"
+CHAR = "6E400002-C352-11E5-953D-0002A5D5C51B"
+FINGERS = 5
+
+
+def finger_packets(i):
+    # 5 finger commands per gesture, like ZeusControl.send_gesture
+    return [bytes([0x01, 0xA5, 0x5A, 0, 0, 0, 0, 0x05, finger]) + int(i % 100).to_bytes(4, "big")
+            for finger in range(FINGERS)]
+
+
+def legacy(n):
+    loop = asyncio.new_event_loop()
+    client = FakeBleakClient("fake")
+    loop.run_until_complete(client.connect())
+    calls = []
+    for i in range(n):
+        start = time.perf_counter()
+        for packet in finger_packets(i):
+            loop.run_until_complete(client.write_gatt_char(CHAR, bytearray(packet)))
+        calls.append(time.perf_counter() - start)
+        time.sleep(0.02)
+    loop.close()
+    return np.array(calls), client
+
+
+def persistent(n):
+    device = BLEDevice("fake", client_factory=FakeBleakClient)
+    device.add_characteristic(SERVICE, CHAR)
+    device.connect()
+    calls = []
+    for i in range(n):
+        start = time.perf_counter()
+        for packet in finger_packets(i):
+            device.write_nowait(SERVICE, CHAR, packet)
+        calls.append(time.perf_counter() - start)
+        time.sleep(0.02)
+    client = device.client
+    device.disconnect()
+    return np.array(calls), client
+
+
+def main(n=100):
+    print(f"{n} gestures of {FINGERS} finger writes, {FakeBleakClient('').connection_interval * 1e3} ms connection interval")
+    print(f"{'':12s} {'call p50':>9s} {'call p99':>9s} {'delivered p50':>14s} {'delivered p99':>14s}")
+    for name, run in [("round trips", legacy), ("persistent", persistent)]:
+        calls, client = run(n)
+        # Time from the first write call of a gesture to the delivery of its last finger command
+        written = client.written
+        delivered = np.array([written[i + FINGERS - 1][4] - written[i][3] for i in range(0, len(written), FINGERS)])
+        print(f"{name:12s} {np.percentile(calls, 50) * 1e3:7.2f}ms {np.percentile(calls, 99) * 1e3:7.2f}ms "
+              f"{np.percentile(delivered, 50) * 1e3:12.2f}ms {np.percentile(delivered, 99) * 1e3:12.2f}ms")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,86 @@
+'''
+Benchmark of the HDSensor frame decoding: legacy per packet `reorder` path vs vectorized `decode_frames`.
+
+Run from the repository root:
+    python -m benchmarks.bench_decoder
+'''
+import time
+import numpy as np
+
+from live_64_channel import reorder, decode_frames, FrameRingBuffer, FRAME_SIZE
+
+MASK = np.array([0, 2] + [0, 1] * 63)
+CHANNEL_MAP = [44, 49, 43, 55, 39, 59, 33, 2, 32, 3, 26, 6, 22, 13, 16, 10] + \
+              [42, 48, 45, 54, 38, 58, 35, 0, 34, 1, 27, 7, 23, 11, 17, 12] + \
+              [46, 52, 40, 51, 36, 56, 31, 60, 30, 63, 25, 4, 21, 8, 18, 15] + \
+              [47, 50, 41, 53, 37, 57, 29, 62, 28, 61, 24, 5, 19, 9, 20, 14]
+
+
+def make_frames(n_frames, seed=0):
+    '''
+    Generate a raw HDSensor byte stream with valid sync bits.
+    :param n_frames: (int) - number of 128 bytes frames
+    :return: (numpy array, bytes) - (N, 64) int16 samples and their wire encoding
+    '''
+    rng = np.random.default_rng(seed)
+    samples = rng.integers(-20000, 20000, size=(n_frames, 64)).astype(np.int16)
+    samples = (samples & ~1) | 1
+    samples[:, 0] &= ~1
+    return samples, samples.astype('>i2').tobytes()
+
+
+def legacy_decode(raw):
+    '''
+    Decoding path used by `HDSensor.live_read` before `decode_frames`.
+    '''
+    data = [[] for i in range(64)]
+    data_packet = reorder(np.frombuffer(raw, dtype=np.uint8), MASK, 63)
+    for packet in data_packet:
+        samples = [int.from_bytes(bytes([packet[i * 2], packet[i * 2 + 1]]), 'big', signed=True) for i in range(64)]
+        for i, d in enumerate(data):
+            d += [samples[i]]
+    return [data[i] for i in CHANNEL_MAP]
+
+
+def timeit(func, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    for n_frames in [10, 100, 1000, 10000]:
+        samples, raw = make_frames(n_frames)
+        legacy = np.array(legacy_decode(raw)).T
+        fast, dropped = decode_frames(raw, CHANNEL_MAP)
+        assert dropped == 0 and np.array_equal(legacy, fast), "Decoders disagree"
+
+        t_legacy = timeit(legacy_decode, raw)
+        t_fast = timeit(decode_frames, raw, CHANNEL_MAP)
+        print(f"{n_frames:>6} frames ({n_frames * FRAME_SIZE:>8} bytes): legacy {t_legacy * 1e3:9.3f} ms | "
+              f"vectorized {t_fast * 1e3:7.3f} ms | speedup x{t_legacy / t_fast:6.1f}")
+
+    # Corrupted stream: one bad sync bit every 50 frames
+    samples, raw = make_frames(10000)
+    corrupted = bytearray(raw)
+    for i in range(0, 10000, 50):
+        corrupted[i * FRAME_SIZE + 5] ^= 1
+    fast, dropped = decode_frames(bytes(corrupted), CHANNEL_MAP)
+    print(f"Corrupted stream: {len(fast)} frames decoded, {dropped} dropped (expected 200)")
+
+    # Same stream read in random sized chunks, as `live_read` gets it from `inWaiting()`
+    rng = np.random.default_rng(1)
+    chunks = np.cumsum(rng.integers(200, 3000, size=len(corrupted) // 200))
+    chunks = np.split(np.frombuffer(bytes(corrupted), dtype=np.uint8), chunks[chunks < len(corrupted)])
+    legacy_frames = 0
+    for chunk in chunks:
+        chunk = chunk[:len(chunk) - len(chunk) % FRAME_SIZE]
+        packets = reorder(chunk, MASK, 63)
+        legacy_frames += len(packets) if packets is not None else 0
+    ring = FrameRingBuffer()
+    ring_frames = sum(len(ring.feed(chunk, CHANNEL_MAP)) for chunk in chunks)
+    print(f"Chunked stream ({len(chunks)} reads): legacy kept {legacy_frames} frames, ring buffer kept {ring_frames} "
+          f"frames, counters {ring.stats()}")
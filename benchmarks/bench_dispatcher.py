@@ -0,0 +1,65 @@
+'''
+Benchmark of the Psyonic hand command path against a FakeSerialDevice: blocking write + ack + 100 ms sleep
+vs background CommandDispatcher with latest-wins coalescing.
+
+Run from the repository root:
+    python -m benchmarks.bench_dispatcher [rate_hz] [duration_s]
+'''
+import io
+import sys
+import time
+import contextlib
+import numpy as np
+
+from control.fake_serial import FakeSerialDevice
+from control.psyonic_control import PsyonicHandControl
+
+PROCESSING_TIME = 0.002
+
+
+def pose(i):
+    # Unique pose for every command so the device log can be matched to the submit times
+    return [i % 100, (i // 100) % 100, 10, 20, 30, 40]
+
+
+def run(dispatch, rate, duration):
+    # Without the dispatcher the hand waits for a line, the device answers with one (best case for the old path)
+    device = FakeSerialDevice(processing_time=PROCESSING_TIME, reply=True if dispatch else b"OK\n")
+    hand = PsyonicHandControl(serial_device=device, dispatch=dispatch)
+    submitted = {}
+    call_times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        hand.connect()
+        start = time.perf_counter()
+        i = 0
+        while time.perf_counter() - start < duration:
+            t = time.perf_counter()
+            packet = hand._create_packet(hand.CMD_FINGER_POS, pose(i))
+            submitted[bytes(packet[1:-1])] = t
+            hand._send_finger_positions(pose(i))
+            call_times.append(time.perf_counter() - t)
+            i += 1
+            time.sleep(max(0.0, start + i / rate - time.perf_counter()))
+        elapsed = time.perf_counter() - start
+        stats = hand.dispatcher.stats() if hand.dispatcher else None
+        hand.disconnect()
+    device.close()
+
+    # Age of each executed pose: from the controller call to the end of its execution by the device
+    ages = [done - submitted[command] for command, _, _, done in device.received if command in submitted]
+    return np.array(call_times) * 1e3, np.array(ages) * 1e3, len(device.received) / elapsed, i, device.dropped, stats
+
+
+def main(rate=100, duration=2.0):
+    print(f"controller sending a new pose at {rate} Hz for {duration} s, device takes {PROCESSING_TIME * 1e3} ms/command")
+    print(f"{'':10s} {'calls':>6s} {'call p50':>9s} {'call p99':>9s} {'executed/s':>11s} {'age p50':>8s} {'age p99':>8s} {'dropped':>8s}")
+    for name, dispatch in [("blocking", False), ("dispatch", True)]:
+        calls, ages, rate_out, n, dropped, stats = run(dispatch, rate, duration)
+        print(f"{name:10s} {n:6d} {np.percentile(calls, 50):7.2f}ms {np.percentile(calls, 99):7.2f}ms {rate_out:11.1f} "
+              f"{np.percentile(ages, 50):6.1f}ms {np.percentile(ages, 99):6.1f}ms {dropped:8d}")
+        if stats:
+            print(f"{'':10s} {stats}")
+
+
+if __name__ == "__main__":
+    main(*[float(a) for a in sys.argv[1:]])
@@ -0,0 +1,71 @@
+'''
+Calibration-to-ready time of the EmagerCNN: Lightning (EmagerCNN.fit, batches of 64, EarlyStopping on the training
+loss) vs the lean loop (EmagerCNN.fit_fast, resident tensors, large batches, fused AdamW, early stopping on a held-out
+split). Features of temporary synthetic sessions are computed once, the time is from the features in memory to a
+trained model in eval mode. Training on reps 0-2, test on reps 3-4 like libemg_train_cnn.
+
+Run from the repository root:
+    python -m benchmarks.bench_fast_training [n_sessions] [quantization]
+'''
+import io
+import os
+import sys
+import time
+import logging
+import tempfile
+import warnings
+import contextlib
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+import models.models as etm
+from benchmarks.bench_training_data import make_session, NUM_CLASSES, SAMPLING, WINDOW_SIZE, WINDOW_INCREMENT, FILTERS
+from utils.training_data import load_sessions
+
+EPOCH = 10
+
+
+def lightning(train, test, quantization):
+    model = etm.EmagerCNN((4, 16), NUM_CLASSES, quantization)
+    train_dl = DataLoader(TensorDataset(*train), batch_size=64, shuffle=True)
+    test_dl = DataLoader(TensorDataset(*test), batch_size=256)
+    res = model.fit(train_dl, test_dl, max_epochs=EPOCH, enable_progress_bar=False, enable_model_summary=False,
+                    enable_checkpointing=False, logger=False)
+    model.eval()
+    return res[0]["test_acc"]
+
+
+def fast(train, test, quantization):
+    model = etm.EmagerCNN((4, 16), NUM_CLASSES, quantization)
+    return model.fit_fast(train, test)[0]["test_acc"]
+
+
+def main(n_sessions=1, quantization=-1):
+    logging.getLogger("lightning.pytorch").setLevel(logging.ERROR)
+    warnings.filterwarnings("ignore")
+    with tempfile.TemporaryDirectory() as tmp:
+        folders = []
+        for s in range(int(n_sessions)):
+            folders.append(os.path.join(tmp, f"D{s}"))
+            make_session(folders[-1], seed=s)
+        features, meta = load_sessions(folders, WINDOW_SIZE, WINDOW_INCREMENT, SAMPLING, FILTERS,
+                                       cache_folder=os.path.join(tmp, ".cache"))
+        train_mask, test_mask = np.isin(meta["reps"], [0, 1, 2]), np.isin(meta["reps"], [3, 4])
+        train = (torch.from_numpy(features[train_mask].astype(np.float32)), torch.from_numpy(meta["classes"][train_mask]))
+        test = (torch.from_numpy(features[test_mask].astype(np.float32)), torch.from_numpy(meta["classes"][test_mask]))
+        print(f"{len(folders)} sessions, {len(train[0])} training windows, {len(test[0])} test windows, "
+              f"quantization {quantization}, {torch.get_num_threads()} threads")
+
+        times = {}
+        for name, train_fn in [("lightning", lightning), ("fit_fast", fast)]:
+            torch.manual_seed(0)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                acc = train_fn(train, test, int(quantization))
+            times[name] = time.perf_counter() - start
+            print(f"{name:10s} {times[name]:7.2f} s  x{times['lightning'] / times[name]:5.2f}  test accuracy {acc * 100:6.2f}%")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
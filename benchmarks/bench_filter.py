@@ -0,0 +1,91 @@
+'''
+Benchmark of the streaming filter stage against the per call filtering it replaces:
+- online data handler: libemg `Filter` (filtfilt over the whole buffer) vs `OnlineStreamFilter`
+- `HDSensor.live_read(decimate=True)`: per channel `scipy.signal.decimate` vs `StreamFilter`
+
+Run from the repository root:
+    python -m benchmarks.bench_filter
+'''
+import time
+import numpy as np
+from scipy import signal
+from libemg.filtering import Filter
+
+from utils.stream_filter import StreamFilter, OnlineStreamFilter
+
+SAMPLING = 1010
+BUFFER_SIZE = 2000
+WINDOW_INCREMENT = 10
+LIVE_READ_CHUNK = 33
+N_CALLS = 300
+
+FILTERS = [
+    {"name": "notch", "cutoff": 60, "bandwidth": 3},
+    {"name": "bandpass", "cutoff": [20, 450], "order": 4},
+]
+
+
+def per_call(times):
+    times = np.array(times)
+    return f"mean {times.mean() * 1e3:7.3f} ms | p99 {np.percentile(times, 99) * 1e3:7.3f} ms"
+
+
+def bench_online(stream):
+    legacy = Filter(SAMPLING)
+    online = OnlineStreamFilter(SAMPLING)
+    for f in FILTERS:
+        legacy.install_filters(f)
+        online.install_filters(f)
+
+    buffer = np.zeros((BUFFER_SIZE, 64))
+    t_legacy, t_online = [], []
+    for i in range(N_CALLS):
+        new = stream[i * WINDOW_INCREMENT:(i + 1) * WINDOW_INCREMENT]
+        buffer = np.vstack((new[::-1], buffer))[:BUFFER_SIZE]
+        start = time.perf_counter()
+        legacy.filter(buffer)
+        t_legacy.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        online.filter(buffer)
+        t_online.append(time.perf_counter() - start)
+    print(f"Online buffer ({BUFFER_SIZE}x64, +{WINDOW_INCREMENT} samples per call)")
+    print(f"  libemg Filter        : {per_call(t_legacy)}")
+    print(f"  OnlineStreamFilter   : {per_call(t_online)}")
+
+
+def bench_decimate(stream):
+    decimator = StreamFilter()
+    decimator.install_filters({"name": "decimate", "factor": 2})
+    chunks = [stream[i:i + LIVE_READ_CHUNK] for i in range(0, N_CALLS * LIVE_READ_CHUNK, LIVE_READ_CHUNK)]
+
+    t_legacy, t_stream = [], []
+    legacy_out, stream_out = [], []
+    for chunk in chunks:
+        start = time.perf_counter()
+        legacy_out.append(np.array([signal.decimate(chunk[:, c], 2) for c in range(64)]).T)
+        t_legacy.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        stream_out.append(decimator.filter(chunk))
+        t_stream.append(time.perf_counter() - start)
+
+    # Compare with decimating the whole recording at once: per call decimation drifts (odd chunks are rounded up)
+    # and restarts its filter on every chunk
+    decimator.reset()
+    reference = decimator.filter(np.concatenate(chunks))
+
+    def describe(out):
+        out = np.concatenate(out)
+        if out.shape != reference.shape:
+            return f"{len(out)} samples out, expected {len(reference)}"
+        return f"{len(out)} samples out, max abs error {np.abs(out - reference).max():.2e}"
+
+    print(f"live_read decimation ({LIVE_READ_CHUNK} samples per call)")
+    print(f"  per channel decimate : {per_call(t_legacy)} | {describe(legacy_out)}")
+    print(f"  StreamFilter         : {per_call(t_stream)} | {describe(stream_out)}")
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    stream = rng.normal(scale=1000, size=(N_CALLS * max(WINDOW_INCREMENT, LIVE_READ_CHUNK), 64))
+    bench_online(stream)
+    bench_decimate(stream)
@@ -0,0 +1,97 @@
+'''
+Recalibration of a deployed EmagerCNN on a new session (models/finetune.py) vs retraining, and the cost of hot
+swapping its weights in a running InferenceEngine (SharedWeights). The new session is the synthetic session with the
+cuff rotated by one electrode column and a random gain per electrode, like a cuff put back on the arm. Calibration uses the first seconds of each class of rep 0
+of the new session, the accuracies are on reps 1-4 of the new session.
+
+Run from the repository root:
+    python -m benchmarks.bench_finetune [seconds_per_class]
+'''
+import io
+import sys
+import time
+import copy
+import logging
+import tempfile
+import warnings
+import contextlib
+import numpy as np
+import torch
+
+import models.models as etm
+from models.finetune import finetune
+from models.inference import InferenceEngine, SharedWeights
+from benchmarks.bench_training_data import make_session, NUM_CLASSES, SAMPLING, WINDOW_SIZE, WINDOW_INCREMENT, FILTERS
+from utils.training_data import load_sessions
+
+SHIFT = 1 # Electrode columns the cuff is rotated by in the new session
+
+
+def accuracy(model, x, y):
+    return np.mean(model.predict(x) == y.numpy()) * 100
+
+
+def main(seconds=3.0):
+    logging.getLogger("lightning.pytorch").setLevel(logging.ERROR)
+    warnings.filterwarnings("ignore")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_session(f"{tmp}/D0")
+        features, meta = load_sessions([f"{tmp}/D0"], WINDOW_SIZE, WINDOW_INCREMENT, SAMPLING, FILTERS,
+                                       cache_folder=f"{tmp}/.cache")
+    x, y = etm.resident_tensors((features, meta["classes"]))
+    reps = meta["reps"]
+    gains = torch.from_numpy(np.random.default_rng(1).uniform(0.5, 1.5, x.shape[1]).astype(np.float32))
+    new_x = torch.roll(x.view(-1, 4, 16), SHIFT, dims=2).reshape(len(x), -1) * gains
+
+    # Calibration: first seconds of each class of rep 0, the windows of a segment are in time order
+    n_windows = int(seconds * SAMPLING / WINDOW_INCREMENT)
+    calibration = np.concatenate([np.flatnonzero((reps == 0) & (meta["classes"] == c))[:n_windows]
+                                  for c in range(NUM_CLASSES)])
+    test = np.flatnonzero(reps > 0)
+    cal_x, cal_y, test_x, test_y = new_x[calibration], y[calibration], new_x[test], y[test]
+
+    torch.manual_seed(0)
+    base = etm.EmagerCNN((4, 16), NUM_CLASSES, -1)
+    base.fit_fast((x[reps <= 2], y[reps <= 2]))
+    print(f"{len(calibration)} calibration windows ({seconds} s per class), {len(test)} test windows")
+    print(f"{'':28s} {'time':>8s} {'accuracy':>9s}")
+    print(f"{'deployed, same session':28s} {'':8s} {accuracy(base, x[test], y[test]):8.2f}%")
+    print(f"{'deployed, new session':28s} {'':8s} {accuracy(base, test_x, test_y):8.2f}%")
+
+    start = time.perf_counter()
+    tuned = finetune(copy.deepcopy(base), cal_x, cal_y)
+    elapsed = time.perf_counter() - start
+    print(f"{'fine-tuned':28s} {elapsed:7.2f}s {accuracy(tuned, test_x, test_y):8.2f}%")
+
+    for name, data in [("retrained, calibration", (cal_x, cal_y)),
+                       ("retrained, reps 0-2", (new_x[reps <= 2], y[reps <= 2]))]:
+        torch.manual_seed(0)
+        model = etm.EmagerCNN((4, 16), NUM_CLASSES, -1)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.fit_fast(data)
+        print(f"{name:28s} {time.perf_counter() - start:7.2f}s {accuracy(model, test_x, test_y):8.2f}%")
+
+    # Hot swap: one window per call, the weights published before every other call
+    weights = SharedWeights(base)
+    engine = InferenceEngine(base, weights=weights)
+    window = test_x[:1].numpy()
+    steady, swapped, publish = [], [], []
+    for i in range(200):
+        if i % 2:
+            start = time.perf_counter()
+            weights.publish(tuned if i % 4 == 1 else base)
+            publish.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        engine.predict_proba(window)
+        (swapped if i % 2 else steady).append(time.perf_counter() - start)
+    weights.publish(tuned)
+    same = np.allclose(engine.predict_proba(test_x[:256].numpy()), InferenceEngine(tuned).predict_proba(test_x[:256].numpy()),
+                       atol=1e-5)
+    print(f"\nInferenceEngine p50: {np.median(steady) * 1e3:.3f} ms, first call after a swap "
+          f"{np.median(swapped) * 1e3:.3f} ms, publish {np.median(publish) * 1e3:.3f} ms, "
+          f"swapped outputs match a new engine: {same}")
+
+
+if __name__ == "__main__":
+    main(*[float(a) for a in sys.argv[1:]])
@@ -0,0 +1,63 @@
+'''
+Benchmark of `send_gesture` for each hand: decoding and encoding the pose at every call vs the packets cache built
+by `cache_gestures` at connect time. The hands write to a null link so only the controller side is measured.
+
+Run from the repository root:
+    python -m benchmarks.bench_gesture_cache [n_calls]
+'''
+import sys
+import time
+import numpy as np
+
+from control.gesture_decoder import get_poses
+from control.psyonic_control import PsyonicHandControl
+from control.zeus_control import ZeusControl
+from control.smart_hand_control import SmartHandControl
+
+
+class NullDispatcher:
+    def submit(self, packet, key=None, trace=-1):
+        pass
+
+
+class NullBLE:
+    def write_batch_nowait(self, service_uuid, writes):
+        pass
+
+
+def make_hands():
+    psyonic = PsyonicHandControl()
+    psyonic.connected = True
+    psyonic.dispatcher = NullDispatcher()
+    zeus = ZeusControl()
+    zeus.device = NullBLE()
+    smart = SmartHandControl(mode="BLE")
+    smart.device = NullBLE()
+    return {"psyonic": psyonic, "zeus": zeus, "smart": smart}
+
+
+def run(hand, gestures, cached):
+    hand.gesture_cache = None
+    if cached:
+        hand.cache_gestures()
+    times = np.empty(len(gestures))
+    for i, gesture in enumerate(gestures):
+        t = time.perf_counter()
+        hand.send_gesture(gesture)
+        times[i] = time.perf_counter() - t
+    return times * 1e6
+
+
+def main(n_calls=20000):
+    poses, _, _ = get_poses()
+    gestures = np.random.default_rng(0).choice(list(poses), size=int(n_calls)).tolist()
+    print(f"{n_calls} send_gesture calls over {len(poses)} gestures")
+    print(f"{'':10s} {'':8s} {'p50':>8s} {'p99':>8s}")
+    for name, hand in make_hands().items():
+        for label, cached in [("encode", False), ("cached", True)]:
+            times = run(hand, gestures, cached)
+            print(f"{name:10s} {label:8s} {np.percentile(times, 50):6.1f}us {np.percentile(times, 99):6.1f}us")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,54 @@
+'''
+Benchmark of the per prediction gesture lookup: `get_label_from_index` / `get_index_from_label` (folder listing,
+JSON parse and linear scans) vs the prebuilt GestureCatalog maps. Uses a temporary media folder.
+
+Run from the repository root:
+    python -m benchmarks.bench_gesture_catalog [n_gestures]
+'''
+import os
+import sys
+import json
+import time
+import tempfile
+
+import utils.gestures_json as gjutils
+
+
+def make_media(folder, n_gestures):
+    gestures = {str(label): f"Gesture_{label:02d}" for label in range(1, n_gestures + 1)}
+    with open(os.path.join(folder, "gesture_list.json"), "w") as f:
+        json.dump(gestures, f)
+    for name in gestures.values():
+        open(os.path.join(folder, name + ".png"), "wb").close()
+
+
+def per_call(fn, args, repeats):
+    t = time.perf_counter()
+    for i in range(repeats):
+        fn(*args[i % len(args)])
+    return (time.perf_counter() - t) / repeats * 1e6
+
+
+def main(n_gestures=35):
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = tmp + "/"
+        make_media(folder, n_gestures)
+        images = gjutils.get_images_list(folder)
+        gestures_dict = gjutils.get_gestures_dict(folder)
+        catalog = gjutils.GestureCatalog(folder)
+        indexes = [(i,) for i in range(n_gestures)]
+        labels = [(i + 1,) for i in range(n_gestures)]
+
+        print(f"{n_gestures} gestures, time per lookup")
+        print(f"label_of  folder   {per_call(lambda i: gjutils.get_label_from_index(i, folder), indexes, 500):9.2f} us")
+        print(f"label_of  dict     {per_call(lambda i: gjutils.get_label_from_index(i, images, gestures_dict), indexes, 20000):9.2f} us")
+        print(f"label_of  catalog  {per_call(catalog.label_of, indexes, 200000):9.2f} us")
+        print(f"index_of  dict     {per_call(lambda l: gjutils.get_index_from_label(l, images, gestures_dict), labels, 20000):9.2f} us")
+        print(f"index_of  catalog  {per_call(catalog.index_of, labels, 200000):9.2f} us")
+        assert all(catalog.label_of(i) == gjutils.get_label_from_index(i, images, gestures_dict) for (i,) in indexes)
+        assert all(catalog.index_of(l) == gjutils.get_index_from_label(l, images, gestures_dict) for (l,) in labels)
+        assert catalog.images == images
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,66 @@
+'''
+Startup benchmark: import time of the modules loaded by the realtime control processes and the hand test, each in a
+fresh interpreter. Fails (exit code 1) when a module is over its time budget or imports a heavy library it does not
+need (torch, libemg, bleak...), so a new import-time side effect is caught before it slows every process start.
+
+Run from the repository root:
+    python -m benchmarks.bench_import [repeats]
+'''
+import os
+import sys
+import json
+import subprocess
+import numpy as np
+
+HEAVY = ("torch", "libemg", "bleak", "brevitas", "matplotlib", "PyQt5", "pygame")
+
+# module: (time budget in seconds, heavy libraries it is allowed to import)
+BUDGETS = {
+    "config": (0.02, ()),
+    "control.gesture_decoder": (0.05, ()),
+    "control.interface_control": (0.05, ()),
+    "control.psyonic_control": (0.3, ()),
+    "control.zeus_control": (0.3, ("bleak",)),
+    "control.smart_hand_control": (0.3, ("bleak",)),
+    "libemg_realtime_control": (0.3, ()),
+    "test_hand_control": (0.3, ()),
+}
+
+SNIPPET = '''
+import sys, time, json
+t = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t
+print(json.dumps([elapsed, sorted(m for m in {heavy!r} if m in sys.modules)]))
+'''
+
+
+def import_time(module):
+    '''
+    Import a module in a new interpreter.
+    :param module: (str) - module name
+    :return: (float, list) - import time in seconds and heavy libraries loaded by the import
+    '''
+    code = SNIPPET.format(module=module, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=os.getcwd())
+    elapsed, loaded = json.loads(out.stdout.strip().splitlines()[-1])
+    return elapsed, loaded
+
+
+def main(repeats=5):
+    failed = False
+    print(f"{'module':30s} {'median':>9s} {'budget':>9s}  heavy imports")
+    for module, (budget, allowed) in BUDGETS.items():
+        results = [import_time(module) for _ in range(int(repeats))]
+        median = float(np.median([elapsed for elapsed, _ in results]))
+        unexpected = sorted(set(results[0][1]) - set(allowed))
+        ok = median <= budget and not unexpected
+        failed |= not ok
+        print(f"{module:30s} {median * 1e3:7.1f}ms {budget * 1e3:7.1f}ms  {', '.join(results[0][1]) or '-'}"
+              f"{'' if ok else '  <-- FAIL'}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
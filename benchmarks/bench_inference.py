@@ -0,0 +1,71 @@
+'''
+Benchmark of EmagerCNN inference latency: eager model vs folded/compiled InferenceEngine.
+
+Run from the repository root:
+    python -m benchmarks.bench_inference [n_calls]
+'''
+import sys
+import time
+import warnings
+import numpy as np
+import torch
+
+import models.models as etm
+from models.inference import InferenceEngine
+
+NUM_CLASSES = 6
+BATCH_SIZES = [1, 32]
+
+
+def make_model():
+    torch.manual_seed(0)
+    model = etm.EmagerCNN((4, 16), NUM_CLASSES, -1)
+    # Non trivial BatchNorm statistics so folding is actually checked
+    for m in model.modules():
+        if isinstance(m, (torch.nn.BatchNorm1d, torch.nn.BatchNorm2d)):
+            m.running_mean.uniform_(-1, 1)
+            m.running_var.uniform_(0.5, 2)
+            m.weight.data.uniform_(0.5, 1.5)
+            m.bias.data.uniform_(-0.5, 0.5)
+    return model.eval()
+
+
+def latencies(predict_proba, batch_size, n_calls):
+    rng = np.random.default_rng(0)
+    inputs = [rng.normal(0, 100, (batch_size, 64)) for _ in range(16)]
+    for x in inputs:
+        predict_proba(x)
+    times = np.empty(n_calls)
+    for i in range(n_calls):
+        x = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        predict_proba(x)
+        times[i] = time.perf_counter() - start
+    # Per window latency
+    return times / batch_size
+
+
+def main(n_calls=2000):
+    warnings.simplefilter("ignore")
+    model = make_model()
+    engines = {"eager": model.predict_proba}
+    for backend in InferenceEngine.BACKENDS:
+        try:
+            engine = InferenceEngine(model, backend, max(BATCH_SIZES))
+        except Exception as e:
+            print(f"{backend}: unavailable ({type(e).__name__})")
+            continue
+        x = np.random.default_rng(1).normal(0, 100, (256, 64))
+        error = np.abs(engine.predict_proba(x) - model.predict_proba(x)).max()
+        print(f"{backend}: max probability error {error:.2e}")
+        engines[f"engine {backend}"] = engine.predict_proba
+
+    print(f"\n{'':22s} {'batch':>5s} {'p50 (us/window)':>16s} {'p99 (us/window)':>16s}")
+    for batch_size in BATCH_SIZES:
+        for name, predict_proba in engines.items():
+            t = latencies(predict_proba, batch_size, n_calls // batch_size) * 1e6
+            print(f"{name:22s} {batch_size:5d} {np.percentile(t, 50):16.1f} {np.percentile(t, 99):16.1f}")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,60 @@
+'''
+Benchmark of majority voting: scipy.stats.mode over the deque vs incremental counts and batch vote.
+
+Run from the repository root:
+    python -m benchmarks.bench_majority_vote [n_votes]
+'''
+import sys
+import time
+from collections import deque
+import numpy as np
+from scipy import stats
+
+from utils.majority_vote import MajorityVote, majority_vote
+
+NUM_CLASSES = 6
+
+
+def legacy_majority_vote(arr, n_votes):
+    ret = np.zeros((0,), dtype=np.uint8)
+    q = deque(maxlen=n_votes)
+    for i in arr:
+        q.append(i)
+        ret = np.append(ret, stats.mode(q).mode)
+    return ret
+
+
+def main(n_votes=50):
+    rng = np.random.default_rng(0)
+    # Runs of the same gesture with some noise, like classifier outputs
+    labels = np.repeat(rng.integers(0, NUM_CLASSES, 20000), rng.integers(1, 200, 20000))
+    noise = rng.random(len(labels)) < 0.2
+    labels[noise] = rng.integers(0, NUM_CLASSES, noise.sum())
+
+    n = 20000
+    start = time.perf_counter()
+    ref = legacy_majority_vote(labels[:n], n_votes)
+    t_legacy = time.perf_counter() - start
+
+    q = MajorityVote(n_votes)
+    votes = np.empty(n, dtype=labels.dtype)
+    start = time.perf_counter()
+    for i, label in enumerate(labels[:n]):
+        q.append(label)
+        votes[i] = q.vote()
+    t_incremental = time.perf_counter() - start
+    assert np.array_equal(votes, ref)
+
+    start = time.perf_counter()
+    batch = majority_vote(labels, n_votes)
+    t_batch = time.perf_counter() - start
+    assert np.array_equal(batch[:n], ref)
+
+    print(f"n_votes={n_votes}")
+    print(f"legacy (scipy mode + np.append) : {t_legacy / n * 1e6:8.2f} us/label ({n} labels)")
+    print(f"MajorityVote append + vote      : {t_incremental / n * 1e6:8.2f} us/label ({n} labels)")
+    print(f"majority_vote batch             : {t_batch / len(labels) * 1e6:8.3f} us/label ({len(labels)} labels)")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,86 @@
+'''
+Frame-time benchmark of `RealTimeOscilloscope`: legacy `np.roll` update vs circular display buffer.
+Each frame pulls 1 kHz / 30 Hz new samples, updates the 64 plots and repaints the window.
+
+Run from the repository root (add QT_QPA_PLATFORM=offscreen on a headless machine):
+    python -m benchmarks.bench_oscilloscope
+'''
+import time
+import numpy as np
+
+from live_64_channel import RealTimeOscilloscope, SampleRing
+
+NUM_SIGNALS = 64
+DATA_POINTS = 3000
+REFRESH_RATE = 30
+SAMPLING = 1000
+N_FRAMES = 150
+
+
+class SyntheticSensor(object):
+    '''
+    Stands in for `HDSensor` acquisition mode, samples are pushed by the benchmark before each frame
+    '''
+
+    def __init__(self):
+        self.ring = None
+        self.t = 0
+
+    def start_acquisition(self, capacity=10000):
+        self.ring = SampleRing(capacity)
+        return self.ring
+
+    def stop_acquisition(self):
+        pass
+
+    def check_acquisition(self):
+        pass
+
+    def push(self, n):
+        t = (self.t + np.arange(n)) / SAMPLING
+        self.t += n
+        data = 8000 * np.sin(2 * np.pi * 5 * t[:, None] + np.arange(NUM_SIGNALS) / 10)
+        self.ring.write(data.astype(np.int16))
+
+
+def legacy_update(osc, legacy_data):
+    '''
+    `RealTimeOscilloscope.update` before the circular display buffer.
+    '''
+    new_samples, osc.ring_cursor, _ = osc.sensor.ring.read_since(osc.ring_cursor)
+    new_data, nb_pts = new_samples.T, len(new_samples)
+    if nb_pts > 0:
+        for i in range(osc.num_signals):
+            legacy_data[i] = np.roll(legacy_data[i], -nb_pts)
+            legacy_data[i][-nb_pts:] = new_data[i]
+            osc.plots[i].setData(osc.t, legacy_data[i])
+
+
+def run_frames(osc, update):
+    times = []
+    for _ in range(N_FRAMES):
+        osc.sensor.push(SAMPLING // REFRESH_RATE)
+        start = time.perf_counter()
+        update()
+        osc.win.repaint()
+        osc.app.processEvents()
+        times.append(time.perf_counter() - start)
+    return np.array(times[10:])
+
+
+def report(name, times):
+    print(f"{name:>10}: mean {times.mean() * 1e3:6.2f} ms | p95 {np.percentile(times, 95) * 1e3:6.2f} ms | "
+          f"max {times.max() * 1e3:6.2f} ms | sustainable {1 / times.mean():6.1f} FPS")
+
+
+if __name__ == '__main__':
+    sensor = SyntheticSensor()
+    osc = RealTimeOscilloscope(NUM_SIGNALS, DATA_POINTS, REFRESH_RATE, sensor)
+    osc.timer.stop()
+    osc.win.resize(1280, 900)
+    osc.update()
+
+    legacy_data = [np.zeros(DATA_POINTS) for _ in range(NUM_SIGNALS)]
+    report("legacy", run_frames(osc, lambda: legacy_update(osc, legacy_data)))
+    report("circular", run_frames(osc, osc.update))
+    osc.win.close()
@@ -0,0 +1,196 @@
+'''
+Hardware-free benchmark of the acquisition and realtime pipeline, on simulated devices:
+    - sensor: FakeHDSensorSerial -> HDSensor acquisition thread, 1x to 10x realtime, with corrupted frames
+    - streamer: SyntheticStreamer -> OnlineDataHandler, 1x to 10x realtime
+    - end to end: SyntheticStreamer -> OnlineDataHandler + OnlineStreamFilter -> MAV -> InferenceEngine ->
+      PredictionSlot -> controller process -> Psyonic hand on a FakePsyonicHand
+Throughput is the rate samples are made available to the consumer, latency is measured from the time a sample is
+due at the source (as the board would send it) to the time it is read, or written to the hand. End to end, the
+latency is also measured from the sample time the prediction carries (BatchClock, as traced by the realtime predictor).
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline [duration_s]
+'''
+import io
+import sys
+import time
+import contextlib
+import multiprocessing
+import numpy as np
+
+from config import SAMPLING, WINDOW_SIZE, WINDOW_INCREMENT, NUM_CLASSES, NOTCH_FILTER, BANDPASS_FILTER
+from utils.synthetic_streamer import synthetic_emg, synthetic_streamer
+from utils.fake_hdsensor import FakeHDSensorSerial
+from utils.prediction_slot import PredictionSlot
+from utils.tracing import Tracer, BatchClock, STAGE_IDS, STAGE, END, TRACE
+from control.fake_serial import FakePsyonicHand
+from control.psyonic_control import PsyonicHandControl
+from benchmarks.bench_decoder import CHANNEL_MAP
+
+SPEEDS = (1, 2, 5, 10)
+POLL = 0.001
+
+
+def percentiles(values):
+    if len(values) == 0:
+        return "      -         -"
+    return f"{np.percentile(values, 50):7.2f}ms {np.percentile(values, 99):7.2f}ms"
+
+
+def sensor(source, speed, duration):
+    from live_64_channel import HDSensor
+
+    device = FakeHDSensorSerial(source, CHANNEL_MAP, SAMPLING, speed, corrupt_rate=1e-3)
+    with contextlib.redirect_stdout(io.StringIO()):
+        hd = HDSensor(None, 0, serial_device=device)
+    ring = hd.start_acquisition()
+    latencies = []
+    index = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        time.sleep(POLL)
+        if ring.write_index > index:
+            index = ring.write_index
+            # Frame index at the source: decoded + corrupted + flushed when the acquisition started
+            sent = index + hd.rx_buffer.frames_dropped + device.frames_flushed - 1
+            latencies.append((time.monotonic_ns() - device.frame_time(sent)) / 1e6)
+    elapsed = time.perf_counter() - start
+    hd.stop_acquisition()
+    stats, rx = device.stats(), hd.stats()
+    lost = stats["frames_overrun"] + rx["frames_dropped"]
+    print(f"{speed:5.0f}x {SAMPLING * speed:8.0f} {ring.write_index / elapsed:9.0f} {lost:6d} "
+          f"{lost / max(1, stats['frames_sent'] + stats['frames_overrun']) * 100:6.2f}% "
+          f"{stats['frames_corrupted']:9d} {percentiles(latencies)}")
+
+
+def streamer(speed, duration):
+    from libemg.data_handler import OnlineDataHandler
+
+    p, smi = synthetic_streamer(sampling_rate=SAMPLING, speed=speed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        odh = OnlineDataHandler(shared_memory_items=smi)
+    buffer = smi[0][1][0]
+    latencies = []
+    first = last = lost = None
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        time.sleep(POLL)
+        data, count = odh.get_data()
+        count = int(count["emg"][0, 0])
+        if first is None:
+            first = last = count
+            lost = 0
+            continue
+        if count > last:
+            lost += max(0, count - last - buffer)
+            latencies.append((time.monotonic_ns() - p.sample_time(count)) / 1e6)
+            last = count
+    elapsed = time.perf_counter() - start
+    status = p.status()
+    p.stop()
+    p.join()
+    odh.smm.cleanup(parent=False)
+    print(f"{speed:5.0f}x {SAMPLING * speed:8.0f} {(last - first) / elapsed:9.0f} {lost:6d} {status['late']:6d} "
+          f"{status['largest']:8d} {percentiles(latencies)}")
+
+
+def controller(slot, results):
+    device = FakePsyonicHand(processing_time=0.002)
+    hand = PsyonicHandControl(serial_device=device)
+    hand.tracer = tracer = Tracer("controller")
+    with contextlib.redirect_stdout(io.StringIO()):
+        hand.connect()
+        while True:
+            latest = slot.wait(0.5)
+            if latest is None:
+                if slot.closed:
+                    break
+                continue
+            tracer.current = latest.seq
+            hand.send_gesture((2, 3, 30, 14, 18)[latest.prediction % 5])
+        hand.disconnect()
+    device.close()
+    spans = tracer.spans()
+    writes = spans[spans[:, STAGE] == STAGE_IDS["write"]]
+    results.put(({int(t): int(e) for t, e in zip(writes[:, TRACE], writes[:, END])}, len(device.poses), device.invalid))
+
+
+def end_to_end(duration):
+    from libemg.data_handler import OnlineDataHandler
+    import models.models as etm
+    from models.inference import InferenceEngine
+    from utils.stream_filter import OnlineStreamFilter
+
+    clock = BatchClock()
+    engine = InferenceEngine(etm.EmagerCNN((4, 16), NUM_CLASSES, -1), clock=clock)
+    slot = PredictionSlot()
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=controller, args=(slot, results))
+    process.start()
+    p, smi = synthetic_streamer(sampling_rate=SAMPLING)
+    with contextlib.redirect_stdout(io.StringIO()):
+        odh = OnlineDataHandler(shared_memory_items=smi)
+    stream_filter = OnlineStreamFilter(SAMPLING, odh=odh, clock=clock)
+    stream_filter.install_filters(NOTCH_FILTER)
+    stream_filter.install_filters(BANDPASS_FILTER)
+    odh.install_filter(stream_filter)
+    time.sleep(0.5)
+
+    due, published, stamped = {}, {}, {}
+    last = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        count = int(odh.smm.get_variable("emg_count")[0, 0])
+        if count - last < WINDOW_INCREMENT:
+            time.sleep(POLL / 2)
+            continue
+        last = count
+        data, _ = odh.get_data(WINDOW_SIZE)
+        features = np.abs(data["emg"]).mean(axis=0, keepdims=True)
+        prediction = int(engine.predict(features)[0])
+        now = time.monotonic_ns()
+        stamp = clock.read()
+        seq = slot.publish(prediction, sample_time=stamp.sample)
+        published[seq] = now
+        due[seq] = p.sample_time(count)
+        stamped[seq] = stamp.sample
+    slot.close()
+    writes, poses, invalid = results.get()
+    process.join()
+    status = p.status()
+    p.stop()
+    p.join()
+    odh.smm.cleanup(parent=False)
+
+    predict = [(published[s] - due[s]) / 1e6 for s in published]
+    hand = [(writes[s] - published[s]) / 1e6 for s in writes if s in published]
+    total = [(writes[s] - due[s]) / 1e6 for s in writes if s in due]
+    traced = [(writes[s] - stamped[s]) / 1e6 for s in writes if s in stamped]
+    print(f"{len(published)} predictions, {len(writes)} written to the hand ({poses} decoded, {invalid} invalid), "
+          f"{status['late']} late streamer writes")
+    print(f"{'':20s} {'p50':>9s} {'p99':>9s}")
+    print(f"{'sample -> predict':20s} {percentiles(predict)}")
+    print(f"{'predict -> write':20s} {percentiles(hand)}")
+    print(f"{'sample -> write':20s} {percentiles(total)}")
+    print(f"{'stamped -> write':20s} {percentiles(traced)}")
+
+
+def main(duration=3.0):
+    source, _ = synthetic_emg(int(10 * SAMPLING), sampling_rate=SAMPLING)
+
+    print(f"HDSensor acquisition, {duration} s per speed")
+    print(f"{'speed':>6s} {'target':>8s} {'samples/s':>9s} {'lost':>6s} {'rate':>7s} {'corrupted':>9s} {'lat p50':>9s} {'lat p99':>9s}")
+    for speed in SPEEDS:
+        sensor(source, speed, duration)
+
+    print(f"\nSynthetic streamer -> OnlineDataHandler, {duration} s per speed")
+    print(f"{'speed':>6s} {'target':>8s} {'samples/s':>9s} {'lost':>6s} {'late':>6s} {'largest':>8s} {'lat p50':>9s} {'lat p99':>9s}")
+    for speed in SPEEDS:
+        streamer(speed, duration)
+
+    print(f"\nEnd to end at realtime, {duration} s")
+    end_to_end(duration)
+
+
+if __name__ == "__main__":
+    main(*[float(a) for a in sys.argv[1:]])
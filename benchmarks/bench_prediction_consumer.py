@@ -0,0 +1,69 @@
+'''
+Benchmark of the predictor label thread input: ClassifierController polled with a 10 ms sleep vs
+EventClassifierController sleeping on the classifier socket. A sender thread plays the OnlineEMGClassifier and sends
+a prediction datagram at irregular intervals, the latency is measured from the send to the consumer wake up.
+
+Run from the repository root:
+    python -m benchmarks.bench_prediction_consumer [rate_hz] [duration_s]
+'''
+import sys
+import time
+import socket
+import threading
+import numpy as np
+
+from libemg.environments.controllers import ClassifierController
+from utils.event_controller import EventClassifierController
+
+POLL_DELAY = 0.01
+
+
+def sender(port, rate, duration, sent, done):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rng = np.random.default_rng(0)
+    end = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < end:
+        time.sleep(rng.uniform(0.5, 1.5) / rate)
+        sent[i] = time.perf_counter()
+        sock.sendto(f"{i}\n".encode(), ("127.0.0.1", port))
+        i += 1
+    done.set()
+
+
+def run(event, port, rate, duration):
+    if event:
+        ctrl = EventClassifierController('predictions', 1 << 30, timeout=0.05, port=port)
+    else:
+        ctrl = ClassifierController('predictions', 1 << 30, port=port)
+    sent, latencies = {}, []
+    done = threading.Event()
+    thread = threading.Thread(target=sender, args=(port, rate, duration, sent, done))
+    cpu = time.thread_time()
+    thread.start()
+    while not done.is_set():
+        predictions = ctrl.get_data(['predictions'])
+        if predictions is None:
+            if not event:
+                time.sleep(POLL_DELAY)
+            continue
+        latencies.append(time.perf_counter() - sent[int(predictions[0])])
+        if not event:
+            time.sleep(POLL_DELAY)
+    cpu = time.thread_time() - cpu
+    thread.join()
+    ctrl.sock.close()
+    return np.array(latencies) * 1e3, cpu / duration * 100, len(sent)
+
+
+def main(rate=50, duration=3.0):
+    print(f"classifier output at ~{rate} Hz for {duration} s")
+    print(f"{'':8s} {'received':>9s} {'lat p50':>9s} {'lat p99':>9s} {'cpu':>7s}")
+    for name, event, port in [("poll", False, 12350), ("event", True, 12351)]:
+        latencies, cpu, n = run(event, port, rate, duration)
+        print(f"{name:8s} {len(latencies):4d}/{n:<4d} {np.percentile(latencies, 50):7.2f}ms {np.percentile(latencies, 99):7.2f}ms "
+              f"{cpu:6.2f}%")
+
+
+if __name__ == "__main__":
+    main(*[float(a) for a in sys.argv[1:]])
@@ -0,0 +1,90 @@
+'''
+End-to-end latency between the predictor and controller processes: Pipe with poll + sleep (previous
+libemg_realtime_control.py loop) vs PredictionSlot.
+
+Run from the repository root:
+    python -m benchmarks.bench_prediction_slot [n_predictions] [period_ms]
+'''
+import sys
+import time
+import numpy as np
+from multiprocessing import Pipe, Process, Queue
+
+from utils.prediction_slot import PredictionSlot
+
+POLL_SLEEP_DELAY = 0.001
+
+
+def pipe_producer(conn, n, period):
+    for i in range(n):
+        time.sleep(period)
+        conn.send({"prediction": i % 5, "timestamp": time.perf_counter()})
+    conn.send("exit")
+
+
+def pipe_consumer(conn, results):
+    latencies = []
+    start = time.process_time()
+    while True:
+        data = None
+        while conn.poll():
+            data = conn.recv()
+        if data is None:
+            time.sleep(POLL_SLEEP_DELAY)
+            continue
+        if data == "exit":
+            break
+        latencies.append(time.perf_counter() - data["timestamp"])
+    results.put((latencies, time.process_time() - start))
+
+
+def slot_producer(slot, n, period):
+    for i in range(n):
+        time.sleep(period)
+        slot.publish(i % 5, timestamp=time.perf_counter())
+    slot.close()
+
+
+def slot_consumer(slot, results):
+    latencies = []
+    start = time.process_time()
+    while True:
+        prediction = slot.wait(0.5)
+        if prediction is None:
+            if slot.closed:
+                break
+            continue
+        latencies.append(time.perf_counter() - prediction.timestamp)
+    results.put((latencies, time.process_time() - start))
+
+
+def run(producer, consumer, producer_end, consumer_end, n, period):
+    results = Queue()
+    c = Process(target=consumer, args=(consumer_end, results))
+    p = Process(target=producer, args=(producer_end, n, period))
+    c.start()
+    time.sleep(0.2)
+    start = time.perf_counter()
+    p.start()
+    latencies, cpu = results.get()
+    elapsed = time.perf_counter() - start
+    p.join()
+    c.join()
+    return np.array(latencies) * 1e6, cpu / elapsed
+
+
+def main(n=2000, period_ms=2.0):
+    period = period_ms / 1000
+    parent_conn, child_conn = Pipe()
+    slot = PredictionSlot()
+    print(f"{n} predictions every {period_ms} ms")
+    print(f"{'':10s} {'received':>9s} {'p50 (us)':>9s} {'p99 (us)':>9s} {'consumer CPU':>13s}")
+    for name, args in [("pipe", (pipe_producer, pipe_consumer, parent_conn, child_conn)),
+                       ("slot", (slot_producer, slot_consumer, slot, slot))]:
+        latencies, cpu = run(*args, n, period)
+        print(f"{name:10s} {len(latencies):9d} {np.percentile(latencies, 50):9.1f} {np.percentile(latencies, 99):9.1f} "
+              f"{cpu * 100:12.1f}%")
+
+
+if __name__ == "__main__":
+    main(*[float(a) if i else int(a) for i, a in enumerate(sys.argv[1:])])
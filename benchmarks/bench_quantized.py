@@ -0,0 +1,90 @@
+'''
+Parity, throughput and memory of the NumPy integer EmagerCNN (models/quantized.py) against the float
+and Brevitas models, trained for a few steps on synthetic MAV features.
+
+Run from the repository root:
+    python -m benchmarks.bench_quantized [bits]
+'''
+import os
+import sys
+import time
+import tempfile
+import warnings
+import numpy as np
+import torch
+
+import models.models as etm
+from models.quantized import QuantizedEmagerCNN, export_quantized
+
+NUM_CLASSES = 6
+TRAIN_STEPS = 200
+
+
+def make_data(rng, centers, n):
+    labels = rng.integers(0, NUM_CLASSES, n)
+    features = centers[labels] * rng.uniform(0.6, 1.4, (n, 64))
+    return features.astype(np.float32), labels
+
+
+def train(model, rng, centers):
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-3)
+    model.train()
+    for _ in range(TRAIN_STEPS):
+        x, y = make_data(rng, centers, 64)
+        loss = model.loss(model(torch.from_numpy(x)), torch.from_numpy(y))
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+    return model.eval()
+
+
+def throughput(predict, x, batch_size, duration=1.0):
+    n = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        predict(x[:batch_size])
+        n += batch_size
+    return n / (time.perf_counter() - start)
+
+
+def main(bits=4):
+    warnings.simplefilter("ignore")
+    torch.manual_seed(0)
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(50, 500, (NUM_CLASSES, 64))
+
+    float_model = train(etm.EmagerCNN((4, 16), NUM_CLASSES, -1), rng, centers)
+    quant_model = train(etm.EmagerCNN((4, 16), NUM_CLASSES, bits), rng, centers)
+    int_model = QuantizedEmagerCNN(export_quantized(quant_model))
+
+    x, y = make_data(rng, centers, 5000)
+    models = {
+        "float": float_model.predict_proba,
+        f"brevitas {bits} bits": quant_model.predict_proba,
+        f"numpy int {bits} bits": int_model.predict_proba,
+    }
+    probas = {name: predict(x) for name, predict in models.items()}
+    reference = probas[f"brevitas {bits} bits"]
+
+    print(f"{'':20s} {'accuracy':>9s} {'agree w/ brevitas':>18s} {'max |dp|':>9s}")
+    for name, p in probas.items():
+        print(f"{name:20s} {(p.argmax(1) == y).mean():9.4f} {(p.argmax(1) == reference.argmax(1)).mean():18.4f} "
+              f"{np.abs(p - reference).max():9.2e}")
+
+    print(f"\n{'':20s} {'batch 1 (win/s)':>16s} {'batch 256 (win/s)':>18s}")
+    for name, predict in models.items():
+        print(f"{name:20s} {throughput(predict, x, 1):16.0f} {throughput(predict, x, 256):18.0f}")
+
+    float_bytes = sum(t.numel() * t.element_size() for t in float_model.state_dict().values())
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "model.npz")
+        int_model.save(path)
+        assert np.array_equal(QuantizedEmagerCNN.load(path).predict(x), int_model.predict(x))
+        file_bytes = os.path.getsize(path)
+    print(f"\nfloat state dict      : {float_bytes / 1024:8.1f} kB")
+    print(f"exported parameters   : {int_model.nbytes / 1024:8.1f} kB (file {file_bytes / 1024:.1f} kB)")
+    print(f"resident weights      : {int_model.resident_nbytes / 1024:8.1f} kB (int8, "
+          f"{'torch._int_mm' if int_model._torch_weights is not None else 'numpy'} int32 accumulation)")
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
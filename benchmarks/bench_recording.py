@@ -0,0 +1,76 @@
+'''
+Benchmark of training data loading: libemg CSV parsing vs memory-mapped binary recording.
+
+Run from the repository root:
+    python -m benchmarks.bench_recording [n_sessions]
+'''
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from libemg.data_handler import OfflineDataHandler, RegexFilter
+
+from utils.recording import Recording, csv_to_recording
+
+NUM_CLASSES = 5
+NUM_REPS = 5
+REP_TIME = 5
+SAMPLING = 1010
+
+
+def make_session(folder, seed=0):
+    rng = np.random.default_rng(seed)
+    for c in range(NUM_CLASSES):
+        for r in range(NUM_REPS):
+            data = rng.integers(-3000, 3000, size=(REP_TIME * SAMPLING, 64))
+            np.savetxt(os.path.join(folder, f"C_{c}_R_{r}_emg.csv"), data, delimiter=",", fmt="%d")
+
+
+def load_csv(folder):
+    regex_filters = [
+        RegexFilter(left_bound="C_", right_bound="_", values=[str(i) for i in range(NUM_CLASSES)], description="classes"),
+        RegexFilter(left_bound="R_", right_bound="_emg.csv", values=[str(i) for i in range(NUM_REPS)], description="reps"),
+    ]
+    odh = OfflineDataHandler()
+    odh.get_data(folder_location=folder, regex_filters=regex_filters)
+    return odh
+
+
+def checksum(odh):
+    return sum(float(np.asarray(d, dtype=np.float64).sum()) for d in odh.data)
+
+
+if __name__ == "__main__":
+    n_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    with tempfile.TemporaryDirectory() as tmp:
+        folders = []
+        for s in range(n_sessions):
+            folder = os.path.join(tmp, f"D{s}")
+            os.makedirs(folder)
+            make_session(folder, seed=s)
+            folders.append(folder)
+        csv_size = sum(os.path.getsize(os.path.join(f, x)) for f in folders for x in os.listdir(f))
+
+        start = time.perf_counter()
+        csv_odhs = [load_csv(f) for f in folders]
+        t_csv = time.perf_counter() - start
+
+        start = time.perf_counter()
+        paths = [csv_to_recording(f, sampling_rate=SAMPLING) for f in folders]
+        t_convert = time.perf_counter() - start
+        bin_size = sum(os.path.getsize(p) for p in paths)
+
+        start = time.perf_counter()
+        bin_odhs = [Recording(p).to_offline_data_handler() for p in paths]
+        t_open = time.perf_counter() - start
+        start = time.perf_counter()
+        bin_sum = sum(checksum(odh) for odh in bin_odhs)
+        t_read = time.perf_counter() - start
+
+        assert np.isclose(bin_sum, sum(checksum(odh) for odh in csv_odhs)), "Recordings differ from the CSV files"
+        print(f"{n_sessions} session(s), {NUM_CLASSES * NUM_REPS} files each, {REP_TIME} s per rep at {SAMPLING} Hz")
+        print(f"  CSV (libemg get_data)  : {t_csv:8.3f} s | {csv_size / 1e6:8.1f} MB")
+        print(f"  CSV -> binary (once)   : {t_convert:8.3f} s")
+        print(f"  binary open (memmap)   : {t_open * 1e3:8.3f} ms | {bin_size / 1e6:8.1f} MB")
+        print(f"  binary full read       : {t_read * 1e3:8.3f} ms")
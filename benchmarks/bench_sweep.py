@@ -0,0 +1,42 @@
+'''
+Benchmark of the cross-validation sweep (models/sweep.py): the same leave-one-rep-out grid run with 1 and all
+worker processes, on temporary sessions of synthetic recordings. The features are cached by the first run and
+shared by the trials of both.
+
+Run from the repository root:
+    python -m benchmarks.bench_sweep [n_sessions] [epochs]
+'''
+import os
+import sys
+import time
+import tempfile
+
+from benchmarks.bench_training_data import make_session, NUM_CLASSES, SAMPLING, FILTERS
+from models.sweep import run_sweep, format_results
+
+WINDOW_SIZES = [100, 200]
+WINDOW_INCREMENTS = [20]
+QUANTIZATIONS = [-1, 4]
+MAJORITY_VOTES = [1, 10]
+
+
+def main(n_sessions=1, epochs=1):
+    workers = os.cpu_count()
+    with tempfile.TemporaryDirectory() as tmp:
+        folders = []
+        for s in range(int(n_sessions)):
+            folders.append(os.path.join(tmp, f"D{s}"))
+            make_session(folders[-1], seed=s)
+        cache = os.path.join(tmp, ".cache")
+        for n in sorted({1, workers}):
+            start = time.perf_counter()
+            rows = run_sweep(folders, WINDOW_SIZES, WINDOW_INCREMENTS, QUANTIZATIONS, MAJORITY_VOTES, NUM_CLASSES,
+                             SAMPLING, FILTERS, epochs=int(epochs), cache_folder=cache, workers=n)
+            elapsed = time.perf_counter() - start
+            trials = len(rows) // len(MAJORITY_VOTES) * rows[0]["folds"]
+            print(f"{n:2d} workers: {trials} trials in {elapsed:7.2f} s, {trials / elapsed:5.2f} trials/s")
+        print(format_results(rows))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,86 @@
+'''
+Benchmark of the tracing layer: cost of a span (enabled / disabled), then a two process pipeline like
+libemg_realtime_control (predictor thread -> PredictionSlot -> controller process -> Psyonic hand on a
+FakeSerialDevice) whose traces are merged and summarized.
+
+Run from the repository root:
+    python -m benchmarks.bench_tracing [rate_hz] [duration_s]
+'''
+import io
+import os
+import sys
+import time
+import tempfile
+import contextlib
+import multiprocessing
+
+from utils.tracing import Tracer, get_tracer, load_events, summarize, print_summary, merge
+from utils.prediction_slot import PredictionSlot
+from control.fake_serial import FakeSerialDevice
+from control.psyonic_control import PsyonicHandControl
+
+
+def overhead(n=200000):
+    for name, tracer in [("enabled", Tracer("bench")), ("disabled", Tracer("bench", enabled=False))]:
+        t = time.perf_counter()
+        for i in range(n):
+            with tracer.span("labels", i):
+                pass
+        span = (time.perf_counter() - t) / n * 1e6
+        t = time.perf_counter()
+        for i in range(n):
+            tracer.record("labels", 0, 1, i)
+        record = (time.perf_counter() - t) / n * 1e6
+        print(f"{name:9s} span {span:5.2f} us   record {record:5.2f} us")
+
+
+def controller(slot, folder):
+    tracer = get_tracer("controller")
+    device = FakeSerialDevice(processing_time=0.002)
+    hand = PsyonicHandControl(serial_device=device)
+    with contextlib.redirect_stdout(io.StringIO()):
+        hand.connect()
+        while True:
+            latest = slot.wait(0.5)
+            if latest is None:
+                if slot.closed:
+                    break
+                continue
+            start = time.monotonic_ns()
+            tracer.current = latest.seq
+            hand.send_gesture(2 if latest.prediction % 2 else 3)
+            tracer.record("controller", start, time.monotonic_ns(), latest.seq)
+        hand.disconnect()
+    device.close()
+    tracer.save(folder)
+
+
+def main(rate=100, duration=2.0):
+    overhead()
+
+    folder = tempfile.mkdtemp(prefix="traces-")
+    slot = PredictionSlot()
+    process = multiprocessing.Process(target=controller, args=(slot, folder))
+    process.start()
+    time.sleep(0.5)
+    tracer = get_tracer("predictor")
+    end = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < end:
+        start = time.monotonic_ns()
+        seq = slot.publish(i)
+        tracer.record("labels", start, time.monotonic_ns(), seq)
+        i += 1
+        time.sleep(1 / rate)
+    slot.close()
+    process.join()
+    tracer.save(folder)
+
+    paths = [os.path.join(folder, f) for f in os.listdir(folder)]
+    merge(paths, os.path.join(folder, "merged.json"))
+    print(f"\n{i} predictions at {rate} Hz, traces in {folder}")
+    print_summary(summarize(load_events(paths)))
+
+
+if __name__ == "__main__":
+    main(*[float(a) for a in sys.argv[1:]])
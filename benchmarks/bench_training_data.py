@@ -0,0 +1,84 @@
+'''
+Benchmark of the multi-session training data pipeline: serial per session loading (Recording -> StreamFilter ->
+parse_mav, the previous libemg_train_cnn path) vs `load_sessions` with 1 and all worker processes, then a cached
+call. Uses temporary sessions of synthetic recordings.
+
+Run from the repository root:
+    python -m benchmarks.bench_training_data [n_sessions] [workers]
+'''
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from libemg.data_handler import OfflineDataHandler  # imported here so its import time is not counted
+
+from utils.recording import RecordingWriter, Recording, RECORDING_NAME
+from utils.stream_filter import StreamFilter
+from utils.synthetic_streamer import synthetic_emg
+from utils.training_data import find_sessions, load_sessions
+from utils.windowing import parse_mav
+
+NUM_CLASSES = 5
+NUM_REPS = 5
+REP_TIME = 5
+SAMPLING = 1010
+WINDOW_SIZE = 200
+WINDOW_INCREMENT = 10
+FILTERS = [{"name": "notch", "cutoff": 60, "bandwidth": 3}, {"name": "bandpass", "cutoff": [20, 450], "order": 4}]
+
+
+def make_session(folder, seed=0):
+    os.makedirs(folder)
+    samples, _ = synthetic_emg(NUM_CLASSES * NUM_REPS * REP_TIME * SAMPLING, NUM_CLASSES, sampling_rate=SAMPLING,
+                               segment=REP_TIME, seed=seed)
+    with RecordingWriter(os.path.join(folder, RECORDING_NAME), SAMPLING) as writer:
+        for i, segment in enumerate(np.split(samples, NUM_CLASSES * NUM_REPS)):
+            writer.write(segment, class_index=i % NUM_CLASSES, rep_index=i // NUM_CLASSES)
+
+
+def serial(folders):
+    features, classes = [], []
+    for folder in folders:
+        odh = Recording(os.path.join(folder, RECORDING_NAME)).to_offline_data_handler()
+        fi = StreamFilter(SAMPLING)
+        for f in FILTERS:
+            fi.install_filters(f)
+        fi.filter(odh)
+        f, meta = parse_mav(odh, WINDOW_SIZE, WINDOW_INCREMENT)
+        features.append(f)
+        classes.append(meta["classes"])
+    return np.concatenate(features), {"classes": np.concatenate(classes)}
+
+
+def main(n_sessions=4, workers=None):
+    workers = os.cpu_count() if workers is None else int(workers)
+    with tempfile.TemporaryDirectory() as tmp:
+        for s in range(int(n_sessions)):
+            make_session(os.path.join(tmp, f"D{s}"), seed=s)
+        folders = find_sessions(tmp)
+        size = sum(os.path.getsize(os.path.join(f, RECORDING_NAME)) for f in folders)
+        print(f"{len(folders)} sessions, {size / 1e6:.0f} MB, {os.cpu_count()} cores")
+
+        start = time.perf_counter()
+        reference, reference_meta = serial(folders)
+        t_serial = time.perf_counter() - start
+        print(f"serial              {t_serial:7.2f} s")
+
+        for n in sorted({1, workers}):
+            start = time.perf_counter()
+            features, meta = load_sessions(folders, WINDOW_SIZE, WINDOW_INCREMENT, SAMPLING, FILTERS,
+                                           cache_folder=os.path.join(tmp, f".cache-{n}"), workers=n)
+            elapsed = time.perf_counter() - start
+            print(f"pool, {n:2d} workers    {elapsed:7.2f} s  x{t_serial / elapsed:5.2f}")
+            assert np.allclose(features, reference) and np.array_equal(meta["classes"], reference_meta["classes"])
+
+        start = time.perf_counter()
+        load_sessions(folders, WINDOW_SIZE, WINDOW_INCREMENT, SAMPLING, FILTERS,
+                      cache_folder=os.path.join(tmp, f".cache-{workers}"), workers=workers)
+        print(f"cached              {time.perf_counter() - start:7.2f} s")
+        print(f"features {features.shape}")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,70 @@
+'''
+Benchmark of the training inputs: features held in memory (load_sessions -> float32 TensorDataset, the
+libemg_train_cnn path) vs WindowDataset computing the windows on demand from the memory-mapped recordings.
+Each mode runs one epoch of shuffled batches in a new process. Peak memory is the anonymous memory of the training
+process (page cache of the memory maps excluded) above its baseline, sampled at every batch.
+
+Run from the repository root:
+    python -m benchmarks.bench_window_dataset [n_sessions] [window_increment]
+'''
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+import numpy as np
+
+from benchmarks.bench_training_data import make_session, SAMPLING, WINDOW_SIZE, FILTERS
+
+
+def anonymous_memory():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("RssAnon:")) / 1024
+
+
+def epoch(mode, folders, window_increment, workers, results):
+    import torch
+    from torch.utils.data import DataLoader, TensorDataset
+    from models.models import as_dataloader
+    from utils.training_data import load_sessions
+    from utils.window_dataset import WindowDataset
+
+    baseline = peak = anonymous_memory()
+    start = time.perf_counter()
+    if mode == "in memory":
+        features, meta = load_sessions(folders, WINDOW_SIZE, window_increment, SAMPLING, FILTERS,
+                                       cache_folder=os.path.join(os.path.dirname(folders[0]), ".cache"), workers=1)
+        loader = DataLoader(TensorDataset(torch.from_numpy(features.astype(np.float32)), torch.from_numpy(meta["classes"])),
+                            batch_size=64, shuffle=True)
+    else:
+        loader = as_dataloader(WindowDataset(folders, WINDOW_SIZE, window_increment, SAMPLING, FILTERS), 64, True, workers)
+    n = 0
+    for _, y in loader:
+        n += len(y)
+        peak = max(peak, anonymous_memory())
+    elapsed = time.perf_counter() - start
+    results.put((n, elapsed, peak - baseline))
+
+
+def main(n_sessions=4, window_increment=10):
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        folders = []
+        for s in range(int(n_sessions)):
+            folders.append(os.path.join(tmp, f"D{s}"))
+            make_session(folders[-1], seed=s)
+        size = sum(os.path.getsize(os.path.join(f, "recording.emgb")) for f in folders)
+        print(f"{len(folders)} sessions, {size / 1e6:.0f} MB of recordings, window increment {window_increment}")
+        print(f"{'':22s} {'windows':>8s} {'epoch':>8s} {'windows/s':>10s} {'peak memory':>12s}")
+        for mode, workers in [("in memory", 0), ("on demand", 0), ("on demand", 2)]:
+            results = ctx.Queue()
+            process = ctx.Process(target=epoch, args=(mode, folders, int(window_increment), workers, results))
+            process.start()
+            n, elapsed, memory = results.get()
+            process.join()
+            name = f"{mode}, {workers} workers"
+            print(f"{name:22s} {n:8d} {elapsed:7.2f}s {n / elapsed:10.0f} {memory:9.0f} MB")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,63 @@
+'''
+Benchmark of training feature extraction: libemg parse_windows + getMAVfeat vs cumulative-sum MAV and feature cache.
+
+Run from the repository root:
+    python -m benchmarks.bench_windowing
+'''
+import os
+import time
+import tempfile
+import numpy as np
+from libemg.feature_extractor import FeatureExtractor
+
+from benchmarks.bench_recording import make_session, load_csv
+from utils.recording import dataset_files
+from utils.windowing import FeatureCache, parse_mav
+
+WINDOW_SIZE = 200
+WINDOW_INCREMENT = 10
+
+
+def libemg_mav(odh):
+    windows, metadata = odh.parse_windows(WINDOW_SIZE, WINDOW_INCREMENT)
+    return FeatureExtractor().getMAVfeat(windows), metadata
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        make_session(folder)
+        odh = load_csv(folder)
+
+        start = time.perf_counter()
+        ref, ref_meta = libemg_mav(odh)
+        t_libemg = time.perf_counter() - start
+
+        start = time.perf_counter()
+        features, meta = parse_mav(odh, WINDOW_SIZE, WINDOW_INCREMENT)
+        t_mav = time.perf_counter() - start
+
+        assert np.allclose(ref, features)
+        for k in ref_meta:
+            assert np.array_equal(ref_meta[k].reshape(-1), meta[k])
+
+        cache = FeatureCache(os.path.join(folder, ".cache"))
+        start = time.perf_counter()
+        key = cache.key(dataset_files(folder), window_size=WINDOW_SIZE, window_increment=WINDOW_INCREMENT)
+        cache.get_or_compute(key, lambda: parse_mav(load_csv(folder), WINDOW_SIZE, WINDOW_INCREMENT))
+        t_miss = time.perf_counter() - start
+
+        start = time.perf_counter()
+        key = cache.key(dataset_files(folder), window_size=WINDOW_SIZE, window_increment=WINDOW_INCREMENT)
+        cached, cached_meta = cache.get_or_compute(key, lambda: None)
+        t_hit = time.perf_counter() - start
+        assert np.array_equal(cached, features)
+
+    print(f"{len(features)} windows of {features.shape[1]} channels")
+    print(f"libemg parse_windows + MAV : {t_libemg * 1e3:8.1f} ms")
+    print(f"cumulative sum MAV         : {t_mav * 1e3:8.1f} ms ({t_libemg / t_mav:.1f}x)")
+    print(f"cache miss (load + MAV)    : {t_miss * 1e3:8.1f} ms")
+    print(f"cache hit (hash + load)    : {t_hit * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,28 +11,55 @@ MAJORITY_VOTE=50
 WINDOW_SIZE = 200
 WINDOW_INCREMENT = 10
 EPOCH = 10
+STREAM_TRAINING = False # Compute the training windows on demand from the binary recordings instead of in memory
+LOADER_WORKERS = 0 # DataLoader worker processes of the streamed training windows
+FAST_TRAINING = False # Lean training loop on resident tensors (EmagerCNN.fit_fast) instead of Lightning
 SAMPLING = 1010
 FILTER = False
-VIRTUAL = False
+NOTCH_FILTER = { "name": "notch", "cutoff": 60, "bandwidth": 3}
+BANDPASS_FILTER = { "name":"bandpass", "cutoff": [20, 450], "order": 4}
+FINETUNE = False # Recalibrate the deployed model on a few seconds per class beside the live predictor (models/finetune.py)
+FINETUNE_SECONDS = 3 # Recording time of each class for the recalibration
+VIRTUAL = False # Synthetic EMG streamer and simulated Psyonic hand instead of the hardware
 PORT = None
 
 # Controller and predictor settings
 USE_GUI = True
-POLL_SLEEP_DELAY = 0.001  # Sleep time to prevent busy waiting when polling for data
-PREDICTOR_DELAY = 0.01 # Changes the frequency of predictions
 PREDICTOR_TIMEOUT_DELAY = 0.5 # Timeout for waiting for new predictions
 SMOOTH_WINDOW = 1 # Set to 1 to disable smoothing (always use latest value)
 SMOOTH_METHOD = 'mode' # 'mode' recommended for categorical gestures; 'mean' for numeric smoothing
+TRACING = True # Record the latency spans of the realtime pipeline (utils/tracing.py)
+TRACE_FOLDER = ".traces/" # Chrome traces saved at exit, summary: python -m utils.tracing
 
 BASE_PATH = "./Datasets/"
 SESSION = "D0"
+TRAIN_SESSIONS = [SESSION] # Sessions of BASE_PATH the model is trained on, None for all of them
 
-import utils.find_models as futils
 # MODEL_NAME = "libemg_torch_cnn_D0_974_25-10-20_15h03.pth"
-MODEL_NAME = futils.find_last_model(BASE_PATH, SESSION)
+MODEL_NAME = None # None to use the last trained model of the session
 
 MEDIA_PATH = "./media-test/"
-MODEL_PATH = f"{BASE_PATH}{SESSION}/{MODEL_NAME}"
 DATAFOLDER = f"{BASE_PATH}{SESSION}/"
 DATASETS_PATH = f"{BASE_PATH}{SESSION}/"
-SAVE_PATH = f"{BASE_PATH}{SESSION}/"
\ No newline at end of file
+SAVE_PATH = f"{BASE_PATH}{SESSION}/"
+CACHE_FOLDER = ".cache/"
+
+
+# Resolved on first use, importing the config must not touch the filesystem
+_model_name = None
+
+def get_model_name():
+    global _model_name
+    if _model_name is None:
+        import utils.find_models as futils
+        _model_name = MODEL_NAME if MODEL_NAME is not None else futils.find_last_model(BASE_PATH, SESSION)
+    return _model_name
+
+def get_model_path():
+    return f"{BASE_PATH}{SESSION}/{get_model_name()}"
+
+def __getattr__(name):
+    # config.MODEL_PATH still works, `from config import *` only gets the functions
+    if name == "MODEL_PATH":
+        return get_model_path()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
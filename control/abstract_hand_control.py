@@ -1,7 +1,11 @@
 from abc import ABC, abstractmethod
+from control.gesture_decoder import get_poses, decode_gesture
 
 
 class HandInterface(ABC):
+    # Encoded pose of every gesture (by id and name), filled by cache_gestures when connecting
+    gesture_cache = None
+
     @abstractmethod
     def connect(self):
         pass
@@ -11,9 +15,59 @@ class HandInterface(ABC):
         pass
 
     @abstractmethod
-    def send_gesture(self, gesture):
+    def send_finger_position(self, finger, position):
         pass
 
-    @abstractmethod
-    def send_finger_position(self, finger, position):
-        pass
\ No newline at end of file
+    def send_gesture(self, gesture):
+        """
+        Send the pose of a gesture, from the encoded packets cache when it was built.
+
+        Args:
+            gesture (int | str): gesture id or name
+        """
+        data = self.gesture_cache.get(gesture) if self.gesture_cache is not None else None
+        if data is None:
+            data = self.encode_pose(decode_gesture(gesture))
+        self.send_encoded(data)
+
+    def send_pose(self, positions):
+        """
+        Send the target of every finger at once.
+
+        Args:
+            positions (list): finger positions as returned by decode_gesture (0-1000),
+                thumb, index, middle, ring, little [, thumb rotation]
+        """
+        self.send_encoded(self.encode_pose(positions))
+
+    def encode_pose(self, positions):
+        """
+        Encode a pose into what send_encoded writes to the hand.
+
+        Hands whose protocol has a multi-finger command override this (and send_encoded) to build a single frame,
+        this fallback gives one finger command after the other.
+        """
+        return [(finger, position / 10) for finger, position in enumerate(positions[:5])]
+
+    def send_encoded(self, data):
+        """Write a pose encoded by encode_pose."""
+        for finger, position in data:
+            self.send_finger_position(finger, position)
+
+    def cache_gestures(self, gestures=None):
+        """
+        Encode the pose of every gesture once, send_gesture is then a lookup and a write.
+        Call it again if a setting used by encode_pose changes.
+
+        Args:
+            gestures (list): gesture ids to encode, every gesture of the poses table if None
+        """
+        poses, names, _ = get_poses()
+        names = {key: name for name, key in names.items()}
+        cache = {}
+        for gesture in poses if gestures is None else gestures:
+            data = self.encode_pose(decode_gesture(gesture))
+            cache[gesture] = data
+            if gesture in names:
+                cache[names[gesture]] = data
+        self.gesture_cache = cache
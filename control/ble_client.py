@@ -1,13 +1,40 @@
 import asyncio
+import threading
+from concurrent.futures import Future
 from bleak import BleakClient, BleakScanner
 
 
 class BLEDevice:
-    def __init__(self, address):
+    def __init__(self, address, client_factory=BleakClient, response=None, timeout=10.0):
+        '''
+        BLE device driven from one long-lived asyncio event loop running on a dedicated thread.
+        Every method can be called from any thread: the blocking ones wait for the result, the `*_async`
+        ones return a concurrent.futures.Future and `write_nowait` does not wait at all.
+
+        Writes go through a single queue consumed by a writer task, so they reach the device in the order they
+        were sent and every write queued while the previous ones were in progress is sent back to back
+        (several characteristic writes per connection event).
+
+        :param address: (str | bleak BLEDevice) - device address
+        :param client_factory: (callable) - address -> BleakClient like object, to use a mocked client
+        :param response: (bool | None) - write with response, None to use write without response when the
+                         characteristic allows it
+        :param timeout: (float) - timeout of the blocking calls in seconds
+        '''
         self.address = address
+        self.client_factory = client_factory
+        self.response = response
+        self.timeout = timeout
         self.client = None
         self.services = {}
         self.notify_callbacks = None
+        self.notify_args = None
+
+        self.loop = None
+        self.thread = None
+        self.write_queue = None
+        self.writer = None
+        self.write_response = {}
 
     def _add_service(self, service_uuid):
         self.services[service_uuid] = {}
@@ -17,42 +44,177 @@ class BLEDevice:
             self._add_service(service_uuid)
         self.services[service_uuid][char_uuid] = initial_value
 
+    ### EVENT LOOP ###
+
+    def _start_loop(self):
+        if self.loop is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.write_queue = asyncio.Queue()
+            self.writer = self.loop.create_task(self._write_loop())
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, daemon=True, name=f"BLEDevice-{self.address}")
+        self.thread.start()
+        ready.wait()
+
+    def _stop_loop(self):
+        if self.loop is None:
+            return
+
+        async def shutdown():
+            self.writer.cancel()
+            try:
+                await self.writer
+            except asyncio.CancelledError:
+                pass
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(self.timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.loop = None
+        self.thread = None
+
+    def submit(self, coroutine) -> Future:
+        '''
+        Run a coroutine on the device event loop.
+        :param coroutine: (coroutine) - e.g. self.client.read_gatt_char(uuid)
+        :return: (concurrent.futures.Future) - result of the coroutine
+        '''
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def _run(self, coroutine):
+        return self.submit(coroutine).result(self.timeout)
+
+    ### CONNECTION ###
+
     def connect(self):
-        self.client = BleakClient(self.address)
+        self._start_loop()
+        self.client = self.client_factory(self.address)
         print(f"Connecting to {self.address}")
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(self.client.connect())
+        self._run(self.client.connect())
 
     def disconnect(self):
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(self.client.disconnect())
-        print(f"Disconnected from {self.address}")
+        if self.client is not None:
+            self.flush()
+            self._run(self.client.disconnect())
+            print(f"Disconnected from {self.address}")
         self.client = None
+        self._stop_loop()
+
+    ### READ / WRITE ###
+
+    def read_async(self, service_uuid, char_uuid) -> Future:
+        async def read():
+            value = await self.client.read_gatt_char(char_uuid)
+            self.services[service_uuid][char_uuid] = value
+            return value
+        return self.submit(read())
 
     def read(self, service_uuid, char_uuid):
-        loop = asyncio.get_event_loop()
-        value = loop.run_until_complete(self.client.read_gatt_char(char_uuid))
-        self.services[service_uuid][char_uuid] = value
-        return value
+        return self.read_async(service_uuid, char_uuid).result(self.timeout)
+
+    def write_async(self, service_uuid, char_uuid, data) -> Future:
+        '''
+        Queue a write.
+        :return: (concurrent.futures.Future) - done when the write is completed
+        '''
+        return self.write_batch_async(service_uuid, [(char_uuid, data)])
+
+    def write_nowait(self, service_uuid, char_uuid, data):
+        '''
+        Queue a write and return immediately (fire and forget), errors are printed.
+        '''
+        self.write_async(service_uuid, char_uuid, data).add_done_callback(self._report_error)
 
     def write(self, service_uuid, char_uuid, data):
-        if isinstance(data, str):
-            data = data.encode()
-        self.services[service_uuid][char_uuid] = data
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(self.client.write_gatt_char(char_uuid, bytearray(data)))
+        self.write_async(service_uuid, char_uuid, data).result(self.timeout)
+
+    def write_batch_async(self, service_uuid, writes) -> Future:
+        '''
+        Queue several writes, sent back to back.
+        :param writes: (list) - (char_uuid, data) pairs
+        :return: (concurrent.futures.Future) - done when every write is completed
+        '''
+        packets = []
+        for char_uuid, data in writes:
+            if isinstance(data, str):
+                data = data.encode()
+            self.services[service_uuid][char_uuid] = data
+            packets.append((char_uuid, bytearray(data)))
+        future = Future()
+        self.loop.call_soon_threadsafe(self.write_queue.put_nowait, (packets, future))
+        return future
+
+    def write_batch(self, service_uuid, writes):
+        self.write_batch_async(service_uuid, writes).result(self.timeout)
+
+    def write_batch_nowait(self, service_uuid, writes):
+        '''
+        Queue several writes, sent back to back, and return immediately (fire and forget), errors are printed.
+        '''
+        self.write_batch_async(service_uuid, writes).add_done_callback(self._report_error)
+
+    def flush(self):
+        '''
+        Wait until every queued write is completed.
+        '''
+        self.write_batch_async(None, []).result(self.timeout)
+
+    def _use_response(self, char_uuid):
+        if self.response is not None:
+            return self.response
+        if char_uuid not in self.write_response:
+            char = None
+            try:
+                char = self.client.services.get_characteristic(char_uuid)
+            except Exception:
+                pass
+            properties = getattr(char, "properties", [])
+            # Without response the write is only queued by the controller and the next one can follow right away
+            self.write_response[char_uuid] = "write-without-response" not in properties
+        return self.write_response[char_uuid]
+
+    async def _write_loop(self):
+        while True:
+            batches = [await self.write_queue.get()]
+            # Everything queued in the meantime goes out in the same burst
+            while not self.write_queue.empty():
+                batches.append(self.write_queue.get_nowait())
+            for packets, future in batches:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    for char_uuid, data in packets:
+                        await self.client.write_gatt_char(char_uuid, data, response=self._use_response(char_uuid))
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(None)
+
+    @staticmethod
+    def _report_error(future):
+        if future.exception() is not None:
+            print(f"BLE write failed: {future.exception()}")
+
+    ### NOTIFICATIONS ###
 
     def start_notify(self, char_uuid):
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(self.client.start_notify(char_uuid, self._notification_handler))
+        self._run(self.client.start_notify(char_uuid, self._notification_handler))
 
     def stop_notify(self, char_uuid):
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(self.client.stop_notify(char_uuid))
+        self._run(self.client.stop_notify(char_uuid))
 
     def add_notification_callback(self, callback, args=None):
         '''
         Callback should be a function that takes 3 arguments: sender, data, args
+        It is called from the event loop thread.
         '''
         self.notify_callbacks = callback
         self.notify_args = args
@@ -61,19 +223,18 @@ class BLEDevice:
         if self.notify_callbacks:
             self.notify_callbacks(sender, data, self.notify_args)
 
-def scan_and_connect(device_name, retry = 1) -> BLEDevice:
+def scan_and_connect(device_name, retry = 1, client_factory=BleakClient) -> BLEDevice:
     target_device = None
     for i in range(retry):
         print(f"Scanning for {device_name}... Attempt {i+1}")
-        loop = asyncio.get_event_loop()
-        devices = loop.run_until_complete(BleakScanner.discover())
+        devices = asyncio.run(BleakScanner.discover())
         for device in devices:
             if device.name == device_name:
                 target_device = device
-                ble_device = BLEDevice(target_device)
+                ble_device = BLEDevice(target_device, client_factory=client_factory)
                 ble_device.connect()
                 return ble_device
-    
+
     if target_device is None:
         print(f"Device with name {device_name} not found.")
-        return None
\ No newline at end of file
+        return None
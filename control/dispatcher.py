@@ -0,0 +1,243 @@
+import time
+import threading
+from collections import OrderedDict, deque
+from itertools import count
+
+FRAME_CHAR = 0x7E
+
+
+class LineAcks:
+    """Ack parser for devices answering every command with a line."""
+
+    def __init__(self, end=b"\n"):
+        self.end = end
+        self.buffer = b""
+
+    def __call__(self, data: bytes) -> list[bytes]:
+        self.buffer += data
+        *replies, self.buffer = self.buffer.split(self.end)
+        return replies
+
+
+class PPPAcks:
+    """Ack parser for devices answering every command with a PPP frame (0x7E ... 0x7E)."""
+
+    def __init__(self):
+        self.frame = None
+
+    def __call__(self, data: bytes) -> list[bytes]:
+        replies = []
+        for byte in data:
+            if byte == FRAME_CHAR:
+                if self.frame:
+                    replies.append(bytes(self.frame))
+                self.frame = bytearray()
+            elif self.frame is not None:
+                self.frame.append(byte)
+        return replies
+
+
+class CommandDispatcher:
+    def __init__(self, serial, ack_parser=None, max_in_flight=1, ack_timeout=0.1, min_interval=0.0, history=1000,
+                 tracer=None):
+        """
+        Own a serial link in background threads so sending a command never blocks the caller.
+
+        - Commands submitted with the same key replace each other while they wait (latest wins): the device
+          always gets the newest target pose and never works through a backlog of outdated ones.
+        - Writes are paced by the link and the device instead of a fixed sleep: a command is written when the
+          previous one had the time to go through the wire (bytes * 10 / baudrate) and fewer than
+          `max_in_flight` commands are waiting for their ack.
+        - Acks are read by a separate thread, an ack that does not come within `ack_timeout` frees its slot.
+
+        Args:
+            serial: pyserial like object (write, read, in_waiting, baudrate)
+            ack_parser (callable): bytes -> list of replies (LineAcks, PPPAcks), None if the device does not ack
+            max_in_flight (int): number of commands that can wait for their ack
+            ack_timeout (float): time (s) after which an unacknowledged command is considered lost
+            min_interval (float): minimum time (s) between two writes
+            history (int): number of latencies kept for the statistics
+            tracer (utils.tracing.Tracer): records a "write" span per serial write, None to disable
+
+        Example:
+        >>> dispatcher = CommandDispatcher(serial_port, ack_parser=PPPAcks())
+        >>> dispatcher.start()
+        >>> dispatcher.submit(packet, key="pose")  # returns immediately
+        >>> dispatcher.stop()
+        """
+        self.serial = serial
+        self.ack_parser = ack_parser
+        self.max_in_flight = max_in_flight
+        self.ack_timeout = ack_timeout
+        self.min_interval = min_interval
+        self.tracer = tracer
+        baudrate = getattr(serial, "baudrate", None)
+        self.byte_time = 10 / baudrate if baudrate else 0.0
+
+        self.condition = threading.Condition()
+        self.pending = OrderedDict()
+        self.in_flight = deque()
+        self.next_write = 0.0
+        self.running = False
+        self.worker = None
+        self.reader = None
+        self.last_reply = None
+        self._ids = count()
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.written = 0
+        self.acked = 0
+        self.ack_timeouts = 0
+        self.write_errors = 0
+        self.queue_latency = deque(maxlen=history)
+        self.ack_latency = deque(maxlen=history)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.worker = threading.Thread(target=self._write_loop, daemon=True)
+        self.worker.start()
+        if self.ack_parser is not None:
+            self.reader = threading.Thread(target=self._read_loop, daemon=True)
+            self.reader.start()
+
+    def stop(self, flush_timeout=0.5):
+        """
+        Stop the threads, waiting at most `flush_timeout` for the pending commands to be written.
+        """
+        if not self.running:
+            return
+        self.flush(flush_timeout)
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.worker.join()
+        if self.reader is not None:
+            self.reader.join(timeout=max(getattr(self.serial, "timeout", None) or 0, 0.1) + 0.1)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def submit(self, packet, key=None, trace=-1):
+        """
+        Queue a command without blocking.
+
+        Args:
+            packet (bytes | bytearray | list[int]): raw bytes to write
+            key (hashable): commands with the same key are coalesced, None to never coalesce
+            trace (int): trace id of the write span
+        """
+        if key is None:
+            key = ("unique", next(self._ids))
+        with self.condition:
+            self.submitted += 1
+            if key in self.pending:
+                self.coalesced += 1
+                # Keep the original submit time, the latency is measured from the first command of the key
+                self.pending[key] = (bytes(packet), self.pending[key][1], trace)
+            else:
+                self.pending[key] = (bytes(packet), time.perf_counter(), trace)
+            self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Wait until every command is written and acknowledged (or timed out).
+
+        Returns:
+            bool: True if everything was sent before the timeout
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self.condition:
+            while self.pending or self.in_flight:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining if remaining is None else min(remaining, self.ack_timeout))
+                self._expire(time.perf_counter())
+        return True
+
+    def stats(self):
+        with self.condition:
+            return {
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "written": self.written,
+                "acked": self.acked,
+                "ack_timeouts": self.ack_timeouts,
+                "write_errors": self.write_errors,
+                "pending": len(self.pending),
+                "in_flight": len(self.in_flight),
+            }
+
+    def _expire(self, now):
+        while self.in_flight and now - self.in_flight[0] > self.ack_timeout:
+            self.in_flight.popleft()
+            self.ack_timeouts += 1
+
+    def _write_loop(self):
+        while True:
+            with self.condition:
+                while True:
+                    if not self.running:
+                        return
+                    now = time.perf_counter()
+                    wait = None
+                    if self.pending:
+                        wait = self.next_write - now
+                        if self.ack_parser is not None:
+                            self._expire(now)
+                            if len(self.in_flight) >= self.max_in_flight:
+                                wait = max(wait, self.in_flight[0] + self.ack_timeout - now)
+                        if wait <= 0:
+                            break
+                    self.condition.wait(wait)
+                _, (packet, submitted, trace) = self.pending.popitem(last=False)
+
+            try:
+                if self.tracer is not None:
+                    with self.tracer.span("write", trace):
+                        self.serial.write(packet)
+                else:
+                    self.serial.write(packet)
+            except Exception as e:
+                print(f"Error writing command: {e}")
+                with self.condition:
+                    self.write_errors += 1
+                continue
+
+            now = time.perf_counter()
+            with self.condition:
+                self.written += 1
+                self.queue_latency.append(now - submitted)
+                self.next_write = now + max(len(packet) * self.byte_time, self.min_interval)
+                if self.ack_parser is not None:
+                    self.in_flight.append(now)
+                self.condition.notify_all()
+
+    def _read_loop(self):
+        while self.running:
+            try:
+                data = self.serial.read(max(1, self.serial.in_waiting))
+            except Exception as e:
+                print(f"Error reading acks: {e}")
+                time.sleep(self.ack_timeout)
+                continue
+            if not data:
+                continue
+            replies = self.ack_parser(data)
+            if not replies:
+                continue
+            now = time.perf_counter()
+            with self.condition:
+                self.last_reply = replies[-1]
+                for _ in replies:
+                    if self.in_flight:
+                        self.ack_latency.append(now - self.in_flight.popleft())
+                        self.acked += 1
+                self.condition.notify_all()
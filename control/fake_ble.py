@@ -0,0 +1,101 @@
+import time
+import asyncio
+
+
+class FakeCharacteristic:
+    def __init__(self, uuid, properties):
+        self.uuid = uuid
+        self.properties = properties
+
+
+class FakeServices:
+    def __init__(self, properties):
+        self.properties = properties
+
+    def get_characteristic(self, uuid):
+        return FakeCharacteristic(uuid, self.properties)
+
+
+class FakeBleakClient:
+    def __init__(self, address, connection_interval=0.0075, packets_per_event=4,
+                 properties=("read", "write", "write-without-response", "notify")):
+        """
+        Mocked BleakClient to test BLE hands without hardware, use it as `BLEDevice(address, client_factory=FakeBleakClient)`.
+
+        Packets are exchanged at connection events, every `connection_interval`:
+        a write with response is sent at the next event and acknowledged at the one after,
+        writes without response are queued and up to `packets_per_event` of them go out at each event.
+
+        Args:
+            address (str): device address
+            connection_interval (float): time between two connection events (s)
+            packets_per_event (int): number of packets sent in one connection event
+            properties (tuple): properties of every characteristic
+        """
+        self.address = address
+        self.connection_interval = connection_interval
+        self.packets_per_event = packets_per_event
+        self.services = FakeServices(list(properties))
+        self.is_connected = False
+        self.start = 0.0
+        self.last_event = -1
+        self.sent_in_event = 0
+        self.values = {}
+        self.callbacks = {}
+        self.written = []  # (char_uuid, data, response, write call time, delivery time)
+
+    def _next_slot(self, now):
+        """Time of the next connection event with room for a packet."""
+        event = max(int((now - self.start) / self.connection_interval) + 1, self.last_event)
+        if event == self.last_event and self.sent_in_event >= self.packets_per_event:
+            event += 1
+        if event != self.last_event:
+            self.last_event = event
+            self.sent_in_event = 0
+        self.sent_in_event += 1
+        return self.start + event * self.connection_interval
+
+    async def _sleep_until(self, t):
+        await asyncio.sleep(max(0.0, t - time.perf_counter()))
+
+    async def connect(self):
+        await asyncio.sleep(self.connection_interval)
+        self.start = time.perf_counter()
+        self.is_connected = True
+        return True
+
+    async def disconnect(self):
+        self.is_connected = False
+        return True
+
+    async def write_gatt_char(self, char_uuid, data, response=None):
+        if not self.is_connected:
+            raise RuntimeError("Not connected")
+        if response is None:
+            response = "write" in self.services.properties
+        now = time.perf_counter()
+        delivery = self._next_slot(now)
+        self.values[char_uuid] = bytes(data)
+        self.written.append((char_uuid, bytes(data), response, now, delivery))
+        if response:
+            # Request at the next event, response at the one after
+            await self._sleep_until(delivery + self.connection_interval)
+        else:
+            await asyncio.sleep(0)
+
+    async def read_gatt_char(self, char_uuid):
+        if not self.is_connected:
+            raise RuntimeError("Not connected")
+        await self._sleep_until(self._next_slot(time.perf_counter()) + self.connection_interval)
+        return bytearray(self.values.get(char_uuid, b""))
+
+    async def start_notify(self, char_uuid, callback):
+        self.callbacks[char_uuid] = callback
+
+    async def stop_notify(self, char_uuid):
+        self.callbacks.pop(char_uuid, None)
+
+    def notify(self, char_uuid, data):
+        """Simulate a notification from the device (call from the event loop thread)."""
+        if char_uuid in self.callbacks:
+            self.callbacks[char_uuid](char_uuid, bytearray(data))
@@ -0,0 +1,213 @@
+import time
+import struct
+import threading
+from collections import deque
+
+FRAME_CHAR = 0x7E
+ESC_CHAR = 0x7D
+MASK_CHAR = 0x20
+
+
+class FakeSerialDevice:
+    def __init__(self, baudrate=460800, processing_time=0.002, framing="ppp", reply=True, buffer_size=4,
+                 timeout=1.5, port="fake"):
+        """
+        pyserial like device to test hand controllers without hardware.
+
+        Written bytes go through the wire at `baudrate`, the device then processes the received commands one
+        by one (`processing_time` each) and answers each of them if `reply` is True. Commands arriving while
+        `buffer_size` commands are already waiting are dropped, like a device with a small input buffer.
+
+        Args:
+            baudrate (int): simulated link speed
+            processing_time (float): time (s) the device takes to execute a command
+            framing (str): "ppp" for 0x7E delimited frames, "line" for newline terminated commands
+            reply (bool | bytes): answer every processed command, True for a PPP frame or b"OK\\n" depending on
+                the framing, or the answer bytes
+            buffer_size (int): number of received commands the device can hold
+            timeout (float): read timeout (s), like serial.Serial
+            port (str): port name
+
+        Example:
+        >>> device = FakeSerialDevice(processing_time=0.005)
+        >>> hand = PsyonicHandControl(serial_device=device)
+        """
+        self.baudrate = baudrate
+        self.processing_time = processing_time
+        self.framing = framing
+        self.reply = reply
+        self.buffer_size = buffer_size
+        self.timeout = timeout
+        self.port = port
+        self.is_open = False
+
+        self.condition = threading.Condition()
+        self.wire = deque()       # (write time, arrival time, command) on the wire
+        self.rx = deque()         # (write time, arrival time, command) received, waiting to be processed
+        self.tx = bytearray()     # answers waiting to be read
+        self.partial = bytearray()
+        self.line_free = 0.0
+        self.received = []        # (command, write time, arrival time, processed time)
+        self.dropped = 0
+        self.thread = None
+        self.open()
+
+    def open(self):
+        if self.is_open:
+            return
+        self.is_open = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        with self.condition:
+            self.is_open = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+
+    @property
+    def in_waiting(self):
+        with self.condition:
+            return len(self.tx)
+
+    def reset_input_buffer(self):
+        with self.condition:
+            self.tx.clear()
+
+    def write(self, data):
+        data = bytes(data)
+        now = time.perf_counter()
+        with self.condition:
+            # Bytes leave one after the other, 10 bits per byte (start + 8 data + stop)
+            self.line_free = max(self.line_free, now) + len(data) * 10 / self.baudrate
+            for command in self._split(data):
+                self.wire.append((now, self.line_free, command))
+            self.condition.notify_all()
+        return len(data)
+
+    def read(self, size=1):
+        return self._read(lambda tx: min(size, len(tx)) if tx else 0)
+
+    def read_until(self, expected=b"\n", size=None):
+        def available(tx):
+            end = tx.find(expected)
+            if end >= 0:
+                return end + len(expected)
+            return len(tx) if size is not None and len(tx) >= size else 0
+        return self._read(available)
+
+    def _read(self, available):
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        with self.condition:
+            while self.is_open:
+                n = available(self.tx)
+                if n:
+                    data = bytes(self.tx[:n])
+                    del self.tx[:n]
+                    return data
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+        return b""
+
+    def _split(self, data):
+        """Complete commands of the written bytes, according to the framing."""
+        commands = []
+        for byte in data:
+            if self.framing == "ppp" and byte == FRAME_CHAR:
+                if self.partial:
+                    commands.append(bytes(self.partial))
+                self.partial = bytearray()
+            elif self.framing == "line" and byte == ord("\n"):
+                commands.append(bytes(self.partial))
+                self.partial = bytearray()
+            else:
+                self.partial.append(byte)
+        return commands
+
+    def _run(self):
+        with self.condition:
+            while self.is_open:
+                now = time.perf_counter()
+                while self.wire and self.wire[0][1] <= now:
+                    if len(self.rx) >= self.buffer_size:
+                        self.wire.popleft()
+                        self.dropped += 1
+                    else:
+                        self.rx.append(self.wire.popleft())
+                if not self.rx:
+                    self.condition.wait(self.wire[0][1] - now if self.wire else None)
+                    continue
+
+                written, arrival, command = self.rx.popleft()
+                self.condition.release()
+                try:
+                    time.sleep(self.processing_time)
+                finally:
+                    self.condition.acquire()
+                self.received.append((command, written, arrival, time.perf_counter()))
+                self.tx += self.answer(command)
+                self.condition.notify_all()
+
+    def answer(self, command):
+        """Bytes sent back once a command is processed, called with the device lock held."""
+        if isinstance(self.reply, bytes):
+            return self.reply
+        if self.reply:
+            return bytes([FRAME_CHAR, 0x50, 0x00, 0xB0, FRAME_CHAR]) if self.framing == "ppp" else b"OK\n"
+        return b""
+
+
+class FakePsyonicHand(FakeSerialDevice):
+    CMD_FINGER_POS = 0x10
+    DEGREES_CONSTANT_INV = 150 / 32767
+
+    def __init__(self, address=0x50, **kwargs):
+        """
+        FakeSerialDevice that decodes the Psyonic PPP protocol: each frame is unstuffed and its checksum and address
+        are checked. Finger position commands update `positions` (degrees) and are kept in `poses`, invalid frames
+        are counted in `invalid` and not answered, like the hand does.
+
+        Args:
+            address (int): address of the hand
+            **kwargs: FakeSerialDevice arguments
+
+        Example:
+        >>> device = FakePsyonicHand()
+        >>> hand = PsyonicHandControl(serial_device=device)
+        >>> hand.connect(); hand.send_gesture("Hand_Close")
+        >>> device.positions
+        """
+        self.address = address
+        self.positions = None
+        self.poses = []           # (processed time, positions)
+        self.invalid = 0
+        super().__init__(framing="ppp", **kwargs)
+
+    def answer(self, command):
+        packet = unstuff(command)
+        if len(packet) < 3 or sum(packet) & 0xFF or packet[0] != self.address:
+            self.invalid += 1
+            return b""
+        if packet[1] == self.CMD_FINGER_POS:
+            if len(packet) != 15:
+                self.invalid += 1
+                return b""
+            self.positions = [v * self.DEGREES_CONSTANT_INV for v in struct.unpack("<6h", packet[2:14])]
+            self.poses.append((time.perf_counter(), self.positions))
+        return super().answer(command)
+
+
+def unstuff(frame):
+    """Payload of a PPP frame without its 0x7E delimiters: escaped bytes are unmasked."""
+    packet = bytearray()
+    escaped = False
+    for byte in frame:
+        if byte == ESC_CHAR:
+            escaped = True
+            continue
+        packet.append(byte ^ MASK_CHAR if escaped else byte)
+        escaped = False
+    return packet
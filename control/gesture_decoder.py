@@ -1,99 +1,77 @@
+import os
+import json
+import functools
 from control.constants import *
 import utils.gestures_json as gj
 from config import *
-from libemg.gui import GUI
 
 def log(message, mode=Logger.INFO):
     print(message)
 
-# FINGER POSITIONS PREDEFINED
-NUTRAL_FINGER_POS = 250
-OPEN_FIGER_POS = 0
-CLOSE_FIGER_POS = 1000
-HALF_OPEN_FIGER_POS = 500
-FRONT_ROTATION_POS = 0
-HALF_ROTATION_POS = 0
-SIDE_ROTATION_POS = 0
+# FINGER POSITIONS PER GESTURE (0-1000), thumb, index, middle, ring, little, thumb rotation
+POSES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gesture_poses.json")
 
-try:
-    gestures_dict = gj.get_gestures_dict(MEDIA_PATH)
-except FileNotFoundError:
-    GUI.download_gestures(MEDIA_PATH)
-    gestures_dict = gj.get_gestures_dict(MEDIA_PATH)
+@functools.cache
+def get_gestures_dict():
+    """Gestures dictionary of MEDIA_PATH {"<gesture id>": name}, loaded (and downloaded if missing) on first use."""
+    try:
+        return gj.get_gestures_dict(MEDIA_PATH)
+    except FileNotFoundError:
+        from libemg.gui import GUI
+        # download_gestures does not use the GUI instance
+        GUI.download_gestures(None, CLASSES, MEDIA_PATH)
+        return gj.get_gestures_dict(MEDIA_PATH)
 
-def decode_gesture(gesture):
-    if isinstance(gesture, int):
-        gestures_name = gestures_dict[str(gesture)]
-    if isinstance(gesture, str):
-        gestures_name = gesture
-        gesture = int(list(gestures_dict.keys())[list(gestures_dict.values()).index(gestures_name)])
-    print(f"Gesture: {gestures_name} ({gesture})")
-
-    thumb_finger_pos = NUTRAL_FINGER_POS
-    index_finger_pos = NUTRAL_FINGER_POS
-    middle_finger_pos = NUTRAL_FINGER_POS
-    ring_finger_pos = NUTRAL_FINGER_POS
-    little_finger_pos = NUTRAL_FINGER_POS
-    thumb_rotation_pos = SIDE_ROTATION_POS
-
-    if gesture == Gesture.NO_MOTION:
-        thumb_finger_pos = NUTRAL_FINGER_POS
-        index_finger_pos = NUTRAL_FINGER_POS
-        middle_finger_pos = NUTRAL_FINGER_POS
-        ring_finger_pos = NUTRAL_FINGER_POS
-        little_finger_pos = NUTRAL_FINGER_POS
-        thumb_rotation_pos = SIDE_ROTATION_POS
+def load_poses(path=POSES_PATH):
+    """
+    Load the gesture poses table.
 
-    elif gesture == Gesture.HAND_CLOSE:
-        thumb_finger_pos = HALF_OPEN_FIGER_POS
-        index_finger_pos = CLOSE_FIGER_POS
-        middle_finger_pos = CLOSE_FIGER_POS
-        ring_finger_pos = CLOSE_FIGER_POS
-        little_finger_pos = CLOSE_FIGER_POS
-        thumb_rotation_pos = FRONT_ROTATION_POS
+    Args:
+        path (str): JSON file {"default": pose, "poses": {"<gesture id>": {"name": str, "pose": pose}}}
 
-    elif gesture == Gesture.HAND_OPEN:
-        thumb_finger_pos = OPEN_FIGER_POS
-        index_finger_pos = OPEN_FIGER_POS
-        middle_finger_pos = OPEN_FIGER_POS
-        ring_finger_pos = OPEN_FIGER_POS
-        little_finger_pos = OPEN_FIGER_POS
-        thumb_rotation_pos = SIDE_ROTATION_POS
+    Returns:
+        tuple: ({gesture id: pose}, {gesture name: gesture id}, default pose), poses are tuples of 6 positions
+    """
+    with open(path, "r") as f:
+        table = json.load(f)
+    poses, names = {}, {}
+    for key, entry in table["poses"].items():
+        if len(entry["pose"]) != 6:
+            raise ValueError(f"Pose of gesture {key} must have 6 positions")
+        poses[int(key)] = tuple(entry["pose"])
+        names[entry["name"]] = int(key)
+    return poses, names, tuple(table["default"])
 
-    elif gesture == Gesture.OK:
-        thumb_finger_pos = HALF_OPEN_FIGER_POS
-        index_finger_pos = HALF_OPEN_FIGER_POS
-        middle_finger_pos = OPEN_FIGER_POS
-        ring_finger_pos = OPEN_FIGER_POS
-        little_finger_pos = OPEN_FIGER_POS
-        thumb_rotation_pos = FRONT_ROTATION_POS
+@functools.cache
+def get_poses():
+    """Poses table of POSES_PATH, loaded on first use (see load_poses)."""
+    return load_poses()
 
-    elif gesture == Gesture.INDEX_EXTENSION:
-        thumb_finger_pos = CLOSE_FIGER_POS
-        index_finger_pos = OPEN_FIGER_POS
-        middle_finger_pos = CLOSE_FIGER_POS
-        ring_finger_pos = CLOSE_FIGER_POS
-        little_finger_pos = CLOSE_FIGER_POS
-        thumb_rotation_pos = HALF_ROTATION_POS
-
-    elif gesture == Gesture.PEACE:
-        thumb_finger_pos = NUTRAL_FINGER_POS
-        index_finger_pos = OPEN_FIGER_POS
-        middle_finger_pos = OPEN_FIGER_POS
-        ring_finger_pos = CLOSE_FIGER_POS
-        little_finger_pos = CLOSE_FIGER_POS
-        thumb_rotation_pos = HALF_ROTATION_POS
+def gesture_id(gesture):
+    """Gesture id of a gesture id or name (pose table names first, then the media gestures)."""
+    if isinstance(gesture, str):
+        _, names, _ = get_poses()
+        if gesture in names:
+            return names[gesture]
+        for key, name in get_gestures_dict().items():
+            if name == gesture:
+                return int(key)
+        raise ValueError(f"Unknown gesture: {gesture}")
+    return int(gesture)
 
-    elif gesture == Gesture.THUMBS_UP:
-        thumb_finger_pos = OPEN_FIGER_POS
-        index_finger_pos = CLOSE_FIGER_POS
-        middle_finger_pos = CLOSE_FIGER_POS
-        ring_finger_pos = CLOSE_FIGER_POS
-        little_finger_pos = CLOSE_FIGER_POS
-        thumb_rotation_pos = SIDE_ROTATION_POS
+def decode_gesture(gesture):
+    """
+    Finger positions of a gesture.
 
-    else:
-        log("Unknown gesture", mode=Logger.WARNING)
-        pass
+    Args:
+        gesture (int | str): gesture id or name
 
-    return thumb_finger_pos, index_finger_pos, middle_finger_pos, ring_finger_pos, little_finger_pos, thumb_rotation_pos
+    Returns:
+        tuple: thumb, index, middle, ring, little, thumb rotation positions (0-1000)
+    """
+    poses, _, default = get_poses()
+    pose = poses.get(gesture_id(gesture))
+    if pose is None:
+        log(f"Unknown gesture: {gesture}", mode=Logger.WARNING)
+        return default
+    return pose
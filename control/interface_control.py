@@ -1,7 +1,3 @@
-from control.zeus_control import ZeusControl
-from control.smart_hand_control import SmartHandControl
-from control.psyonic_control import PsyonicHandControl
-
 class InterfaceControl:
     def __init__(self, hand_type, **kwargs):
         """
@@ -19,11 +15,15 @@ class InterfaceControl:
 
     def initialize_hand(self):
         """Initialize the appropriate hand controller based on the hand type."""
+        # Only the driver of the selected hand is imported (bleak is not needed for a serial hand)
         if self.hand_type == "zeus":
+            from control.zeus_control import ZeusControl
             self.hand = ZeusControl(**self.kwargs)
         elif self.hand_type == "smart":
+            from control.smart_hand_control import SmartHandControl
             self.hand = SmartHandControl(**self.kwargs)
         elif self.hand_type == "psyonic":
+            from control.psyonic_control import PsyonicHandControl
             self.hand = PsyonicHandControl(**self.kwargs)
         else:
             raise ValueError(f"Unsupported hand type: {self.hand_type}")
@@ -51,6 +51,12 @@ class InterfaceControl:
         else:
             self.hand.send_gesture(gesture)
 
+    def send_pose(self, positions):
+        """Send the position of every finger in a single write. positions are 0-1000, thumb to little finger [, thumb rotation]"""
+        if not self.hand:
+            raise RuntimeError("Hand not initialized. Call connect() first.")
+        self.hand.send_pose(positions)
+
     def send_finger_position(self, finger, position):
         """Send a specific finger position to the hand. finger is 0-4, position is 0-100"""
         if not self.hand:
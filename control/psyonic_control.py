@@ -1,7 +1,8 @@
 from control.abstract_hand_control import HandInterface
 from control.serial_com import SerialCommunication
-from control.gesture_decoder import decode_gesture
+from control.dispatcher import CommandDispatcher, LineAcks, PPPAcks
 from utils.utils import print_packet
+from utils.tracing import get_tracer
 import serial
 import time
 import struct
@@ -28,7 +29,8 @@ class PsyonicHandControl(HandInterface):
     LIMIT = 32767
     VOLTAGE_LIMIT = 3546
     
-    def __init__(self, address=0x50, baudrate=460800, port=None, stuffing=True, print_debug=False):
+    def __init__(self, address=0x50, baudrate=460800, port=None, stuffing=True, print_debug=False,
+                 dispatch=True, serial_device=None, ack_timeout=0.1):
         """
         Initialize the Psyonic hand controller.
         
@@ -36,6 +38,10 @@ class PsyonicHandControl(HandInterface):
             baudrate (int): Serial communication baudrate (default: 115200)
             port (str): Serial port to connect to (e.g., 'COM3' on Windows)
                        If None, will try to auto-detect USB to TTL device
+            dispatch (bool): Send commands from a background CommandDispatcher (non-blocking, latest pose wins)
+                       instead of writing and sleeping in the caller
+            serial_device: pyserial like object to use instead of opening a port (e.g. FakeSerialDevice)
+            ack_timeout (float): Time to wait for the hand to acknowledge a command before sending the next one
         """
         self.address = address
         self.port = port
@@ -44,6 +50,12 @@ class PsyonicHandControl(HandInterface):
         self.connected = False
         self.stuffing = stuffing
         self.print_debug = print_debug
+        self.dispatch = dispatch
+        self.serial_device = serial_device
+        self.ack_timeout = ack_timeout
+        self.dispatcher = None
+        # "send" spans, with the trace id set in tracer.current by the caller
+        self.tracer = get_tracer()
 
     def connect(self):
         """Connect to the Psyonic hand via serial communication."""
@@ -52,10 +64,17 @@ class PsyonicHandControl(HandInterface):
             
         try:
             print(f"Connecting to Psyonic hand via USB to TTL on {self.port}")
-            self.serial = SerialCommunication(port=self.port, baud_rate=self.baudrate, parity=serial.PARITY_NONE, stopbits=serial.STOPBITS_ONE)
+            self.serial = SerialCommunication(serial=self.serial_device, port=self.port, baud_rate=self.baudrate, parity=serial.PARITY_NONE, stopbits=serial.STOPBITS_ONE)
             self.serial.open()
             self.connected = True
+            if self.dispatch:
+                # The hand answers each command with a frame in the same format as the commands
+                acks = PPPAcks() if self.stuffing else LineAcks()
+                self.dispatcher = CommandDispatcher(self.serial.serial, ack_parser=acks, ack_timeout=self.ack_timeout,
+                                                    tracer=self.tracer)
+                self.dispatcher.start()
             print(f"Connected to Psyonic hand on {self.serial.port}")
+            self.cache_gestures()
             
             # Initialize the hand
             # self._send_init_command()
@@ -71,24 +90,27 @@ class PsyonicHandControl(HandInterface):
 
     def disconnect(self):
         """Disconnect from the Psyonic hand."""
+        if self.dispatcher:
+            self.dispatcher.stop()
+            self.dispatcher = None
         if self.serial:
             self.serial.close()
             self.connected = False
             print("Disconnected from Psyonic hand")
 
-    def send_gesture(self, gesture):
+    def encode_pose(self, positions):
         """
-        Send a gesture command to the Psyonic hand.
-        
+        Encode the position of every finger into one stuffed command packet.
+
         Args:
-            gesture (str): Name of the gesture to perform
+            positions (list): thumb, index, middle, ring, little [, thumb rotation] positions (decode_gesture),
+                the thumb rotation is 0 when it is not given
         """
-        if not self.connected:
-            raise RuntimeError("Not connected to Psyonic hand")
-            
-        # Get finger positions from our gesture decoder
-        thumb_pos, index_pos, middle_pos, ring_pos, little_pos, thumb_rotation_pos = decode_gesture(gesture)
-        
+        if len(positions) not in (5, 6):
+            raise ValueError("Poses must have 5 or 6 positions")
+        thumb_pos, index_pos, middle_pos, ring_pos, little_pos = positions[:5]
+        thumb_rotation_pos = positions[5] if len(positions) == 6 else 0
+
         # Scale positions from 0-1500 to 0-150 for Psyonic hand
         positions = [
             int(index_pos / 10),
@@ -98,9 +120,13 @@ class PsyonicHandControl(HandInterface):
             int(thumb_pos / 10),
             int(-thumb_rotation_pos / 10)
         ]
-        
-        # Send all finger positions in one command
-        self._send_finger_positions(positions)
+        return bytes(self._create_packet(self.CMD_FINGER_POS, positions))
+
+    def send_encoded(self, packet):
+        """Send a pose packet from encode_pose, a newer pose replaces it if it is not sent yet."""
+        if not self.connected:
+            raise RuntimeError("Not connected to Psyonic hand")
+        self._send_packet(packet, key=self.CMD_FINGER_POS)
 
     def send_finger_position(self, finger, position):
         """
@@ -132,6 +158,9 @@ class PsyonicHandControl(HandInterface):
     def read_data(self):
         """Read a packet from the Psyonic hand."""
         print("Reading data from Psyonic hand...")
+        if self.dispatcher:
+            # The dispatcher owns the input of the link, the latest answer is kept there
+            return self.dispatcher.last_reply
         packet = self.serial.read()
         print(f" Raw Packet (hex): {[hex(b) for b in bytearray(packet)]}")
         if self.stuffing:
@@ -151,8 +180,8 @@ class PsyonicHandControl(HandInterface):
         packet = self._create_packet(self.CMD_FINGER_POS, positions)
         # print(f"Packet: {packet}")
         
-        # Send the packet
-        self._send_packet(packet)
+        # Send the packet, a newer pose replaces this one if it is not sent yet
+        self._send_packet(packet, key=self.CMD_FINGER_POS)
 
     def _create_packet(self, cmd_type, values):
         """Create a properly formatted packet with checksum. must have 6 values"""
@@ -178,12 +207,18 @@ class PsyonicHandControl(HandInterface):
         
         return packet
 
-    def _send_packet(self, packet):
-        """Send a packet with PPP stuffing."""
+    def _send_packet(self, packet, key=None):
+        """Send a packet with PPP stuffing. Packets with the same key are coalesced by the dispatcher."""
         if self.print_debug:
             print(f"Sending Packet (hex): {[hex(b) for b in bytearray(packet)]}")
             print_packet(packet, stuffed=self.stuffing)
-        self.serial.write(packet)
+        trace = self.tracer.current
+        with self.tracer.span("send", trace):
+            if self.dispatcher:
+                self.dispatcher.submit(packet, key=key, trace=trace)
+                return
+            # Written as a list of ints, so no line ending is added
+            self.serial.write(list(packet))
         time.sleep(0.1)  # Small delay to ensure command is processed
 
     def _send_init_command(self):
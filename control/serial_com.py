@@ -39,7 +39,7 @@ class SerialCommunication:
         raise ValueError("No device found. Please check connections and specify port manually.")
     
     def open(self):
-        if self.port is None:
+        if self.port is None and self.serial is None:
             self.port, self.device_name = self._find_port()
         if self.serial is None:
             self.serial = serial.Serial(port=self.port, baudrate=self.baud_rate, parity=self.parity, stopbits=self.stopbits, timeout=self.timeout)
@@ -53,13 +53,36 @@ class SerialCommunication:
                 self.serial.close()
 
     def write(self, message):
+        """Write a message and wait for the answer line."""
+        if self.serial is not None:
+            self.send(message)
+            self.read()
+
+    def write_batch(self, messages):
+        """Write several messages at once and wait for the answer line of each one."""
+        if self.serial is not None:
+            self.send_batch(messages)
+            for _ in messages:
+                self.read()
+
+    def send_batch(self, messages):
+        """Write several messages in a single write, without waiting for the answers."""
+        data = b''
+        for message in messages:
+            if isinstance(message, str):
+                message = message.encode()
+            data += bytes(message) + b'\n'
+        if self.serial is not None:
+            self.serial.write(data)
+
+    def send(self, message):
+        """Write a message without waiting for the answer."""
         if isinstance(message, str):
             message = (message + "\n").encode()
         elif isinstance(message, bytes) or isinstance(message, bytearray):
             message = bytes(message) + b'\n'
         if self.serial is not None:
             self.serial.write(message)
-            self.read()
 
     def read(self):
         if self.serial is not None:
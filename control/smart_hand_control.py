@@ -2,7 +2,6 @@ from control.ble_client import BLEDevice, scan_and_connect
 from control.serial_com import SerialCommunication
 from control.abstract_hand_control import HandInterface
 import time
-from control.zeus_control import decode_gesture
 
 
 SERVICE_UART = "6E400001-B5A3-F393-E0A9-E50E24DCCA9E"
@@ -10,10 +9,25 @@ CHAR_UART_TX = "6E400003-B5A3-F393-E0A9-E50E24DCCA9E"
 CHAR_UART_RX = "6E400002-B5A3-F393-E0A9-E50E24DCCA9E"
 NAME = "testpico"
 
+# Commands
+CMD_FINGER_POSITION = 0x01
+CMD_GESTURE = 0x02
+CMD_POSE = 0x03
+
 class SmartHandControl(HandInterface):
 
-    def __init__(self, deviceName=NAME, mode="BLE", baud_rate=115200, port=None):
+    def __init__(self, deviceName=NAME, mode="BLE", baud_rate=115200, port=None, pose_command=False):
+        """
+        Args:
+            deviceName (str): BLE name of the hand
+            mode (str): "BLE" or "SERIAL"
+            baud_rate (int): serial baud rate
+            port (str): serial port, found automatically if None
+            pose_command (bool): the firmware accepts CMD_POSE (every finger in one command), otherwise a pose is
+                sent as one CMD_FINGER_POSITION command per finger, all in the same write
+        """
         self.deviceName = deviceName
+        self.pose_command = pose_command
         self.use_ble = False
         self.device:BLEDevice = None
         self.use_serial = False
@@ -41,6 +55,7 @@ class SmartHandControl(HandInterface):
         if self.use_serial:
             self.serial = SerialCommunication(port=self.port, baud_rate=self.baud_rate)
             self.serial.open()
+        self.cache_gestures()
 
     def disconnect(self):
         if self.device and self.use_ble:
@@ -49,26 +64,27 @@ class SmartHandControl(HandInterface):
         if self.serial and self.use_serial:
             self.serial.close()
 
-    def send_gesture(self, gesture):
-        thumb_finger_pos, index_finger_pos, middle_finger_pos, ring_finger_pos, little_finger_pos = decode_gesture(gesture)
-        self.send_finger_position(0, thumb_finger_pos)
-        self.send_finger_position(1, index_finger_pos)
-        self.send_finger_position(2, middle_finger_pos)
-        self.send_finger_position(3, ring_finger_pos)
-        self.send_finger_position(4, little_finger_pos)
-        
+    def encode_pose(self, positions):
+        # positions are 0-1000 (decode_gesture), thumb to little finger, the thumb rotation is not used
+        positions = positions[:5]
+        if self.pose_command:
+            return [bytes([CMD_POSE]) + b''.join(int(position).to_bytes(2, 'big') for position in positions)]
+        return [self._finger_command(finger, position) for finger, position in enumerate(positions)]
+
+    def send_encoded(self, commands):
+        self.send_batch(commands)
+
     def send_finger_position(self, finger, position):
         # finger is 0-4, position is 0-100
-        position = position * 10
-        data = b'\x01'
-        bytes_val_finger = int(finger).to_bytes(1, 'big')
-        data += bytes_val_finger
-        bytes_val_pos = int(position).to_bytes(2, 'big')
-        data += bytes_val_pos
-        self.send_data(data)
-        
+        self.send_data(self._finger_command(finger, position * 10))
+
+    @staticmethod
+    def _finger_command(finger, position):
+        # finger is 0-4, position is 0-1000
+        return bytes([CMD_FINGER_POSITION]) + int(finger).to_bytes(1, 'big') + int(position).to_bytes(2, 'big')
+
     def send_gesture_direct(self, gesture):
-        data = b'\x02'
+        data = bytes([CMD_GESTURE])
         bytes_val = int(gesture).to_bytes(1, 'big')
         data += bytes_val
         self.send_data(data)
@@ -85,10 +101,17 @@ class SmartHandControl(HandInterface):
 
     def send_data(self, data):
         if self.device and self.use_ble:
-            self.device.write(SERVICE_UART, CHAR_UART_RX, data)
+            self.device.write_nowait(SERVICE_UART, CHAR_UART_RX, data)
         if self.serial and self.use_serial:
             self.serial.write(data)
 
+    def send_batch(self, commands):
+        """Send several commands in a single write."""
+        if self.device and self.use_ble:
+            self.device.write_batch_nowait(SERVICE_UART, [(CHAR_UART_RX, data) for data in commands])
+        if self.serial and self.use_serial:
+            self.serial.write_batch(commands)
+
     def toggle_led_rpi(self):
         self.send_data("toggle")  
 
@@ -1,6 +1,5 @@
 import asyncio
 from control.ble_client import BLEDevice, scan_and_connect
-from control.gesture_decoder import decode_gesture
 from control.constants import *
 from control.abstract_hand_control import HandInterface
 import time
@@ -10,9 +9,20 @@ CHAR_UART_TX = "6E400003-C352-11E5-953D-0002A5D5C51B"
 CHAR_UART_RX = "6E400002-C352-11E5-953D-0002A5D5C51B"
 NAME = "A-235328"
 
+# Frame types
+FRAME_FINGER_POSITION = 0x05
+FRAME_POSE = 0x06
+
 class ZeusControl(HandInterface):
-    def __init__(self, deviceName=NAME):
+    def __init__(self, deviceName=NAME, pose_frame=False):
+        """
+        Args:
+            deviceName (str): BLE name of the hand
+            pose_frame (bool): the firmware accepts FRAME_POSE (every finger in one frame), otherwise a pose is
+                sent as one FRAME_FINGER_POSITION frame per finger, all in the same BLE write batch
+        """
         self.deviceName = deviceName
+        self.pose_frame = pose_frame
         self.device:BLEDevice = None
         self.crc32 = CRC32()
 
@@ -26,6 +36,7 @@ class ZeusControl(HandInterface):
             self.device.add_characteristic(SERVICE_UART, CHAR_UART_RX)
             self.device.add_notification_callback(self._notify_callback)
             self.device.start_notify(CHAR_UART_TX)
+        self.cache_gestures()
 
     def disconnect(self):
         if self.device:
@@ -34,21 +45,27 @@ class ZeusControl(HandInterface):
         self.device = None
         print("Disconnected ZeusHand")
 
-    def send_gesture(self, gesture):
-        thumb_finger_pos, index_finger_pos, middle_finger_pos, ring_finger_pos, little_finger_pos = decode_gesture(gesture)
-        self.send_finger_position(0, thumb_finger_pos)
-        self.send_finger_position(1, index_finger_pos)
-        self.send_finger_position(2, middle_finger_pos)
-        self.send_finger_position(3, ring_finger_pos)
-        self.send_finger_position(4, little_finger_pos)
+    def encode_pose(self, positions):
+        # positions are 0-1000 (decode_gesture), thumb to little finger, the thumb rotation is not used
+        fingers = [self._finger_data(finger, position) for finger, position in enumerate(positions[:5])]
+        if self.pose_frame:
+            packets = [self._write_data_packet(bytes([FRAME_POSE]), b''.join(fingers))]
+        else:
+            packets = [self._write_data_packet(bytes([FRAME_FINGER_POSITION]), data) for data in fingers]
+        return [(CHAR_UART_RX, packet) for packet in packets]
+
+    def send_encoded(self, writes):
+        if self.device:
+            self.device.write_batch_nowait(SERVICE_UART, writes)
 
     def send_finger_position(self, finger, position):
         # finger is 0-4, position is 0-100
-        position = position * 10
-        finger_bytes = int(finger).to_bytes(1, 'big')
-        position_bytes = int(position).to_bytes(4, 'big')
-        data = bytes(finger_bytes + position_bytes)
-        self.send_data(data, data_id=0x05)
+        self.send_data_with_id(self._finger_data(finger, position * 10), data_id=FRAME_FINGER_POSITION)
+
+    @staticmethod
+    def _finger_data(finger, position):
+        # finger is 0-4, position is 0-1000
+        return int(finger).to_bytes(1, 'big') + int(position).to_bytes(4, 'big')
 
     def send_data_with_id(self, data, data_id):
         if self.device:
@@ -60,7 +77,8 @@ class ZeusControl(HandInterface):
             elif isinstance(data, str):
                 data = data.encode()
             packet = self._write_data_packet(bytes([data_id]), data)
-            self.device.write(SERVICE_UART, CHAR_UART_RX, packet)
+            # Queued on the BLE event loop, consecutive commands are pipelined instead of waiting for each other
+            self.device.write_nowait(SERVICE_UART, CHAR_UART_RX, packet)
 
     def send_data(self, data):
         self.send_data_with_id(data, 0)
@@ -1,10 +1,10 @@
 import utils.utils as eutils
 import utils.gestures_json as gjutils
-from libemg_realtime_prediction import predicator
 from control.interface_control import InterfaceControl
 
-from multiprocessing.connection import Connection
-from multiprocessing import Lock, Process, Pipe
+from utils.prediction_slot import PredictionSlot
+from utils.tracing import get_tracer
+from multiprocessing import Lock, Process
 from config import *
 import time
 from collections import deque, Counter
@@ -13,19 +13,26 @@ from statistics import mean
 eutils.set_logging()
 
 # PREDICTOR
-def run_predicator_process(conn: Connection=None):
-    predicator(use_gui=USE_GUI, conn=conn, delay=PREDICTOR_DELAY, timeout_delay=PREDICTOR_TIMEOUT_DELAY)
+def run_predicator_process(slot: PredictionSlot=None):
+    # Imported here so the controller process does not load torch and libemg
+    from libemg_realtime_prediction import predicator
+    predicator(use_gui=USE_GUI, slot=slot, timeout_delay=PREDICTOR_TIMEOUT_DELAY)
 
 
 # COMMUNICATOR
-def run_controller_process(conn: Connection=None):
+def run_controller_process(slot: PredictionSlot=None):
+    # Created before the hand so its spans go to the same tracer
+    tracer = get_tracer("controller")
     try:
         
-        comm_controller = InterfaceControl(hand_type="psyonic")
+        if VIRTUAL:
+            from control.fake_serial import FakePsyonicHand
+            comm_controller = InterfaceControl(hand_type="psyonic", serial_device=FakePsyonicHand())
+        else:
+            comm_controller = InterfaceControl(hand_type="psyonic")
         comm_controller.connect()
         
-        gestures_dict = gjutils.get_gestures_dict(MEDIA_PATH)
-        images = gjutils.get_images_list(MEDIA_PATH)
+        catalog = gjutils.get_catalog(MEDIA_PATH)
         
         # Main loop to read input from stdin
         print("Communicator waiting for data...")
@@ -33,33 +40,21 @@ def run_controller_process(conn: Connection=None):
 
         while True:
             # Read input from stdin
-            if conn is None:
+            if slot is None:
                 input_data = input()
+                start = time.monotonic_ns()
             else:
-                # Drain the pipe buffer and collect any pending predictions
-                input_data = None
-                any_received = False
-                while conn.poll():  # Check if data is available without blocking
-                    try:
-                        d = conn.recv()
-                        any_received = True
-                        input_data = d  # keep last for backwards-compat
-                        timestamp = input_data["timestamp"]
-                        # extract numeric prediction if present and append to recent
-                        try:
-                            p = int(d.get("prediction", 0))
-                        except Exception:
-                            p = None
-                        if p is not None:
-                            recent.append(p)
-                    except EOFError:
+                # Sleep until a new prediction is published, only the freshest one is kept in the slot
+                latest = slot.wait(PREDICTOR_TIMEOUT_DELAY)
+                if latest is None:
+                    if slot.closed:
                         print("Connection closed")
                         return
-
-                # If no data available, wait briefly and continue
-                if not any_received:
-                    time.sleep(POLL_SLEEP_DELAY)  # sleep to prevent busy waiting
                     continue
+                start = time.monotonic_ns()
+                tracer.current = latest.seq
+                timestamp = latest.timestamp
+                recent.append(latest.prediction)
 
                 # Compute smoothed prediction (if smoothing window > 1 and buffer has data)
                 if len(recent) == 0:
@@ -103,7 +98,7 @@ def run_controller_process(conn: Connection=None):
                 # timestamp = input_data["timestamp"]
                 if int(input_pred) not in range(NUM_CLASSES): 
                     input_pred = 0
-                gesture = gjutils.get_label_from_index(input_pred, images, gestures_dict)
+                gesture = catalog.label_of(input_pred)
 
                 print(f"Input: pred({input_pred})  gest[{gesture}]: {input_data}" + " "*10 + "... received data /  sending gesture ...")
             
@@ -113,31 +108,34 @@ def run_controller_process(conn: Connection=None):
 
             # Send the gesture to the hand
             comm_controller.send_gesture(gesture)
+            tracer.record("controller", start, time.monotonic_ns(), tracer.current)
             print("="*50)
             
     except Exception as e:
         print(f"Error communicator: {e}")
     finally:
         comm_controller.disconnect()
+        if TRACING:
+            tracer.save(TRACE_FOLDER)
         print("Communicator Exiting...")
 
 
 # CONNECTION HANDLER
 
-def run_process(target, conn: Connection):
+def run_process(target, slot: PredictionSlot):
     try:
-        target(conn)
+        target(slot)
     except Exception as e:
         print(f"An error occurred in a subprocess: {e}")
     finally:
-        conn.close()
+        slot.close()
 
 if __name__ == "__main__":
     try:
-            parent_conn, child_conn = Pipe()
+            slot = PredictionSlot()
             
-            p1 = Process(target=run_process, args=(run_predicator_process, parent_conn))
-            p2 = Process(target=run_process, args=(run_controller_process, child_conn))
+            p1 = Process(target=run_process, args=(run_predicator_process, slot))
+            p2 = Process(target=run_process, args=(run_controller_process, slot))
             
             p1.start()
             p2.start()
@@ -147,9 +145,6 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"An error occurred in the main process: {e}")
     finally:
-        parent_conn.close()
-        child_conn.close()
-
         if p1.is_alive():
             p1.terminate()
         if p2.is_alive():
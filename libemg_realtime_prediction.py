@@ -4,38 +4,60 @@ from libemg.data_handler import OnlineDataHandler
 from libemg.emg_predictor import EMGClassifier, OnlineEMGClassifier
 from libemg.feature_extractor import FeatureExtractor
 from libemg.streamers import emager_streamer
-from libemg.filtering import Filter
-from libemg.environments.controllers import ClassifierController
 
 import models.models as etm
+from models.inference import InferenceEngine, SharedWeights
+from models.finetune import FineTuner
 import utils.utils as eutils
+from utils.stream_filter import OnlineStreamFilter
+from utils.event_controller import EventClassifierController
+from utils.tracing import BatchClock, get_tracer
 from visualization.realtime_gui import RealTimeGestureUi
 import utils.gestures_json as gjutils
 
 import time
+import queue
+import datetime
 import torch
 import numpy as np
 from multiprocessing import Lock
-from multiprocessing.connection import Connection
+from utils.prediction_slot import PredictionSlot
 from config import *
 
 eutils.set_logging()
 
-def update_labels_process(stop_event:threading.Event, gui:RealTimeGestureUi, conn:Connection | None = None, delay:float=0.01, timeout_delay:float=0.5):
+def log_predictions_process(stop_event:threading.Event, log_queue:queue.SimpleQueue):
     '''
-    Update the labels of the gui and send the data to the controller via conn if it is not None
+    Format and print the predictions sent by update_labels_process, off its hot path
+    log_queue: queue.SimpleQueue of (timestamp, prediction, label)
+    '''
+    while not stop_event.is_set():
+        try:
+            ts, index, label = log_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        timestamp = time.strftime("%H:%M:%S", time.localtime(ts)) + f".{int((ts - int(ts)) * 1000):03d}"
+        print(f"Output : pred({index})  gest[{label}] {{'prediction': {index}, 'timestamp': '{timestamp}'}}" + " "*10, "... sending data ...")
+
+def update_labels_process(stop_event:threading.Event, gui:RealTimeGestureUi, slot:PredictionSlot | None = None, timeout_delay:float=0.5,
+                          log_queue:queue.SimpleQueue | None = None, clock:BatchClock | None = None):
+    '''
+    Update the labels of the gui and publish the prediction to the controller via slot if it is not None
+    The thread sleeps until the classifier sends a new output (EventClassifierController), there is no polling delay
     stop_event: threading.Event = threading.Event()
     gui: RealTimeGestureUi = RealTimeGestureUi()
-    conn: Connection | None = None, delay:float=0.01
-    conn ouputs:
-        output_data = {
-            "prediction": int(predictions[0]),
-            "timestamp": time.time()
-        }
+    slot: PredictionSlot | None = None
+    timeout_delay: float, an unchanged prediction is sent again after this time
+    log_queue: queue.SimpleQueue | None, (timestamp, prediction, label) of the sent predictions for log_predictions_process
+    clock: BatchClock | None, time of the samples of each classifier output, its filter and inference spans are
+        recorded under the trace id of the prediction
+    slot ouputs:
+        slot.publish(int(predictions[0]), timestamp=time.time(), sample_time=stamp.sample)
     '''
-    gestures_dict = gjutils.get_gestures_dict(MEDIA_PATH)
-    images = gjutils.get_images_list(MEDIA_PATH)
-    ctrl = ClassifierController('predictions', NUM_CLASSES)
+    catalog = gjutils.get_catalog(MEDIA_PATH)
+    tracer = get_tracer("predictor")
+    # Wakes up at least every timeout_delay to check the stop event
+    ctrl = EventClassifierController('predictions', NUM_CLASSES, timeout=timeout_delay)
     
     # Track last prediction to avoid sending duplicates
     last_prediction = None
@@ -44,56 +66,53 @@ def update_labels_process(stop_event:threading.Event, gui:RealTimeGestureUi, con
     # Run thread until stop event
     while not stop_event.is_set():
         
-        # Get predictions using the controller
+        # Sleep until the classifier outputs a prediction
         predictions = ctrl.get_data(['predictions'])
-        # action = ctrl._get_action()
-        # print(f"{predictions} (predictions)")
-        # print(f"action: {action}")
         if predictions is None:
-            time.sleep(delay)  # Wait a bit if no data
             continue
+        start = time.monotonic_ns()
+        stamp = None if clock is None else clock.read()
         
         index = int(predictions[0])
         
         # Only process and send if prediction has changed or enough time has passed
         current_time = time.time()
         if index == last_prediction and (current_time - last_sent_time) < timeout_delay:
-            time.sleep(delay)
             continue
         
         last_prediction = index
         last_sent_time = current_time
         
-        ts = current_time
-        timestamp = time.strftime("%H:%M:%S", time.localtime(ts)) + f".{int((ts - int(ts)) * 1000):03d}"
-        output_data = {
-            "prediction": index,
-            "timestamp": timestamp
-        }
-        
-        label = gjutils.get_label_from_index(index, images, gestures_dict)
+        label = catalog.label_of(index)
 
-        gui.update_label(label)
+        seq = -1
+        if slot is not None:
+            seq = slot.publish(index, timestamp=current_time, sample_time=-1 if stamp is None else stamp.sample)
+            if log_queue is not None:
+                log_queue.put((current_time, index, label))
 
-        if conn is not None:
-            print(f"Output : pred({predictions[0]})  gest[{label}] {output_data}" + " "*10,"... sending data ...")
-            conn.send(output_data)
-
-        time.sleep(delay)
+        gui.update_label(label)
+        BatchClock.record(tracer, stamp, seq)
+        tracer.record("labels", start, time.monotonic_ns(), seq)
         
 
-def predicator(use_gui:bool=True, conn:Connection | None = None, delay:float=0.01, timeout_delay:float=0.5):
+def predicator(use_gui:bool=True, slot:PredictionSlot | None = None, timeout_delay:float=0.5):
 
     # Create data handler and streamer
-    p, smi = emager_streamer()
+    if VIRTUAL:
+        from utils.synthetic_streamer import synthetic_streamer
+        p, smi = synthetic_streamer(sampling_rate=SAMPLING)
+    else:
+        p, smi = emager_streamer()
     print(f"Streamer created: process: {p}, smi : {smi}")
     odh = OnlineDataHandler(shared_memory_items=smi)
 
-    filter = Filter(SAMPLING)
-    notch_filter_dictionary={ "name": "notch", "cutoff": 60, "bandwidth": 3}
-    filter.install_filters(notch_filter_dictionary)
-    bandpass_filter_dictionary={ "name":"bandpass", "cutoff": [20, 450], "order": 4}
-    filter.install_filters(bandpass_filter_dictionary)
+    # Time of the samples behind each classifier output, stamped in the classifier process and read by
+    # update_labels_process, which records the filter and inference spans of each prediction
+    clock = BatchClock() if TRACING else None
+    filter = OnlineStreamFilter(SAMPLING, odh=odh, clock=clock)
+    filter.install_filters(NOTCH_FILTER)
+    filter.install_filters(BANDPASS_FILTER)
     odh.install_filter(filter)
     print("Data handler created")
 
@@ -104,14 +123,18 @@ def predicator(use_gui:bool=True, conn:Connection | None = None, delay:float=0.0
 
     # Verify model loading and state dict compatibility
     model = etm.EmagerCNN((4, 16), NUM_CLASSES, -1)
-    print("Loading model from: ", MODEL_PATH)
+    model_path = get_model_path()
+    print("Loading model from: ", model_path)
     try:
-        model.load_state_dict(torch.load(MODEL_PATH))
+        model.load_state_dict(torch.load(model_path))
         model.eval()
     except RuntimeError as e:
         print(f"Error loading model: {e}")
 
-    classi = EMGClassifier(model)
+    # Folded and compiled inference path, predict_proba is called on every window increment
+    # With FINETUNE, the weights are replaced in the running classifier once recalibrated
+    weights = SharedWeights(model) if FINETUNE else None
+    classi = EMGClassifier(InferenceEngine(model, clock=clock, weights=weights))
     classi.add_majority_vote(MAJORITY_VOTE)
 
     # Ensure OnlineEMGClassifier is correctly set up for data handling and inference
@@ -123,20 +146,31 @@ def predicator(use_gui:bool=True, conn:Connection | None = None, delay:float=0.0
 
 
     # Create GUI
-    files = gjutils.get_images_list(MEDIA_PATH)
+    files = gjutils.get_catalog(MEDIA_PATH).images
     print("Files: ", files)
     print("Creating GUI...")
     gui = RealTimeGestureUi(files)
     
     stop_event = threading.Event()
+    log_queue = queue.SimpleQueue()
     updateLabelProcess = threading.Thread(target=update_labels_process, args=(
-        stop_event, gui, conn, delay, timeout_delay))
+        stop_event, gui, slot, timeout_delay, log_queue, clock))
+    logPredictionsProcess = threading.Thread(target=log_predictions_process, args=(stop_event, log_queue), daemon=True)
+    tuner = None
+    if FINETUNE:
+        current_time = datetime.datetime.now().strftime("%y-%m-%d_%Hh%M")
+        tuner = FineTuner(model, weights, smm_items, range(NUM_CLASSES), seconds=FINETUNE_SECONDS,
+                          save_path=f"{SAVE_PATH}libemg_torch_cnn_{SESSION}_finetuned_{current_time}.pth")
 
     try:
         print("Starting classification...")
         oclassi.run(block=False)
         print("Starting process thread...")
         updateLabelProcess.start()
+        logPredictionsProcess.start()
+        if tuner is not None:
+            print("Starting calibration thread...")
+            tuner.start()
         print("Starting GUI...")
         if use_gui:
             gui.run()
@@ -148,13 +182,17 @@ def predicator(use_gui:bool=True, conn:Connection | None = None, delay:float=0.0
         print(f"Error during classification: {e}")
 
     finally :
-        if conn is not None:
-            conn.send("exit")
+        if slot is not None:
+            slot.close()
         stop_event.set()
+        if tuner is not None:
+            tuner.stop()
         oclassi.stop_running()
+        if TRACING:
+            get_tracer("predictor").save(TRACE_FOLDER)
         
         print("Exiting")
 
 
 if __name__ == "__main__":
-    predicator(use_gui=True, conn=None, delay=0.01, timeout_delay=0.5)
\ No newline at end of file
+    predicator(use_gui=True, slot=None, timeout_delay=0.5)
\ No newline at end of file
@@ -1,78 +1,75 @@
 
-from libemg.data_handler import OfflineDataHandler, RegexFilter
 from libemg.feature_extractor import FeatureExtractor
-from libemg.filtering import Filter
+from utils.training_data import find_sessions, load_sessions
+from utils.window_dataset import WindowDataset
 
 import torch
 from torch.utils.data import DataLoader, TensorDataset
 import models.models as etm
 import numpy as np
 import datetime
+import os
 import matplotlib.pyplot as plt
 from config import *
 
 
-def prepare_data(dataset_folder):
-        classes_values = [str(num) for num in range(NUM_CLASSES)]
-        reps_values = [str(num) for num in range(NUM_REPS)]
-        regex_filters = [
-            RegexFilter(left_bound="C_", right_bound="_", values=classes_values, description="classes"),
-            RegexFilter(left_bound="R_", right_bound="_emg.csv", values=reps_values, description="reps"), 
-            ]
-        odh = OfflineDataHandler()
-        odh.get_data(folder_location=dataset_folder, regex_filters=regex_filters)
-        filter = Filter(SAMPLING)
-        notch_filter_dictionary={ "name": "notch", "cutoff": 60, "bandwidth": 3}
-        filter.install_filters(notch_filter_dictionary)
-        bandpass_filter_dictionary={ "name":"bandpass", "cutoff": [20, 450], "order": 4}
-        filter.install_filters(bandpass_filter_dictionary)
-        filter.filter(odh)
-        return odh
+def load_features(dataset_folders):
+        """Filtered MAV features of the sessions and their metadata, computed in a process pool and cached on disk
+        until the dataset files, filters or windowing parameters change."""
+        return load_sessions(dataset_folders, WINDOW_SIZE, WINDOW_INCREMENT, SAMPLING, [NOTCH_FILTER, BANDPASS_FILTER],
+                             classes=range(NUM_CLASSES), reps=range(NUM_REPS), cache_folder=os.path.join(BASE_PATH, CACHE_FOLDER))
 
-data = prepare_data(DATASETS_PATH)
-# for i in range(len(data.data)):
-#     plt.plot(data.data[i])
-#     plt.show()
+sessions = find_sessions(BASE_PATH) if TRAIN_SESSIONS is None else [f"{BASE_PATH}{s}/" for s in TRAIN_SESSIONS]
+print(f"Sessions: {sessions}")
 
-# Split data into training and testing
-train_data = data.isolate_data("reps", [0,1,2])
-test_data = data.isolate_data("reps", [3,4])
+if STREAM_TRAINING:
+    # Windows and MAV computed on demand from the memory-mapped recordings, memory stays bounded
+    def window_dataset(reps):
+        return WindowDataset(sessions, WINDOW_SIZE, WINDOW_INCREMENT, SAMPLING, [NOTCH_FILTER, BANDPASS_FILTER],
+                             classes=range(NUM_CLASSES), reps=reps)
+    train_dl = window_dataset([0,1,2])
+    test_dl = window_dataset([3,4])
+    print(f"Training windows: {len(train_dl)}, Testing windows: {len(test_dl)}")
+else:
+    # Windowing + features extraction
+    # Extract MAV since it's a commonly used pipeline for EMG
+    features, meta = load_features(sessions)
+    print(f"Features: {features.shape}")
 
-# Extract windows 
-train_windows, train_meta = train_data.parse_windows(WINDOW_SIZE, WINDOW_INCREMENT)
-test_windows, test_meta = test_data.parse_windows(WINDOW_SIZE, WINDOW_INCREMENT)
+    # Split data into training and testing
+    train_mask = np.isin(meta["reps"], [0,1,2])
+    test_mask = np.isin(meta["reps"], [3,4])
+    train_data = features[train_mask]
+    train_labels = meta["classes"][train_mask]
+    test_data = features[test_mask]
+    test_labels = meta["classes"][test_mask]
 
-print(f"Training metadata: {train_meta}, Testing metadata: {test_meta}")
-print(f"Training windows: {train_windows.shape}, Testing windows: {test_windows.shape}")
+    print(f"Training windows: {train_data.shape}, Testing windows: {test_data.shape}")
 
+    # pause for visualize features
+    fe = FeatureExtractor()
+    features_data = {"key": train_data}
+    fe.visualize_feature_space(features_data, "PCA", classes=train_labels)
 
-# Features extraction
-# Extract MAV since it's a commonly used pipeline for EMG
-fe = FeatureExtractor()
-train_data = fe.getMAVfeat(train_windows)
-train_labels = train_meta["classes"]
-test_data = fe.getMAVfeat(test_windows)
-test_labels = test_meta["classes"]
-
-# pause for visualize features
-features_data = {"key": train_data}
-fe.visualize_feature_space(features_data, "PCA", classes=train_labels)
-
-train_dl = DataLoader(
-    TensorDataset(torch.from_numpy(train_data.astype(np.float32)), torch.from_numpy(train_labels)),
-    batch_size=64,
-    shuffle=True,
-)
-test_dl = DataLoader(
-    TensorDataset(torch.from_numpy(test_data.astype(np.float32)), torch.from_numpy(test_labels)),
-    batch_size=256,
-    shuffle=False,
-)
+    train_dl = DataLoader(
+        TensorDataset(torch.from_numpy(train_data.astype(np.float32)), torch.from_numpy(train_labels)),
+        batch_size=64,
+        shuffle=True,
+    )
+    test_dl = DataLoader(
+        TensorDataset(torch.from_numpy(test_data.astype(np.float32)), torch.from_numpy(test_labels)),
+        batch_size=256,
+        shuffle=False,
+    )
 
 # Fit and test the model
 classifier = etm.EmagerCNN((4, 16), NUM_CLASSES, -1)
 
-res = classifier.fit(train_dl, test_dl, max_epochs=EPOCH)
+if FAST_TRAINING:
+    # Early stopping on a held-out part of the training windows, the streamed windows are loaded in memory
+    res = classifier.fit_fast(train_dl, test_dl)
+else:
+    res = classifier.fit(train_dl, test_dl, max_epochs=EPOCH, num_workers=LOADER_WORKERS)
 acc = int(res[0]["test_acc"]*1000)
 print(f"Resultat: {res} accuracy : {acc}/1000")
 current_time = datetime.datetime.now().strftime("%y-%m-%d_%Hh%M")
@@ -1,12 +1,15 @@
+import os
 import time
+import threading
 import numpy as np
 import serial
-from scipy import signal
 import pyqtgraph as pg
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import QTimer, Qt
 from PyQt6 import QtGui
 import serial.tools.list_ports
+from utils.stream_filter import StreamFilter
+from utils.recording import save_recording, RECORDING_EXTENSION
 
 
 def reorder(data, mask, match_result):
@@ -30,23 +33,284 @@ def reorder(data, mask, match_result):
     return roll_data
 
 
+FRAME_SIZE = 128
+### ^ Number of bytes in one HDSensor frame (64 channels x 2 bytes, big-endian)
+SYNC_MATCH = 63
+### ^ Expected template matching score of an aligned frame (see `reorder`)
+
+
+def find_frames(data):
+    '''
+    Single-pass sync search over a raw byte stream. The LSB of each channel's low byte is a sync bit: 0 for the
+    first channel and 1 for the 63 others, which is the same template `reorder` matches with `HDSensor.mask`.
+    Valid frames are followed at a 128 bytes stride and the stream is only resynchronized where a frame fails.
+    :param data: (bytes, bytearray, memoryview or numpy array) - raw bytes read from the com port
+    :return: (numpy array, int, int) - start index of each valid frame, number of dropped/corrupt frames and
+             number of bytes consumed (the unconsumed tail may still hold the beginning of a frame)
+    '''
+    buf = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data.astype(np.uint8, copy=False)
+    n_bytes = buf.size
+    if n_bytes < FRAME_SIZE:
+        return np.zeros(0, dtype=np.intp), 0, 0
+
+    # Weighted sum of the sync bits for every possible frame start, using one cumulative sum per byte parity
+    sync_bits = (buf[1:] & 1).astype(np.int32)
+    n_starts = n_bytes - FRAME_SIZE + 1
+    score = np.empty(n_starts, dtype=np.int32)
+    for parity in (0, 1):
+        bits = sync_bits[parity::2]
+        csum = np.concatenate(([0], np.cumsum(bits)))
+        idx = np.arange(parity, n_starts, 2) // 2
+        score[parity::2] = csum[idx + FRAME_SIZE // 2] - csum[idx] + bits[idx]
+    is_sync = (score == SYNC_MATCH) & (sync_bits[:n_starts] == 0)
+    ### ^ The score alone also matches 61 set bits + the weighted one, which overlaps two frames
+
+    # Computed once: every valid frame start, and the last frame of every run (the frame after it is not valid).
+    # Last frames are keyed by (start % FRAME_SIZE, start), so the run of a frame ends at the next key of
+    # its residue and each resync is a binary search instead of a rescan.
+    sync = np.flatnonzero(is_sync)
+    after = sync + FRAME_SIZE
+    last = sync[(after >= n_starts) | ~is_sync[np.minimum(after, n_starts - 1)]]
+    last_keys = np.sort(last % FRAME_SIZE * n_starts + last)
+
+    runs = []
+    dropped = 0
+    pos = 0
+    while pos < n_starts:
+        i = np.searchsorted(sync, pos)
+        if i == sync.size:
+            break
+        start = int(sync[i])
+        dropped += -(-(start - pos) // FRAME_SIZE)
+        end = int(last_keys[np.searchsorted(last_keys, start % FRAME_SIZE * n_starts + start)]) % n_starts
+        run = (end - start) // FRAME_SIZE + 1
+        runs.append(start + FRAME_SIZE * np.arange(run))
+        pos = start + FRAME_SIZE * run
+
+    # Bytes that cannot be the beginning of a frame anymore are consumed, the others are left for the next read
+    consumed = max(pos, n_starts)
+    if pos < n_starts:
+        dropped += -(-(n_starts - pos) // FRAME_SIZE)
+    starts = np.concatenate(runs) if runs else np.zeros(0, dtype=np.intp)
+    return starts, dropped, min(consumed, n_bytes)
+
+
+def frames_to_samples(buf, starts, channel_map=None):
+    '''
+    Gather the frames found by `find_frames` and convert them to samples.
+    :param buf: (numpy array) - 1D uint8 raw bytes
+    :param starts: (numpy array) - start index of each valid frame
+    :param channel_map: (list or numpy array) - channel map to hardware sensor, None to keep the raw channel order
+    :return: (numpy array) - (N, 64) int16 samples
+    '''
+    frames = buf[starts[:, None] + np.arange(FRAME_SIZE)]
+    samples = frames.view('>i2').astype(np.int16)
+    if channel_map is not None:
+        samples = samples[:, channel_map]
+    return samples
+
+
+def decode_frames(data, channel_map=None):
+    '''
+    Vectorized decoder for a whole serial read, replaces the per packet `reorder` + `int.from_bytes` path.
+    :param data: (bytes, bytearray, memoryview or numpy array) - raw bytes read from the com port
+    :param channel_map: (list or numpy array) - channel map to hardware sensor, None to keep the raw channel order
+    :return: (numpy array, int) - (N, 64) int16 samples and number of dropped/corrupt frames
+    '''
+    buf = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data.astype(np.uint8, copy=False)
+    starts, dropped, _ = find_frames(buf)
+    return frames_to_samples(buf, starts, channel_map), dropped
+
+
+class FrameRingBuffer(object):
+    '''
+    Preallocated byte buffer carrying incomplete frames over successive serial reads
+    '''
+
+    def __init__(self, capacity=256 * FRAME_SIZE):
+        '''
+        :param capacity: (int) - buffer size in bytes, larger reads are decoded in several passes
+        '''
+        if capacity < 2 * FRAME_SIZE:
+            raise ValueError(f"Capacity must be at least {2 * FRAME_SIZE} bytes")
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.uint8)
+        self.length = 0
+        ### ^ Number of pending bytes, always kept at the beginning of the buffer
+        self.gap = 0
+        ### ^ Number of bytes skipped since the last valid frame
+        self.bytes_consumed = 0
+        self.frames_decoded = 0
+        self.frames_recovered = 0
+        ### ^ Valid frames the legacy path discarded: split over two reads or read along with a corrupt frame
+        self.frames_dropped = 0
+
+    def clear(self):
+        '''
+        Discard pending bytes, counters are kept.
+        :return: None
+        '''
+        self.length = 0
+        self.gap = 0
+
+    def reset_counters(self):
+        self.bytes_consumed = 0
+        self.frames_decoded = 0
+        self.frames_recovered = 0
+        self.frames_dropped = 0
+
+    def stats(self):
+        '''
+        :return: (dict) - loss counters since the last `reset_counters`
+        '''
+        return {
+            "bytes_consumed": self.bytes_consumed,
+            "bytes_pending": self.length,
+            "frames_decoded": self.frames_decoded,
+            "frames_recovered": self.frames_recovered,
+            "frames_dropped": self.frames_dropped,
+        }
+
+    def feed(self, data, channel_map=None):
+        '''
+        Append newly read bytes and decode every complete frame, the incomplete tail is kept for the next call.
+        :param data: (bytes, bytearray, memoryview or numpy array) - raw bytes read from the com port
+        :param channel_map: (list or numpy array) - channel map to hardware sensor, None to keep the raw channel order
+        :return: (numpy array) - (N, 64) int16 samples
+        '''
+        data = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data.astype(np.uint8, copy=False)
+        batches = []
+        offset = 0
+        while offset < data.size:
+            carried = self.length
+            n = min(self.capacity - self.length, data.size - offset)
+            self.buffer[self.length:self.length + n] = data[offset:offset + n]
+            self.length += n
+            offset += n
+            batches.append(self._decode(carried, channel_map))
+        if not batches:
+            return np.zeros((0, 64), dtype=np.int16)
+        return batches[0] if len(batches) == 1 else np.concatenate(batches)
+
+    def _decode(self, carried, channel_map):
+        buf = self.buffer[:self.length]
+        starts, _, consumed = find_frames(buf)
+        samples = frames_to_samples(buf, starts, channel_map)
+
+        # Skipped bytes are only counted once the next valid frame is found, a gap split over reads counts once
+        if len(starts):
+            gaps = np.diff(starts, prepend=starts[0] + FRAME_SIZE) - FRAME_SIZE
+            gaps[0] = self.gap + starts[0]
+            dropped = int(np.sum(-(-gaps // FRAME_SIZE)))
+            self.gap = consumed - starts[-1] - FRAME_SIZE
+        else:
+            dropped = 0
+            self.gap += consumed
+
+        # Move the unconsumed tail back to the beginning of the buffer
+        tail = self.length - consumed
+        self.buffer[:tail] = self.buffer[consumed:self.length]
+        self.length = tail
+
+        self.bytes_consumed += consumed
+        self.frames_decoded += len(starts)
+        self.frames_dropped += dropped
+        self.frames_recovered += len(starts) if dropped else int(np.count_nonzero(starts < carried))
+        return samples
+
+
+class SampleRing(object):
+    '''
+    Fixed-size sample ring shared between one writer (the acquisition thread) and any number of readers.
+    Samples are written twice (at i and i + capacity) so the latest N samples are always a contiguous view, and
+    `write_index` is only advanced once the samples are written, so readers never need a lock.
+    '''
+
+    def __init__(self, capacity, n_channels=64, dtype=np.int16):
+        '''
+        :param capacity: (int) - number of samples kept in the ring
+        :param n_channels: (int) - number of channels per sample
+        :param dtype: (numpy dtype) - sample type
+        '''
+        self.capacity = capacity
+        self.n_channels = n_channels
+        self.buffer = np.zeros((2 * capacity, n_channels), dtype=dtype)
+        self.write_index = 0
+        ### ^ Monotonic count of samples written since creation
+
+    def write(self, samples):
+        '''
+        Append samples, the oldest ones are overwritten. Must only be called from a single writer.
+        :param samples: (numpy array) - (N, n_channels) samples
+        :return: None
+        '''
+        n = len(samples)
+        if n == 0:
+            return
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+        pos = (self.write_index + n - len(samples)) % self.capacity
+        first = min(len(samples), self.capacity - pos)
+        rest = len(samples) - first
+        self.buffer[pos:pos + first] = samples[:first]
+        self.buffer[pos + self.capacity:pos + self.capacity + first] = samples[:first]
+        self.buffer[:rest] = samples[first:]
+        self.buffer[self.capacity:self.capacity + rest] = samples[first:]
+        self.write_index += n
+
+    def latest(self, n):
+        '''
+        Zero-copy view of the latest samples. The view is overwritten once the writer laps it, copy it to keep it.
+        :param n: (int) - number of samples, at most `capacity`
+        :return: (numpy array, int) - (n, n_channels) view (shorter if fewer samples were written) and the write index
+        '''
+        index = self.write_index
+        n = min(n, index, self.capacity)
+        start = (index - n) % self.capacity
+        return self.buffer[start:start + n], index
+
+    def read_since(self, index):
+        '''
+        Zero-copy view of the samples written after a reader's cursor.
+        :param index: (int) - write index returned by the previous call
+        :return: (numpy array, int, int) - (n, n_channels) view, new cursor and number of samples lost to overrun
+        '''
+        end = self.write_index
+        ### ^ One snapshot, the writer may advance the index while the view is built
+        n = min(end - index, self.capacity)
+        start = (end - n) % self.capacity
+        return self.buffer[start:start + n], end, max(0, end - index - self.capacity)
+
+
 class HDSensor(object):
     '''
     Sensor object for data logging from HD EMG sensor
     '''
 
-    def __init__(self, serialpath, BR):
+    def __init__(self, serialpath, BR, serial_device=None):
         print('init sensor')
         '''
         Initialize HDSensor object, open serial communication to specified port using PySerial API
         :param serialpath: (str) - Path to serial port
         :param BR: (int) - Com port baudrate
+        :param serial_device: (pyserial like object) - used instead of opening serialpath (e.g. FakeHDSensorSerial)
         '''
-        self.ser = serial.Serial(serialpath, BR, timeout=1)
+        self.ser = serial.Serial(serialpath, BR, timeout=1) if serial_device is None else serial_device
         self.ser.close()
 
         self.bytes_to_read = 128
         ### ^ Number of bytes in message (i.e. channel bytes + header/tail bytes)
+        self.rx_buffer = FrameRingBuffer()
+        ### ^ Carries incomplete frames between reads
+        self.ring = None
+        ### ^ Sample ring filled by the acquisition thread, see `start_acquisition`
+        self.decimator = StreamFilter()
+        self.decimator.install_filters({"name": "decimate", "factor": 2})
+        ### ^ Keeps the anti-aliasing filter state between `live_read` calls
+        self.acquisition_thread = None
+        self.stop_event = threading.Event()
+        self.acquisition_error = None
+        ### ^ Exception that stopped the acquisition thread, raised again by `check_acquisition`
         self.mask = np.array([0, 2] + [0, 1] * 63)
         ### ^ Template mask for template matching on input data
         # self.channelMap = [10, 22, 12, 24, 13, 26, 7, 28, 1, 30, 59, 32, 53, 34, 48, 36] + \
@@ -69,8 +333,16 @@ class HDSensor(object):
         :return: None
         '''
         self.ser.reset_input_buffer()
+        self.rx_buffer.clear()
         return
 
+    def stats(self):
+        '''
+        Bytes consumed and frames decoded, recovered and dropped since the sensor was created.
+        :return: (dict) - loss counters
+        '''
+        return self.rx_buffer.stats()
+
     def close(self):
         self.ser.close()
         return
@@ -79,43 +351,46 @@ class HDSensor(object):
         self.ser.open()
         return
 
-    def read(self, readtime, feedback=False, savetxt=False, savepath=None):
+    def read_frames(self, n_bytes, feedback=False):
+        '''
+        Read bytes from the com port and decode every complete frame, incomplete frames are kept for the next call.
+        :param n_bytes: (int) - number of bytes to read
+        :param feedback: (bool) - print notice upon receiving corrupted data
+        :return: (numpy array) - (N, 64) remapped int16 samples
+        '''
+        dropped = self.rx_buffer.frames_dropped
+        samples = self.rx_buffer.feed(self.ser.read(n_bytes), self.channelMap)
+        if feedback and self.rx_buffer.frames_dropped > dropped:
+            print(f'Corrupted data. Dropped {self.rx_buffer.frames_dropped - dropped} packets.')
+        return samples
+
+    def read(self, readtime, feedback=False, savetxt=False, savepath=None, savebin=False):
         '''
         Read the incoming data in com port for a given time.
         :param readtime: (int) - reading time period (seconds)
         :param feedback: (bool) - print notice upon receiving corrupted data
         :param savetxt: (bool) - save read data to csv
-        :param savepath: (str) - path for saved data
-        :return: (list of lists) - list of channels' listed data points (e.g. 64xN for 64 channels of N data points)
+        :param savepath: (str) - path for saved data, the binary recording gets the .emgb extension so both can be
+                                 saved at once
+        :param savebin: (bool) - save read data to a binary recording (see utils/recording.py)
+        :return: (numpy array) - channels' data points (e.g. 64xN for 64 channels of N data points)
         '''
-        data = [[] for i in range(64)]
-
-        ### ^ 64 = n_channels
+        self.check_acquisition()
+        data = []
         self.open()
         self.clear_buffer()
 
         start_time = time.time()
         while (time.time() - start_time) < readtime:
-            data_packet = reorder(list(self.ser.read(self.bytes_to_read)), self.mask, 63)
-            if data_packet is not None:
-                samples = [int.from_bytes(bytes([data_packet[i * 2], data_packet[i * 2 + 1]]), 'big', signed=True) for i
-                           in range(64)]
-                ### ^ Iterating over byte pairs in line, 64 => n_channels, 2 bytes per ch.
-                for i, d in enumerate(data):
-                    d += [samples[i]]
-                    ### ^ Separating recorded data to respective channels
-            elif feedback:
-                print('Corrupted data. Dropped packet.')
-            else:
-                pass
+            data.append(self.read_frames(self.bytes_to_read, feedback))
         self.close()
-        data_remap = []
-        for i in self.channelMap:
-            data_remap += [data[i]]
-        #                 ### ^ Remapping data channels
+        data_remap = np.concatenate(data).T if data else np.zeros((64, 0), dtype=np.int16)
 
         if savetxt:
             np.savetxt(savepath, data_remap, delimiter=',', fmt='%s')
+        if savebin:
+            binpath = os.path.splitext(savepath)[0] + RECORDING_EXTENSION
+            save_recording(binpath, data_remap.T, data_remap.shape[1] / readtime, self.channelMap)
 
         return data_remap  # data_remap
 
@@ -126,17 +401,15 @@ class HDSensor(object):
         :return: (list) - containing the 64 samples (1 for each channel)
         '''
         # self.open()
+        self.check_acquisition()
         self.clear_buffer()
         while (True):
-            data_packet = reorder(list(self.ser.read(128)), self.mask, 63)
-            if data_packet is not None:
-                sample = [int.from_bytes(bytes([data_packet[i * 2], data_packet[i * 2 + 1]]), 'big', signed=True) for i
-                          in
-                          range(64)]  ### ^ Iterating over byte pairs in line, 32 => n_channels, 2 bytes per ch.
+            samples = self.rx_buffer.feed(self.ser.read(self.bytes_to_read))
+            if len(samples) > 0:
                 # sample = [sample[i] for i in self.channelMap]
                 #                             ### ^ Remapping data channels
                 # self.close()
-                return sample
+                return samples[0].tolist()
 
     def live_read(self, feedback=False, savetxt=False, savepath=None, firstTime=False, decimate=False):
         '''
@@ -145,39 +418,22 @@ class HDSensor(object):
         :param feedback: (bool) - print notice upon receiving corrupted data
         :param savetxt: (bool) - save read data to csv
         :param savepath: (str) - path for saved data
-        :return: (list of lists) - list of channels' listed data points (e.g. 64xN for 64 channels of N data points)
+        :return: (numpy array, int) - channels' data points (e.g. 64xN for 64 channels of N data points) and N
         '''
-        data = [[] for i in range(64)]
-        ### ^ 64 = n_channels
         if firstTime:
             self.open()
             self.clear_buffer()
+            self.decimator.reset()
             time.sleep(0.0005)
 
-        data_packet = None
-        while data_packet is None:
-            bytes_available = self.ser.inWaiting()
-            bytesToRead = bytes_available - (bytes_available % 128)
-            data_packet = reorder(list(self.ser.read(bytesToRead)), self.mask, 63)
-        for packet in data_packet:
-            samples = [int.from_bytes(bytes([packet[i * 2], packet[i * 2 + 1]]), 'big', signed=True) for i in range(64)]
-            for i, d in enumerate(data):
-                d += [samples[i]]
-        ### ^ Iterating over byte pairs in line, 64 => n_channels, 2 bytes per ch.
-        ### ^ Separating recorded data to respective channels
-        data_remap = []
-        if not decimate:
-            for i in self.channelMap:
-                data_remap += [data[i]]
-        #                 ### ^ Remapping data channels
-        else:
-            for i in self.channelMap:
-                print(len(data[i]))
-                data_remap += [signal.decimate(data[i], 2)]
-        # data_remap = signal.decimate(data_remap, 2)
-        # print("before:", len(data_remap[0]))
-        nb_pts = len(data_remap[0])
-        # print(len(data_remap[0]))
+        samples = None
+        while samples is None or len(samples) == 0:
+            samples = self.read_frames(self.ser.inWaiting(), feedback)
+        ### ^ Incomplete frames stay in the ring buffer until the next call
+        if decimate:
+            samples = self.decimator.filter(samples)
+        data_remap = samples.T
+        nb_pts = data_remap.shape[1]
         return data_remap, nb_pts  # data_remap
 
     def read_full_buffer(self, feedback=False, savetxt=False, savepath=None):
@@ -187,40 +443,76 @@ class HDSensor(object):
         :param feedback: (bool) - print notice upon receiving corrupted data
         :param savetxt: (bool) - save read data to csv
         :param savepath: (str) - path for saved data
-        :return: (list of lists) - list of channels' listed data points (e.g. 64xN for 64 channels of N data points)
+        :return: (numpy array) - Nx64 data points for 64 channels
         '''
         # Receives data
-        data = [[] for i in range(64)]
-
-        bytes_available = 0
-        data_packet = None
-        while data_packet is None:
-            while bytes_available < 1024:
-                bytes_available = self.ser.inWaiting()
-            # print("bytes available:", bytes_available)
-            bytesToRead = bytes_available - (bytes_available % 128)
-            data_packet = reorder(list(self.ser.read(bytesToRead)), self.mask, 63)
-
-        for packet in data_packet:
-            samples = [int.from_bytes(bytes([packet[i * 2], packet[i * 2 + 1]]), 'big', signed=True) for i in range(64)]
-            for i, d in enumerate(data):
-                d += [samples[i]]
-        ### ^ Iterating over byte pairs in line, 64 => n_channels, 2 bytes per ch.
-        ### ^ Separating recorded data to respective channels
-        data_remap = []
-        for i in self.channelMap:
-            data_remap += [data[i]]
-        #                 ### ^ Remapping data channels
-        # print("Out of func", np.transpose(np.array(data_remap)).dtype)
-        # print(len(data_remap[0]))
-        return np.transpose(np.array(data_remap))  # data_remap
+        samples = None
+        while samples is None or len(samples) == 0:
+            samples = self.read_frames(max(self.ser.inWaiting(), 1024), feedback)
+            ### ^ Blocking read of at least 1024 bytes (or until the port timeout) instead of polling inWaiting()
+        ### ^ Incomplete frames stay in the ring buffer until the next call
+        return samples  # data_remap
+
+    def start_acquisition(self, capacity=10000):
+        '''
+        Start a reader thread that decodes the com port stream into `self.ring`. Consumers then take views of the
+        latest samples with `self.ring.latest` or `self.ring.read_since` without touching the serial port.
+        :param capacity: (int) - number of samples kept in the ring
+        :return: (SampleRing) - the shared sample ring
+        '''
+        if self.acquisition_thread is not None and self.acquisition_thread.is_alive():
+            return self.ring
+        self.ring = SampleRing(capacity)
+        self.stop_event.clear()
+        self.acquisition_error = None
+        self.open()
+        self.clear_buffer()
+        self.acquisition_thread = threading.Thread(target=self._acquisition_loop, daemon=True)
+        self.acquisition_thread.start()
+        return self.ring
+
+    def stop_acquisition(self):
+        '''
+        Stop the reader thread and close the com port.
+        :return: None
+        '''
+        self.stop_event.set()
+        if self.acquisition_thread is not None:
+            self.acquisition_thread.join()
+            self.acquisition_thread = None
+        self.close()
+
+    def check_acquisition(self):
+        '''
+        Raise the exception that stopped the acquisition thread, if any. Ring readers call it to not keep waiting
+        for samples that will never come.
+        :return: None
+        '''
+        if self.acquisition_error is not None:
+            raise RuntimeError("HDSensor acquisition thread stopped") from self.acquisition_error
+
+    def _acquisition_loop(self):
+        try:
+            while not self.stop_event.is_set():
+                samples = self.read_frames(max(self.ser.inWaiting(), self.bytes_to_read))
+                ### ^ Blocks until a frame worth of bytes arrives or the port times out
+                self.ring.write(samples)
+        except Exception as e:
+            self.acquisition_error = e
+            self.stop_event.set()
+            print(f"HDSensor acquisition thread stopped: {e!r}")
+
+
 class RealTimeOscilloscope:
-    def __init__(self, num_signals, data_points, refresh_rate, sensor):
+    def __init__(self, num_signals, data_points, refresh_rate, sensor, acquisition=True):
         self.num_signals = num_signals
         self.data_points = data_points
         self.refresh_rate = refresh_rate
         self.sensor = sensor
         self.firstGo = True
+        self.acquisition = acquisition
+        ### ^ Read from the sensor acquisition thread instead of the serial port
+        self.ring_cursor = 0
 
         # Time axis
         self.t = np.linspace(0, 3, data_points)
@@ -234,8 +526,10 @@ class RealTimeOscilloscope:
         self.win.setBackground(QtGui.QColor(255, 255, 255))  # White background
         self.win.show()
 
-        # Initialize the data buffer
-        self.data = [np.zeros(data_points) for _ in range(num_signals)]
+        # Initialize the data buffer, written twice (at i and i + data_points) so the displayed window
+        # is always a contiguous view starting at the write cursor
+        self.data = np.zeros((num_signals, 2 * data_points))
+        self.write_cursor = 0
 
         # Plot layout
         num_rows = 16
@@ -250,8 +544,11 @@ class RealTimeOscilloscope:
             p.setYRange(-10000, 10000)
             p.getAxis('left').setStyle(showValues=False)
             p.getAxis('bottom').setStyle(showValues=False)
+            p.setClipToView(True)
+            p.setDownsampling(auto=True, mode='peak')
+            ### ^ Only draw what fits in the visible pixels
 
-            graph = p.plot(self.t, self.data[i], pen=pg.mkPen(color='r', width=2))
+            graph = p.plot(self.t, self.data[i, :data_points], pen=pg.mkPen(color='r', width=1))
             self.plots.append(graph)
 
         # Timer
@@ -261,17 +558,39 @@ class RealTimeOscilloscope:
         self.timer.start(1000 // refresh_rate)
 
     def update(self):
-        new_data, nb_pts = self.sensor.live_read(firstTime=self.firstGo, decimate=False)
+        if self.acquisition:
+            if self.firstGo:
+                self.sensor.start_acquisition(capacity=max(10 * self.data_points, 10000))
+                self.ring_cursor = self.sensor.ring.write_index
+            self.sensor.check_acquisition()
+            new_samples, self.ring_cursor, _ = self.sensor.ring.read_since(self.ring_cursor)
+            new_samples = new_samples[-self.data_points:]
+            new_data, nb_pts = new_samples.T, len(new_samples)
+        else:
+            new_data, nb_pts = self.sensor.live_read(firstTime=self.firstGo, decimate=False)
         self.firstGo = False
 
         if nb_pts > 0:
+            new_data = np.asarray(new_data)[:, -self.data_points:]
+            nb_pts = new_data.shape[1]
+            pos = self.write_cursor
+            first = min(nb_pts, self.data_points - pos)
+            rest = nb_pts - first
+            self.data[:, pos:pos + first] = new_data[:, :first]
+            self.data[:, pos + self.data_points:pos + self.data_points + first] = new_data[:, :first]
+            self.data[:, :rest] = new_data[:, first:]
+            self.data[:, self.data_points:self.data_points + rest] = new_data[:, first:]
+            self.write_cursor = (pos + nb_pts) % self.data_points
+
+            window = self.data[:, self.write_cursor:self.write_cursor + self.data_points]
             for i in range(self.num_signals):
-                self.data[i] = np.roll(self.data[i], -nb_pts)
-                self.data[i][-nb_pts:] = new_data[i]
-                self.plots[i].setData(self.t, self.data[i])
+                self.plots[i].setData(self.t, window[i], skipFiniteCheck=True)
 
     def run(self):
         self.app.exec()
+        if self.acquisition:
+            self.sensor.stop_acquisition()
+
 
 def find_port(vid, pid):
     ports = serial.tools.list_ports.comports()
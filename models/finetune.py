@@ -0,0 +1,178 @@
+import copy
+import time
+import threading
+import numpy as np
+import torch
+import torch.nn as nn
+from libemg.shared_memory_manager import SharedMemoryManager
+
+import models.models as etm
+
+### ONLINE FINE-TUNING ###
+#
+# A deployed model (the last one of the session, see config.get_model_path) is recalibrated on a few seconds of
+# labelled windows of the new session instead of being retrained: the statistics of `normalize` and of the
+# BatchNorms are estimated again on the new windows (they absorb electrode placement and gain changes), then only
+# the fc5 head is trained, on the fixed outputs of the other layers. The FineTuner thread runs beside the live
+# predictor, records the windows the classifier sees and publishes the new weights to the SharedWeights of its
+# InferenceEngine.
+
+NORMS = ["normalize", "bn1", "bn2", "bn3", "bn4"]
+
+
+def adapt_batchnorm(model, x):
+    """
+    Replace the running statistics of `normalize` and of the BatchNorms by the statistics of `x`, one forward pass
+    computes each of them after the previous ones were updated. BatchNorm weights and biases are kept.
+
+    Args:
+        model: EmagerCNN
+        x (torch.Tensor): features, more than one window
+    """
+    model.eval()
+    norms = [getattr(model, name) for name in NORMS]
+    momentum = [bn.momentum for bn in norms]
+    for bn in norms:
+        bn.reset_running_stats()
+        # Cumulative average: running statistics are the statistics of the batch
+        bn.momentum = None
+        bn.train()
+    with torch.no_grad():
+        model(x)
+    for bn, m in zip(norms, momentum):
+        bn.momentum = m
+    model.eval()
+
+
+def finetune(model, x, y, epochs: int = 200, lr: float = 1e-2, weight_decay: float = 1e-2):
+    """
+    Adapt a trained EmagerCNN to new windows: BatchNorm statistics (adapt_batchnorm), then the fc5 head trained
+    full batch on the outputs of the other layers. The model is modified in place.
+
+    Args:
+        model: trained, non quantized EmagerCNN
+        x (np.ndarray | torch.Tensor): features of shape (n_windows, n_features)
+        y (np.ndarray | torch.Tensor): labels of shape (n_windows,)
+        epochs (int): number of optimizer steps of the head
+        lr (float): AdamW learning rate
+        weight_decay (float): AdamW weight decay
+
+    Returns:
+        EmagerCNN: the model, in eval mode
+    """
+    x, y = etm.resident_tensors((x, y))
+    adapt_batchnorm(model, x)
+    with torch.no_grad():
+        embedding = model.embed(x)
+    head = model.fc5
+    optimizer = torch.optim.AdamW(head.parameters(), lr=lr, weight_decay=weight_decay)
+    loss_fn = nn.CrossEntropyLoss()
+    for _ in range(epochs):
+        loss = loss_fn(head(embedding), y)
+        optimizer.zero_grad(set_to_none=True)
+        loss.backward()
+        optimizer.step()
+    return model.eval()
+
+
+class FineTuner(threading.Thread):
+    def __init__(self, model, weights, smm_items: list, classes: list, seconds: float = 3.0, rest: float = 2.0,
+                 announce=print, save_path: str | None = None, poll: float = 0.25):
+        """
+        Guided recalibration beside the live predictor: each class is announced, held for `seconds` while the
+        windows the classifier sees (its `classifier_input` shared memory) are recorded, then the model is
+        fine-tuned (see finetune) and published to the InferenceEngine SharedWeights. The classifier keeps running
+        and switches to the new weights at its next prediction.
+
+        >>> weights = SharedWeights(model)
+        >>> oclassi = OnlineEMGClassifier(EMGClassifier(InferenceEngine(model, weights=weights)), ..., smm=True,
+        >>>                               smm_items=smm_items)
+        >>> oclassi.run(block=False)
+        >>> FineTuner(model, weights, smm_items, range(NUM_CLASSES)).start()
+
+        Args:
+            model: deployed EmagerCNN, not modified (a copy is fine-tuned)
+            weights (models.inference.SharedWeights): weights of the classifier InferenceEngine
+            smm_items (list): shared memory items given to the OnlineEMGClassifier, with their locks
+            classes (list): class indices to record, in order
+            seconds (float): recording time of each class
+            rest (float): time to get into position after each announcement
+            announce (callable): called with the message of each step
+            save_path (str): file the fine-tuned state dict is saved to, None to not save it
+            poll (float): time between two reads of the classifier inputs, less than the time the classifier takes
+                to fill its `classifier_input` buffer
+        """
+        super().__init__(daemon=True)
+        self.base = model
+        self.weights = weights
+        self.item = next(item for item in smm_items if item[0] == "classifier_input")
+        self.classes = list(classes)
+        self.seconds = seconds
+        self.rest = rest
+        self.announce = announce
+        self.save_path = save_path
+        self.poll = poll
+        self.stop_event = threading.Event()
+        self.model = None
+        self.features = None
+        self.labels = None
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _attach(self):
+        # The classifier process creates its shared memory when it starts
+        smm = SharedMemoryManager()
+        while not smm.find_variable(*self.item):
+            if self.stop_event.wait(self.poll):
+                return None
+        return smm
+
+    def record(self, smm, seconds: float) -> np.ndarray:
+        """
+        Args:
+            smm (SharedMemoryManager): manager holding `classifier_input`
+            seconds (float): recording time
+
+        Returns:
+            np.ndarray: (n_windows, n_features) classifier inputs of the next `seconds`, oldest first
+        """
+        last = smm.get_variable("classifier_input")[0, 0]
+        rows = []
+        end = time.monotonic() + seconds
+        while time.monotonic() < end and not self.stop_event.wait(self.poll):
+            data = smm.get_variable("classifier_input")
+            # Newest first, rows newer than the last read ones (empty rows have a zero timestamp)
+            new = data[data[:, 0] > last]
+            if len(new):
+                last = new[0, 0]
+                rows.append(new[::-1, 1:])
+        return np.concatenate(rows) if rows else np.empty((0, self.item[1][1] - 1))
+
+    def run(self):
+        smm = self._attach()
+        if smm is None:
+            return
+        try:
+            features, labels = [], []
+            for c in self.classes:
+                self.announce(f"Calibration: class {c} in {self.rest:g} s, hold it for {self.seconds:g} s")
+                if self.stop_event.wait(self.rest):
+                    return
+                windows = self.record(smm, self.seconds)
+                features.append(windows)
+                labels.append(np.full(len(windows), c, dtype=np.int64))
+            if self.stop_event.is_set():
+                return
+            self.features, self.labels = np.concatenate(features), np.concatenate(labels)
+
+            start = time.perf_counter()
+            self.model = finetune(copy.deepcopy(self.base), self.features, self.labels)
+            version = self.weights.publish(self.model)
+            self.announce(f"Calibration: {len(self.features)} windows, fine-tuned in "
+                          f"{time.perf_counter() - start:.2f} s, weights version {version} in use")
+            if self.save_path is not None:
+                torch.save(self.model.state_dict(), self.save_path)
+                self.announce(f"Calibration: model saved at {self.save_path}")
+        finally:
+            smm.cleanup(parent=False)
@@ -0,0 +1,304 @@
+import time
+import ctypes
+import warnings
+import multiprocessing
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+def _bn_affine(bn):
+    """
+    Affine form of a BatchNorm layer in eval mode: bn(x) = x * scale + shift.
+
+    Args:
+        bn (nn.BatchNorm1d | nn.BatchNorm2d): batch norm layer
+
+    Returns:
+        tuple[torch.Tensor, torch.Tensor]: per feature scale and shift
+    """
+    scale = torch.rsqrt(bn.running_var + bn.eps)
+    if bn.weight is not None:
+        scale = scale * bn.weight
+    shift = -bn.running_mean * scale
+    if bn.bias is not None:
+        shift = shift + bn.bias
+    return scale, shift
+
+
+def _fold_conv(conv, scale, shift, input_shape):
+    """
+    Fold a per input channel affine (the previous BatchNorm) into a zero padded convolution.
+    The shift is not constant near the borders (the padding is applied after the BatchNorm),
+    so it is folded in a per position bias map instead of the conv bias.
+
+    Returns:
+        tuple[torch.Tensor, torch.Tensor]: folded weight and bias map of shape (out_channels, *input_shape)
+    """
+    weight = conv.weight * scale[None, :, None, None]
+    bias_map = F.conv2d(shift[None, :, None, None].expand(1, -1, *input_shape), conv.weight,
+                        padding=conv.padding)[0]
+    if conv.bias is not None:
+        bias_map = bias_map + conv.bias[:, None, None]
+    return weight, bias_map
+
+
+class FoldedEmagerCNN(nn.Module):
+    def __init__(self, model):
+        """
+        Inference only EmagerCNN with every BatchNorm folded in the adjacent layers:
+        `normalize` becomes a single input affine, bn1-bn3 are folded in conv2, conv3 and fc4 and bn4 in fc5.
+        Dropout is dropped. The output is the softmax probabilities.
+
+        Parameters:
+            - model: trained, non quantized EmagerCNN
+        """
+        super().__init__()
+        if type(model.conv1) is not nn.Conv2d:
+            raise ValueError("Only the non quantized EmagerCNN can be folded")
+
+        self.input_shape = tuple(int(s) for s in model.input_shape)
+        with torch.no_grad():
+            in_scale, in_shift = _bn_affine(model.normalize)
+            s1, t1 = _bn_affine(model.bn1)
+            s2, t2 = _bn_affine(model.bn2)
+            s3, t3 = _bn_affine(model.bn3)
+            s4, t4 = _bn_affine(model.bn4)
+
+            conv2_w, conv2_b = _fold_conv(model.conv2, s1, t1, self.input_shape)
+            conv3_w, conv3_b = _fold_conv(model.conv3, s2, t2, self.input_shape)
+
+            n_pixels = int(np.prod(self.input_shape))
+            fc4_w = model.fc4.weight * s3.repeat_interleave(n_pixels)[None, :]
+            fc4_b = model.fc4.bias + model.fc4.weight @ t3.repeat_interleave(n_pixels)
+            fc5_w = model.fc5.weight * s4[None, :]
+            fc5_b = model.fc5.bias + model.fc5.weight @ t4
+
+        params = {
+            "in_scale": in_scale, "in_shift": in_shift,
+            "conv1_w": model.conv1.weight, "conv1_b": model.conv1.bias,
+            "conv2_w": conv2_w, "conv2_b": conv2_b,
+            "conv3_w": conv3_w, "conv3_b": conv3_b,
+            "fc4_w": fc4_w, "fc4_b": fc4_b,
+            "fc5_w": fc5_w, "fc5_b": fc5_b,
+        }
+        for name, value in params.items():
+            self.register_buffer(name, value.detach().clone().contiguous())
+        self.pad1 = int(model.conv1.padding[0])
+        self.pad2 = int(model.conv2.padding[0])
+        self.pad3 = int(model.conv3.padding[0])
+
+    def forward(self, x):
+        out = torch.addcmul(self.in_shift, x.reshape(x.size(0), -1), self.in_scale)
+        out = out.view(-1, 1, self.input_shape[0], self.input_shape[1])
+        out = F.relu(F.conv2d(out, self.conv1_w, self.conv1_b, padding=self.pad1))
+        out = F.relu(F.conv2d(out, self.conv2_w, padding=self.pad2) + self.conv2_b)
+        out = F.relu(F.conv2d(out, self.conv3_w, padding=self.pad3) + self.conv3_b)
+        out = F.relu(F.linear(out.flatten(1), self.fc4_w, self.fc4_b))
+        return F.softmax(F.linear(out, self.fc5_w, self.fc5_b), dim=1)
+
+
+class SharedWeights:
+    def __init__(self, model, ctx=None):
+        """
+        Folded EmagerCNN parameters in shared memory, to replace the weights of an InferenceEngine running in
+        another process (e.g. the OnlineEMGClassifier process) without restarting it.
+
+        The parameters are double buffered: `publish` writes the slot that is not in use and then increments the
+        version, whose parity gives the active slot. A reader copies the active slot and retries if the version
+        changed meanwhile, since the writer only overwrites a slot after having made the other one active.
+        There must be a single writer.
+
+        >>> weights = SharedWeights(model)
+        >>> classi = EMGClassifier(InferenceEngine(model, weights=weights))
+        >>> weights.publish(finetuned_model)  # from any process or thread, used from the next prediction
+
+        Parameters:
+            - model: trained, non quantized EmagerCNN, published as the initial weights
+            - ctx: multiprocessing context, default context if None
+        """
+        ctx = multiprocessing if ctx is None else ctx
+        folded = FoldedEmagerCNN(model)
+        self.layout = []
+        size = 0
+        for name, buffer in folded.named_buffers():
+            self.layout.append((name, tuple(buffer.shape), size))
+            size += buffer.numel()
+        self.size = size
+        self.raw = ctx.RawArray(ctypes.c_float, 2 * size)
+        self.raw_version = ctx.RawArray(ctypes.c_int64, 1)
+        self._views()
+        self._write(0, folded)
+
+    def _views(self):
+        self.slots = np.frombuffer(self.raw, dtype=np.float32).reshape(2, -1)
+        self._version = np.frombuffer(self.raw_version, dtype=np.int64)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["slots"], state["_version"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views()
+
+    @property
+    def version(self) -> int:
+        return int(self._version[0])
+
+    def _write(self, slot, folded):
+        buffers = dict(folded.named_buffers())
+        for name, shape, offset in self.layout:
+            self.slots[slot, offset:offset + int(np.prod(shape))] = buffers[name].detach().reshape(-1).numpy()
+
+    def publish(self, model) -> int:
+        """
+        Make the weights of `model` the active ones.
+
+        Parameters:
+            - model: EmagerCNN of the same shape as the initial one, or its FoldedEmagerCNN
+
+        Returns:
+            int: new version
+        """
+        folded = model if isinstance(model, FoldedEmagerCNN) else FoldedEmagerCNN(model.eval())
+        version = self.version
+        self._write((version + 1) % 2, folded)
+        self._version[0] = version + 1
+        return version + 1
+
+    def load_into(self, module) -> int:
+        """
+        Copy the active weights in the buffers of a FoldedEmagerCNN, or of its traced module.
+
+        Returns:
+            int: version of the copied weights
+        """
+        buffers = dict(module.named_buffers())
+        with torch.no_grad():
+            while True:
+                version = self.version
+                params = torch.from_numpy(self.slots[version % 2])
+                for name, shape, offset in self.layout:
+                    buffers[name].copy_(params[offset:offset + int(np.prod(shape))].view(shape))
+                if self.version == version:
+                    return version
+
+
+class InferenceEngine:
+    BACKENDS = ["eager", "torchscript", "compile"]
+
+    def __init__(self, model, backend="eager", max_batch=1, clock=None, weights=None):
+        """
+        CPU inference path for EmagerCNN, drop-in replacement of the model in `libemg.emg_predictor.EMGClassifier`.
+
+        The BatchNorms are folded (see FoldedEmagerCNN) and the graph is compiled once. Inputs are copied
+        into a reused float32 buffer instead of allocating and converting a new tensor on every call,
+        and any number of windows can be predicted in one call.
+
+        The engine can be sent to another process (OnlineEMGClassifier.run(block=False), spawn start method):
+        the torchscript or compiled graph is not pickled, it is built again by the first prediction.
+
+        Parameters:
+            - model: trained, non quantized EmagerCNN
+            - backend: "eager" (folded module only), "torchscript" (traced and frozen graph)
+              or "compile" (torch.compile, needs a working C++ compiler)
+            - max_batch: initial size of the input buffer, grown when a bigger batch is given
+            - clock: utils.tracing.BatchClock the time of every prediction is published to, None to disable
+            - weights: SharedWeights of `model`, checked before every prediction and copied in the graph when a new
+              version was published. The torchscript graph is then not frozen (freezing inlines the weights).
+
+        Example:
+        >>> engine = InferenceEngine(model)
+        >>> classi = EMGClassifier(engine)
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend {backend}, expected one of {self.BACKENDS}")
+        model.eval()
+        self.backend = backend
+        self.clock = None
+        self.input_shape = tuple(int(s) for s in model.input_shape)
+        self.n_features = int(np.prod(self.input_shape))
+        self.folded = FoldedEmagerCNN(model).eval()
+        self.weights = weights
+        self.version = None if weights is None else weights.load_into(self.folded)
+
+        self.module = None
+        self.buffer = torch.empty((0, self.n_features))
+        self._reserve(max_batch)
+        self._build()
+        self.clock = clock
+
+    def _build(self):
+        example = torch.zeros((max(len(self.buffer), 1), self.n_features))
+        if self.backend == "torchscript":
+            # torch.jit is deprecated but still the fastest single window path, its warnings are not the user's
+            with warnings.catch_warnings(), torch.inference_mode(False), torch.no_grad():
+                warnings.simplefilter("ignore", FutureWarning)
+                traced = torch.jit.trace(self.folded, example)
+                # optimize_for_inference is not used, its MKLDNN conversions make single window calls slower
+                self.module = traced.eval() if self.weights is not None else torch.jit.freeze(traced.eval())
+        elif self.backend == "compile":
+            self.module = torch.compile(self.folded, dynamic=True)
+        else:
+            self.module = self.folded
+        # Warm up, the first calls of a compiled graph are much slower
+        clock, self.clock = self.clock, None
+        for _ in range(3):
+            self._predict_proba(example.numpy())
+        self.clock = clock
+
+    def __getstate__(self):
+        # ScriptModules of a traced Python module and compiled modules cannot be pickled
+        state = self.__dict__.copy()
+        if self.backend != "eager":
+            state["module"] = None
+        return state
+
+    def _reserve(self, batch_size):
+        if batch_size > len(self.buffer):
+            self.buffer = torch.empty((batch_size, self.n_features), dtype=torch.float32,
+                                      pin_memory=torch.cuda.is_available())
+
+    def convert_input(self, x):
+        """
+        Copy the windows in the input buffer.
+
+        Args:
+            x (np.ndarray | torch.Tensor): windows of shape (n_windows, *input_shape) or (n_windows, n_features)
+
+        Returns:
+            torch.Tensor: float32 view of the input buffer
+        """
+        if not isinstance(x, torch.Tensor):
+            x = torch.from_numpy(np.asarray(x))
+        x = x.reshape(-1, self.n_features)
+        self._reserve(len(x))
+        buffer = self.buffer[:len(x)]
+        buffer.copy_(x)
+        return buffer
+
+    def predict_proba(self, x):
+        if self.clock is None:
+            return self._predict_proba(x)
+        start = time.monotonic_ns()
+        probabilities = self._predict_proba(x)
+        self.clock.output(start, time.monotonic_ns())
+        return probabilities
+
+    def _predict_proba(self, x):
+        if self.module is None:
+            # Unpickled in another process, the shared weights are copied again in the new graph
+            self._build()
+            self.version = None if self.weights is None else self.weights.load_into(self.module)
+        if self.weights is not None and self.weights.version != self.version:
+            # Between two predictions, a prediction never mixes old and new weights
+            self.version = self.weights.load_into(self.module)
+        x = self.convert_input(x)
+        with torch.inference_mode():
+            return self.module(x).numpy()
+
+    def predict(self, x):
+        return np.argmax(self.predict_proba(x), axis=1)
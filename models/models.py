@@ -2,6 +2,7 @@ import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.utils.data import DataLoader, TensorDataset
 
 import lightning as L
 from lightning.pytorch.callbacks.early_stopping import EarlyStopping
@@ -11,6 +12,40 @@ import brevitas.nn as qnn
 from sklearn.metrics import accuracy_score
 
 
+def as_dataloader(data, batch_size, shuffle, num_workers=0):
+    """Wrap a Dataset in a DataLoader, DataLoaders and None are returned as is."""
+    if data is None or isinstance(data, DataLoader):
+        return data
+    return DataLoader(data, batch_size=batch_size, shuffle=shuffle, num_workers=num_workers,
+                      persistent_workers=num_workers > 0)
+
+
+def resident_tensors(data):
+    """Whole dataset as a (float32 features, int64 labels) pair of tensors.
+
+    Args:
+        data: (features, labels) arrays or tensors, TensorDataset, other Dataset (loaded once), or a DataLoader of one
+
+    Returns:
+        tuple[torch.Tensor, torch.Tensor]: features and labels, None if data is None
+    """
+    if data is None:
+        return None
+    if isinstance(data, (tuple, list)):
+        x, y = data
+    else:
+        dataset = data.dataset if isinstance(data, DataLoader) else data
+        if isinstance(dataset, TensorDataset):
+            x, y = dataset.tensors
+        else:
+            batches = list(DataLoader(dataset, batch_size=4096))
+            x, y = torch.cat([b[0] for b in batches]), torch.cat([b[1] for b in batches])
+    if not isinstance(x, torch.Tensor):
+        # Copied, memory-mapped features are read-only
+        x, y = torch.from_numpy(np.array(x, dtype=np.float32)), torch.from_numpy(np.array(y, dtype=np.int64))
+    return x.float(), y.long()
+
+
 class EmagerCNN(L.LightningModule):
     def __init__(self, input_shape, num_classes, quantization=-1):
         """
@@ -95,7 +130,8 @@ class EmagerCNN(L.LightningModule):
                 weight_bit_width=quantization,
             )
 
-    def forward(self, x):
+    def embed(self, x):
+        """Output of every layer but the fc5 head."""
         x = self.normalize(x.view(x.size(0), -1))
         x = x.view(-1, 1, *self.input_shape)
         out = self.inp(x)
@@ -103,8 +139,10 @@ class EmagerCNN(L.LightningModule):
         out = self.bn2(self.relu2(self.conv2(out)))
         out = self.bn3(self.relu3(self.conv3(out)))
         out = self.flat(out)
-        out = self.bn4(self.relu4(self.dropout4(self.fc4(out))))
-        logits = self.fc5(out)
+        return self.bn4(self.relu4(self.dropout4(self.fc4(out))))
+
+    def forward(self, x):
+        logits = self.fc5(self.embed(x))
         return logits
 
     def training_step(self, batch, batch_idx):
@@ -165,12 +203,30 @@ class EmagerCNN(L.LightningModule):
     def predict(self, x):
         return np.argmax(self.predict_proba(x), axis=1)
 
-    def fit(self, train_dataloader, test_dataloader=None, max_epochs=10):
+    def fit(self, train_dataloader, test_dataloader=None, max_epochs=10, batch_size=64, num_workers=0,
+            **trainer_kwargs):
+        """Train with Lightning and test the model.
+
+        Args:
+            train_dataloader: DataLoader, or Dataset (e.g. utils.window_dataset.WindowDataset) loaded in shuffled
+                batches of `batch_size` by `num_workers` worker processes
+            test_dataloader: DataLoader or Dataset, None to skip the test
+            max_epochs (int): maximum number of epochs
+            batch_size (int): batch size of the Dataset inputs
+            num_workers (int): number of DataLoader worker processes of the Dataset inputs
+            **trainer_kwargs: other lightning.Trainer arguments (e.g. enable_progress_bar=False, logger=False)
+
+        Returns:
+            list: test metrics, None without test data
+        """
+        train_dataloader = as_dataloader(train_dataloader, batch_size, True, num_workers)
+        test_dataloader = as_dataloader(test_dataloader, 4 * batch_size, False, num_workers)
 
         self.train()
         trainer = L.Trainer(
             max_epochs=max_epochs,
             callbacks=[EarlyStopping(monitor="train_loss", min_delta=0.0005)],
+            **trainer_kwargs,
         )
         trainer.fit(self, train_dataloader)
         res = None
@@ -179,6 +235,94 @@ class EmagerCNN(L.LightningModule):
 
         return res
 
+    def evaluate(self, x, y, batch_size=4096):
+        """Accuracy and mean loss of resident tensors, in eval mode.
+
+        Args:
+            x (torch.Tensor): features
+            y (torch.Tensor): labels
+            batch_size (int): number of windows per forward pass
+
+        Returns:
+            tuple[float, float]: accuracy and loss
+        """
+        self.eval()
+        correct, loss = 0, 0.0
+        with torch.no_grad():
+            for start in range(0, len(x), batch_size):
+                logits = self(x[start:start + batch_size])
+                loss += self.loss(logits, y[start:start + batch_size]).item() * len(logits)
+                correct += (logits.argmax(dim=1) == y[start:start + batch_size]).sum().item()
+        return correct / len(x), loss / len(x)
+
+    def fit_fast(self, train_data, test_data=None, max_epochs=100, batch_size=256, lr=2e-3, val_fraction=0.1,
+                 patience=2, min_delta=0.0005, seed=0):
+        """Train without Lightning: hand-written loop on resident tensors, large batches and a fused AdamW step.
+        A random `val_fraction` of the training windows is held out, training stops when its accuracy has not
+        improved for `patience` epochs and the best weights (best accuracy, then lowest loss) are restored.
+
+        Args:
+            train_data: training data, anything accepted by resident_tensors (the whole dataset is loaded in memory)
+            test_data: test data, None to skip the test
+            max_epochs (int): maximum number of epochs
+            batch_size (int): batch size
+            lr (float): AdamW learning rate
+            val_fraction (float): fraction of the training windows held out for early stopping, 0 to train for
+                max_epochs on all of them
+            patience (int): epochs without improvement of the held-out accuracy before stopping
+            min_delta (float): minimum decrease of the held-out loss for weights of equal accuracy to be kept
+            seed (int): seed of the split and of the batch order
+
+        Returns:
+            list: test metrics like fit ([{"test_acc": ..., "test_loss": ...}]), None without test data
+        """
+        x, y = (t.to(self.device) for t in resident_tensors(train_data))
+        generator = torch.Generator().manual_seed(seed)
+        order = torch.randperm(len(x), generator=generator)
+        n_val = int(len(x) * val_fraction)
+        x_val, y_val = x[order[:n_val]], y[order[:n_val]]
+        x, y = x[order[n_val:]], y[order[n_val:]]
+
+        try:
+            optimizer = torch.optim.AdamW(self.parameters(), lr=lr, fused=True)
+        except RuntimeError:
+            # Fused kernels are not available for every device and dtype
+            optimizer = torch.optim.AdamW(self.parameters(), lr=lr, foreach=True)
+
+        best, best_state, wait = (-1.0, float("inf")), None, 0
+        for _ in range(max_epochs):
+            self.train()
+            order = torch.randperm(len(x), generator=generator).to(self.device)
+            for start in range(0, len(x), batch_size):
+                batch = order[start:start + batch_size]
+                if len(batch) < 2:
+                    # BatchNorm needs more than one window in training mode
+                    continue
+                loss = self.loss(self(x[batch]), y[batch])
+                optimizer.zero_grad(set_to_none=True)
+                loss.backward()
+                optimizer.step()
+
+            if not n_val:
+                continue
+            val_acc, val_loss = self.evaluate(x_val, y_val)
+            if val_acc > best[0] or val_acc == best[0] and val_loss < best[1] - min_delta:
+                wait = 0 if val_acc > best[0] else wait + 1
+                best = (val_acc, val_loss)
+                best_state = {k: v.detach().clone() for k, v in self.state_dict().items()}
+            else:
+                wait += 1
+            if wait >= patience:
+                break
+
+        if best_state is not None:
+            self.load_state_dict(best_state)
+        self.eval()
+        if test_data is None:
+            return None
+        acc, loss = self.evaluate(*(t.to(self.device) for t in resident_tensors(test_data)))
+        return [{"test_acc": acc, "test_loss": loss}]
+
 
 class EmagerSCNN(L.LightningModule):
     def __init__(self, input_shape, quantization=-1):
@@ -0,0 +1,267 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    # Optional: torch._int_mm is a int8 x int8 -> int32 matrix product with the CPU VNNI/AVX512 kernels
+    import torch
+except ImportError:
+    torch = None
+
+# Integer inference of a trained quantized EmagerCNN (EmagerCNN(..., quantization=N)) with NumPy only.
+#
+# Every layer works on integer activations with a per tensor scale:
+#   - input    : normalize BatchNorm (float affine) then the QuantIdentity int8 quantization
+#   - conv/fc  : integer weights * integer activations, int32 accumulator + integer bias
+#   - relu     : requantization of the accumulator to the QuantReLU N bits levels with a fixed point multiplier
+#   - bn       : the BatchNorm after each ReLU only sees 2^N levels per channel, so BatchNorm + requantization
+#                to the int8 input of the next layer is a (channels, 2^N) lookup table
+#   - fc5      : accumulator * scale + bias, softmax
+# Activations are kept channels last (batch, height, width, channels).
+#
+# The only difference with the Brevitas model is the int8 quantization of the BatchNorm outputs, which Brevitas
+# feeds as floats to the next layer. Weights stay resident as int8 (int4 weights are packed in the file only) and
+# the matrix products multiply int8 by int8 into an int32 accumulator: torch._int_mm when torch is installed,
+# NumPy integer matmul otherwise.
+
+LAYERS = ["conv1", "conv2", "conv3", "fc4", "fc5"]
+NORMS = {"conv1": "bn1", "conv2": "bn2", "conv3": "bn3", "fc4": "bn4"}
+ACTIVATIONS = {"conv1": "relu1", "conv2": "relu2", "conv3": "relu3", "fc4": "relu4"}
+
+
+def pack_int4(values: np.ndarray) -> np.ndarray:
+    """
+    :param values: np.ndarray of int8 values in [-8, 7]
+    :return: np.ndarray of uint8, two values per byte (low nibble first)
+    """
+    flat = values.astype(np.int8).reshape(-1)
+    if len(flat) % 2:
+        flat = np.append(flat, np.int8(0))
+    nibbles = flat.view(np.uint8) & 0x0F
+    return nibbles[0::2] | (nibbles[1::2] << 4)
+
+
+def unpack_int4(packed: np.ndarray, shape: tuple) -> np.ndarray:
+    """
+    :param packed: np.ndarray of uint8 from `pack_int4`
+    :param shape: shape of the unpacked values
+    :return: np.ndarray of int8
+    """
+    packed = packed.view(np.int8)
+    values = np.empty(2 * len(packed), dtype=np.int8)
+    values[0::2] = (packed << 4) >> 4
+    values[1::2] = packed >> 4
+    return values[:int(np.prod(shape))].reshape(shape)
+
+
+def fixed_point(multiplier: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    :param multiplier: np.ndarray of positive floats
+    :return: integer multipliers in [2^30, 2^31) and shifts so that multiplier ~= m * 2^-shift
+    """
+    multiplier = np.asarray(multiplier, dtype=np.float64)
+    shift = 30 - np.floor(np.log2(multiplier)).astype(np.int64)
+    m = np.round(multiplier * np.exp2(shift)).astype(np.int64)
+    return m, shift
+
+
+def _affine(bn):
+    scale = (bn.weight / (bn.running_var + bn.eps).sqrt()).detach().numpy().astype(np.float64)
+    shift = bn.bias.detach().numpy() - bn.running_mean.numpy() * scale
+    return scale, shift
+
+
+def _scalar(tensor) -> float:
+    return float(tensor.detach().reshape(-1)[0])
+
+
+def export_quantized(model) -> dict:
+    """
+    Export a trained quantized EmagerCNN to NumPy arrays. Needs torch and brevitas, the exported model does not.
+
+    :param model: EmagerCNN built with 0 < quantization < 32
+    :return: dict of np.ndarray, see QuantizedEmagerCNN
+
+    Example:
+    >>> qmodel = QuantizedEmagerCNN(export_quantized(model))
+    >>> qmodel.save("model_int4.npz")
+    """
+    import torch
+
+    if not hasattr(model.conv1, "quant_weight"):
+        raise ValueError("Only a quantized EmagerCNN (0 < quantization < 32) can be exported")
+    model.eval()
+    height, width = (int(s) for s in model.input_shape)
+    params = {"input_shape": np.array([height, width])}
+
+    with torch.no_grad():
+        params["in_scale"], params["in_shift"] = _affine(model.normalize)
+        act = model.inp.act_quant
+        in_bits = int(_scalar(act.bit_width()))
+        params["in_quant"] = np.array([_scalar(act.scale()), -(2 ** (in_bits - 1)) + int(act.is_narrow_range),
+                                       2 ** (in_bits - 1) - 1])
+        x_scale = params["in_quant"][0]
+
+        for name in LAYERS:
+            layer = getattr(model, name)
+            qweight = layer.quant_weight()
+            weight = qweight.int().numpy().astype(np.int8)
+            w_bits = int(_scalar(qweight.bit_width))
+            w_scale = np.broadcast_to(qweight.scale.detach().numpy().reshape(-1), (weight.shape[0],)).astype(np.float64)
+            if weight.ndim == 4:
+                params[f"{name}.padding"] = np.array(layer.padding)
+                # (out, in, kh, kw) -> (out, kh, kw, in) to match the channels last im2col
+                weight = weight.transpose(0, 2, 3, 1)
+            elif name == "fc4":
+                # (out, channels * height * width) -> (out, height * width * channels)
+                weight = weight.reshape(len(weight), -1, height, width).transpose(0, 2, 3, 1)
+            params[f"{name}.shape"] = np.array(weight.shape)
+            params[f"{name}.bits"] = np.array(w_bits)
+            params[f"{name}.weight"] = pack_int4(weight) if w_bits <= 4 else weight.reshape(-1)
+
+            acc_scale = x_scale * w_scale
+            bias = layer.bias.detach().numpy().astype(np.float64) if layer.bias is not None else np.zeros(len(weight))
+            if name == "fc5":
+                params["fc5.scale"] = acc_scale
+                params["fc5.bias"] = bias
+                break
+
+            relu = getattr(model, ACTIVATIONS[name]).act_quant
+            r_scale = _scalar(relu.scale())
+            r_max = 2 ** int(_scalar(relu.bit_width())) - 1
+            params[f"{name}.bias"] = np.round(bias / acc_scale).astype(np.int64)
+            params[f"{name}.multiplier"], params[f"{name}.shift"] = fixed_point(acc_scale / r_scale)
+            params[f"{name}.qmax"] = np.array(r_max)
+
+            # BatchNorm of the relu levels, requantized to int8 with the exact range of the lookup table
+            bn_scale, bn_shift = _affine(getattr(model, NORMS[name]))
+            levels = bn_scale[:, None] * (np.arange(r_max + 1) * r_scale)[None, :] + bn_shift[:, None]
+            x_scale = max(np.abs(levels).max(), 1e-12) / 127
+            params[f"{name}.lut"] = np.clip(np.round(levels / x_scale), -127, 127).astype(np.int8)
+    return params
+
+
+class QuantizedEmagerCNN:
+    def __init__(self, params: dict):
+        """
+        Integer inference of an exported quantized EmagerCNN, needs NumPy only (torch makes the matrix products
+        faster when it is installed). Drop-in replacement of the model in `libemg.emg_predictor.EMGClassifier`.
+
+        :param params: dict of np.ndarray from `export_quantized` or `QuantizedEmagerCNN.load`
+        """
+        self.params = {k: np.asarray(v) for k, v in params.items()}
+        self.input_shape = tuple(int(s) for s in self.params["input_shape"])
+        self.in_scale = self.params["in_scale"].astype(np.float32)
+        self.in_shift = self.params["in_shift"].astype(np.float32)
+        self.in_quant = self.params["in_quant"]
+        self.weights = {}
+        self.requant = {}
+        x_max = max(-self.in_quant[1], self.in_quant[2])
+        for name in LAYERS:
+            shape = tuple(self.params[f"{name}.shape"])
+            weight = self.params[f"{name}.weight"]
+            weight = unpack_int4(weight, shape) if int(self.params[f"{name}.bits"]) <= 4 else weight.reshape(shape)
+            acc_max = np.abs(weight.reshape(shape[0], -1).astype(np.int64)).sum(axis=1).max() * x_max
+            if acc_max >= 2 ** 31:
+                raise ValueError(f"The {name} accumulator can overflow int32 ({acc_max})")
+            # (in, out) int8, the layout of the matrix products
+            self.weights[name] = np.ascontiguousarray(weight.reshape(shape[0], -1).T, dtype=np.int8)
+            if name != "fc5":
+                lut = self.params[f"{name}.lut"]
+                multiplier = self.params[f"{name}.multiplier"].astype(np.int64)
+                shift = self.params[f"{name}.shift"].astype(np.int64)
+                # Bias and rounding folded in one addend, flat lookup table indexed by level + offset of the channel
+                addend = self.params[f"{name}.bias"].astype(np.int64) * multiplier + (np.int64(1) << (shift - 1))
+                self.requant[name] = (multiplier, addend, shift, int(self.params[f"{name}.qmax"]), lut.reshape(-1),
+                                      np.arange(lut.shape[0], dtype=np.int64) * lut.shape[1])
+                x_max = 127
+        self._torch_weights = None if torch is None else {k: torch.from_numpy(w) for k, w in self.weights.items()}
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as f:
+            return cls(dict(f))
+
+    def save(self, path: str):
+        np.savez(path, **self.params)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the exported parameters in bytes (packed weights, scales and lookup tables)."""
+        return sum(v.nbytes for v in self.params.values())
+
+    @property
+    def resident_nbytes(self) -> int:
+        """Size in bytes of the int8 weights and lookup tables used by the inference."""
+        return sum(w.nbytes for w in self.weights.values()) + sum(r[4].nbytes for r in self.requant.values())
+
+    def _matmul(self, name, x):
+        """int8 (n, in) activations x int8 (in, out) weights -> int32 accumulator."""
+        if self._torch_weights is not None:
+            return torch._int_mm(torch.from_numpy(x), self._torch_weights[name]).numpy()
+        return np.matmul(x, self.weights[name], dtype=np.int32)
+
+    def _conv(self, name, x):
+        kh, kw = (int(s) for s in self.params[f"{name}.shape"][1:3])
+        ph, pw = (int(p) for p in self.params[f"{name}.padding"])
+        x = np.pad(x, ((0, 0), (ph, ph), (pw, pw), (0, 0)))
+        cols = sliding_window_view(x, (kh, kw), axis=(1, 2))
+        batch, height, width = cols.shape[:3]
+        # (batch, height, width, in, kh, kw) -> (batch * height * width, kh * kw * in), one int8 copy
+        cols = cols.transpose(0, 1, 2, 4, 5, 3).reshape(batch * height * width, -1)
+        acc = self._matmul(name, cols)
+        return self._requantize(name, acc).reshape(batch, height, width, -1)
+
+    def _requantize(self, name, acc):
+        """Accumulator -> relu levels -> BatchNorm lookup table, int8 input of the next layer."""
+        multiplier, addend, shift, qmax, lut, offsets = self.requant[name]
+        # (acc + bias) * multiplier rounded >> shift, in place on the int64 product
+        levels = np.multiply(acc, multiplier)
+        levels += addend
+        levels >>= shift
+        np.clip(levels, 0, qmax, out=levels)
+        levels += offsets
+        return lut[levels]
+
+    def quantize_input(self, x: np.ndarray) -> np.ndarray:
+        """
+        :param x: np.ndarray of shape (n_windows, *input_shape) or (n_windows, height * width)
+        :return: np.ndarray of int8, (n_windows, height, width, 1)
+        """
+        x = np.asarray(x, dtype=np.float32).reshape(len(x), -1) * self.in_scale + self.in_shift
+        x = np.clip(np.round(x / self.in_quant[0]), self.in_quant[1], self.in_quant[2])
+        return x.astype(np.int8).reshape(len(x), *self.input_shape, 1)
+
+    def logits(self, x: np.ndarray) -> np.ndarray:
+        out = self.quantize_input(x)
+        for name in ["conv1", "conv2", "conv3"]:
+            out = self._conv(name, out)
+        out = self._requantize("fc4", self._matmul("fc4", out.reshape(len(out), -1)))
+        acc = self._matmul("fc5", out)
+        return acc * self.params["fc5.scale"] + self.params["fc5.bias"]
+
+    def predict_proba(self, x: np.ndarray) -> np.ndarray:
+        logits = self.logits(x)
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return (exp / exp.sum(axis=1, keepdims=True)).astype(np.float32)
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        return np.argmax(self.logits(x), axis=1)
+
+
+if __name__ == "__main__":
+    import argparse
+    import torch
+    import models.models as etm
+
+    parser = argparse.ArgumentParser(description="Export a trained quantized EmagerCNN to NumPy integer inference")
+    parser.add_argument("model", help="state dict saved by libemg_train_cnn.py")
+    parser.add_argument("output", help="output .npz file")
+    parser.add_argument("--classes", type=int, required=True)
+    parser.add_argument("--bits", type=int, required=True, help="quantization bit width of the model")
+    args = parser.parse_args()
+
+    model = etm.EmagerCNN((4, 16), args.classes, args.bits)
+    model.load_state_dict(torch.load(args.model))
+    qmodel = QuantizedEmagerCNN(export_quantized(model))
+    qmodel.save(args.output)
+    print(f"Exported {args.model} -> {args.output} ({qmodel.nbytes / 1024:.1f} kB)")
@@ -0,0 +1,264 @@
+import csv
+import time
+import logging
+import warnings
+import itertools
+import multiprocessing
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+import models.models as etm
+from utils.majority_vote import majority_vote
+from utils.training_data import load_sessions
+
+### CROSS-VALIDATION AND HYPERPARAMETER SWEEP ###
+#
+# The features of every (window size, window increment) are computed once by load_sessions and cached in a .npy
+# file, every trial of the pool opens it memory-mapped instead of receiving a copy. A trial is one point of the grid
+# trained on all the reps but one and tested on the held-out rep (leave-one-rep-out). The majority vote only changes
+# the evaluation, so every trial scores all the vote lengths. Model size and per-window latency are measured
+# afterwards in the parent, one model at a time, so concurrent trials do not skew the timings.
+
+COLUMNS = ["window_size", "window_increment", "quantization", "majority_vote", "folds", "accuracy", "accuracy_std",
+           "size_kb", "latency_ms", "train_s"]
+
+# Per worker process: features opened by the previous trials
+_features = {}
+
+
+def _init_worker():
+    # Trials already run in parallel, intra-op threads would only compete for the cores
+    torch.set_num_threads(1)
+    logging.getLogger("lightning.pytorch").setLevel(logging.ERROR)
+    warnings.filterwarnings("ignore", ".*does not have many workers.*")
+    warnings.filterwarnings("ignore", ".*no `val_dataloader`.*")
+
+
+def is_quantized(model):
+    return hasattr(model.conv1, "quant_weight")
+
+
+def segment_votes(predictions, meta, n_votes):
+    """
+    Majority vote of the predictions of each recording segment, the vote is reset between segments
+    like it would between two gestures of a live session.
+
+    Args:
+        predictions (np.ndarray): predicted label of every window
+        meta (dict): "classes", "reps" and "sessions" of every window (see load_sessions)
+        n_votes (int): length of the majority vote, 1 for none
+
+    Returns:
+        np.ndarray: voted labels
+    """
+    if n_votes <= 1:
+        return predictions
+    keys = np.stack([meta["sessions"], meta["reps"], meta["classes"]])
+    bounds = np.concatenate(([0], np.flatnonzero(np.any(np.diff(keys, axis=1), axis=0)) + 1, [len(predictions)]))
+    return np.concatenate([majority_vote(predictions[a:b], n_votes) for a, b in zip(bounds[:-1], bounds[1:])])
+
+
+def _trial(task):
+    """Train one grid point on all the reps but one and score it on the held-out rep, in a worker."""
+    path, meta, params, fold, settings = task
+    if path not in _features:
+        _features[path] = np.load(path, mmap_mode="r")
+    features = _features[path]
+    train, test = meta["reps"] != fold, meta["reps"] == fold
+
+    torch.manual_seed(settings["seed"] + fold)
+    n_channels = features.shape[1]
+    model = etm.EmagerCNN((4, n_channels // 4), settings["num_classes"], params["quantization"])
+    train_dl = DataLoader(TensorDataset(torch.from_numpy(features[train].astype(np.float32)),
+                                        torch.from_numpy(meta["classes"][train])),
+                          batch_size=settings["batch_size"], shuffle=True)
+    start = time.perf_counter()
+    model.fit(train_dl, max_epochs=settings["epochs"], accelerator="cpu", devices=1, enable_progress_bar=False,
+              enable_model_summary=False, enable_checkpointing=False, logger=False)
+    train_s = time.perf_counter() - start
+
+    model.eval()
+    predictions = model.predict(features[test])
+    test_meta = {k: v[test] for k, v in meta.items()}
+    accuracy = {n: float(np.mean(segment_votes(predictions, test_meta, n) == test_meta["classes"]))
+                for n in settings["majority_votes"]}
+    return accuracy, train_s, model.state_dict()
+
+
+def model_size(model) -> int:
+    """
+    Args:
+        model: trained EmagerCNN
+
+    Returns:
+        int: bytes of the deployed model, the NumPy integer model (models/quantized.py) when quantized,
+            the float32 state dict otherwise
+    """
+    if is_quantized(model):
+        from models.quantized import QuantizedEmagerCNN, export_quantized
+        return QuantizedEmagerCNN(export_quantized(model)).nbytes
+    return sum(t.numel() * t.element_size() for t in model.state_dict().values())
+
+
+def measure_latency(model, window_size, n_channels, repeats=200) -> float:
+    """
+    Median time to predict one window on the deployment path: MAV of the raw window, then InferenceEngine
+    (float models) or QuantizedEmagerCNN (quantized models).
+
+    Args:
+        model: trained EmagerCNN
+        window_size (int): number of samples in a window
+        n_channels (int): number of EMG channels
+        repeats (int): number of timed predictions
+
+    Returns:
+        float: median per-window latency in ms
+    """
+    if is_quantized(model):
+        from models.quantized import QuantizedEmagerCNN, export_quantized
+        predictor = QuantizedEmagerCNN(export_quantized(model))
+    else:
+        from models.inference import InferenceEngine
+        predictor = InferenceEngine(model)
+    window = np.random.default_rng(0).normal(0, 1000, (window_size, n_channels))
+    times = []
+    for i in range(repeats + 10):
+        start = time.perf_counter()
+        predictor.predict_proba(np.abs(window).mean(axis=0, keepdims=True))
+        if i >= 10:
+            times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1e3)
+
+
+def run_sweep(folders: list[str], window_sizes: list[int], window_increments: list[int], quantizations: list[int],
+              majority_votes: list[int], num_classes: int, sampling: float | None = None, filters: list | None = None,
+              reps: list | None = None, epochs: int = 10, batch_size: int = 64, cache_folder: str = ".cache/",
+              workers: int | None = None, seed: int = 0) -> list[dict]:
+    """
+    Leave-one-rep-out cross-validation of every combination of the grid, trials run in a process pool.
+
+    Args:
+        folders (list[str]): session folders (see utils.training_data.find_sessions)
+        window_sizes (list[int]): window sizes in samples
+        window_increments (list[int]): window increments in samples
+        quantizations (list[int]): EmagerCNN bit-widths, -1 for the float model
+        majority_votes (list[int]): majority vote lengths, 1 for none
+        num_classes (int): number of classes, class indices 0 to num_classes - 1 are used
+        sampling (float): sampling frequency in Hz, only needed for notch and band filters
+        filters (list): StreamFilter filter dictionaries
+        reps (list[int]): reps used, each one is held out once, None for all of them
+        epochs (int): maximum number of epochs of a trial
+        batch_size (int): training batch size
+        cache_folder (str): folder of the cached features
+        workers (int): number of trials run at once, os.cpu_count() if None
+        seed (int): torch seed of the trials, offset by the held-out rep
+
+    Returns:
+        list[dict]: one row per grid point and majority vote length (see COLUMNS), accuracy and training time
+            averaged over the folds, best accuracy first
+    """
+    settings = {"num_classes": num_classes, "epochs": epochs, "batch_size": batch_size,
+                "majority_votes": sorted(set(majority_votes)), "seed": seed}
+    datasets = {}
+    for window_size, window_increment in itertools.product(window_sizes, window_increments):
+        features, meta = load_sessions(folders, window_size, window_increment, sampling, filters,
+                                       classes=range(num_classes), reps=reps, cache_folder=cache_folder,
+                                       workers=workers)
+        datasets[window_size, window_increment] = (features.filename, meta, features.shape)
+
+    tasks = []
+    for (window_size, window_increment), quantization in itertools.product(datasets, quantizations):
+        path, meta, shape = datasets[window_size, window_increment]
+        params = {"window_size": window_size, "window_increment": window_increment, "quantization": quantization}
+        for fold in np.unique(meta["reps"]):
+            tasks.append((path, meta, params, int(fold), settings))
+    # Largest trials first, so the pool does not end on a long one
+    tasks.sort(key=lambda t: -len(t[1]["reps"]))
+
+    ctx = multiprocessing.get_context()
+    with ctx.Pool(workers, initializer=_init_worker) as pool:
+        results = pool.map(_trial, tasks, chunksize=1)
+
+    trials = {}
+    for (path, meta, params, fold, _), result in zip(tasks, results):
+        trials.setdefault(tuple(params.values()), []).append(result)
+
+    rows = []
+    for (window_size, window_increment, quantization), results in trials.items():
+        n_channels = datasets[window_size, window_increment][2][1]
+        model = etm.EmagerCNN((4, n_channels // 4), num_classes, quantization)
+        model.load_state_dict(results[0][2])
+        model.eval()
+        size_kb = model_size(model) / 1024
+        latency_ms = measure_latency(model, window_size, n_channels)
+        for n_votes in settings["majority_votes"]:
+            accuracy = [r[0][n_votes] for r in results]
+            rows.append({
+                "window_size": window_size, "window_increment": window_increment, "quantization": quantization,
+                "majority_vote": n_votes, "folds": len(results), "accuracy": float(np.mean(accuracy)),
+                "accuracy_std": float(np.std(accuracy)), "size_kb": size_kb, "latency_ms": latency_ms,
+                "train_s": float(np.mean([r[1] for r in results])),
+            })
+    rows.sort(key=lambda r: -r["accuracy"])
+    return rows
+
+
+def write_results(rows: list[dict], path: str):
+    """
+    Args:
+        rows (list[dict]): rows of run_sweep
+        path (str): output CSV file
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def format_results(rows: list[dict]) -> str:
+    """
+    Args:
+        rows (list[dict]): rows of run_sweep
+
+    Returns:
+        str: the rows as a text table
+    """
+    lines = [f"{'window':>6s} {'incr':>5s} {'bits':>5s} {'vote':>5s} {'folds':>5s} {'accuracy':>15s} "
+             f"{'size':>10s} {'latency':>10s} {'train':>8s}"]
+    for r in rows:
+        bits = str(r["quantization"]) if 0 < r["quantization"] < 32 else "float"
+        lines.append(f"{r['window_size']:6d} {r['window_increment']:5d} {bits:>5s} {r['majority_vote']:5d} "
+                     f"{r['folds']:5d} {r['accuracy'] * 100:7.2f} ± {r['accuracy_std'] * 100:5.2f}% "
+                     f"{r['size_kb']:7.1f} kB {r['latency_ms']:7.3f} ms {r['train_s']:7.1f}s")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import os
+    import argparse
+    import datetime
+    from config import BASE_PATH, CACHE_FOLDER, WINDOW_SIZE, WINDOW_INCREMENT, MAJORITY_VOTE, EPOCH, NUM_CLASSES, \
+        NUM_REPS, SAMPLING, NOTCH_FILTER, BANDPASS_FILTER, TRAIN_SESSIONS
+    from utils.training_data import find_sessions
+
+    parser = argparse.ArgumentParser(description="Leave-one-rep-out cross-validation sweep of the EmagerCNN")
+    parser.add_argument("sessions", nargs="*", help="session folders, the TRAIN_SESSIONS of the config by default")
+    parser.add_argument("--window-size", type=int, nargs="+", default=[WINDOW_SIZE])
+    parser.add_argument("--window-increment", type=int, nargs="+", default=[WINDOW_INCREMENT])
+    parser.add_argument("--quantization", type=int, nargs="+", default=[-1], help="bit-widths, -1 for float")
+    parser.add_argument("--majority-vote", type=int, nargs="+", default=[1, MAJORITY_VOTE])
+    parser.add_argument("--epochs", type=int, default=EPOCH)
+    parser.add_argument("--workers", type=int, default=None, help="trials run at once, all the cores by default")
+    parser.add_argument("--output", default=None, help="results CSV, sweep_<date>.csv in BASE_PATH by default")
+    args = parser.parse_args()
+
+    sessions = args.sessions or (find_sessions(BASE_PATH) if TRAIN_SESSIONS is None
+                                 else [f"{BASE_PATH}{s}/" for s in TRAIN_SESSIONS])
+    output = args.output or os.path.join(BASE_PATH, f"sweep_{datetime.datetime.now().strftime('%y-%m-%d_%Hh%M')}.csv")
+    rows = run_sweep(sessions, args.window_size, args.window_increment, args.quantization, args.majority_vote,
+                     NUM_CLASSES, SAMPLING, [NOTCH_FILTER, BANDPASS_FILTER], reps=range(NUM_REPS), epochs=args.epochs,
+                     cache_folder=os.path.join(BASE_PATH, CACHE_FOLDER), workers=args.workers)
+    write_results(rows, output)
+    print(format_results(rows))
+    print(f"Results saved to {output}")
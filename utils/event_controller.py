@@ -0,0 +1,40 @@
+import select
+from libemg.environments.controllers import ClassifierController
+
+
+class EventClassifierController(ClassifierController):
+    def __init__(self, output_format: str, num_classes: int, timeout: float | None = 0.5,
+                 ip: str = '127.0.0.1', port: int = 12346):
+        """
+        ClassifierController that sleeps until the online classifier sends an output instead of being polled.
+
+        OnlineEMGClassifier sends every output (the same one written to `classifier_output` in shared memory) in a
+        UDP datagram, so waiting on the socket wakes the consumer exactly when a new prediction lands.
+        `get_data` blocks up to `timeout` and returns the newest output: older datagrams queued in the meantime are
+        dropped instead of being read one after the other.
+
+        :param output_format: str, 'predictions' or 'probabilities', as ClassifierController
+        :param num_classes: int, number of classes
+        :param timeout: float, maximum waiting time (s) of get_data, None to wait forever
+        :param ip: str, IP address of the classifier UDP socket
+        :param port: int, port of the classifier UDP socket
+        """
+        super().__init__(output_format, num_classes, ip, port)
+        self.timeout = timeout
+        self.dropped = 0
+
+    def _get_action(self) -> str | None:
+        ready, _, _ = select.select([self.sock], [], [], self.timeout)
+        if not ready:
+            return None
+        data = None
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(1024)
+            except BlockingIOError:
+                break
+            self.dropped += 1
+        if data is None:
+            return None
+        self.dropped -= 1
+        return data.decode('utf-8')
@@ -0,0 +1,146 @@
+import time
+import threading
+import numpy as np
+
+from utils.synthetic_streamer import load_source
+
+FRAME_SIZE = 128
+
+
+def encode_frames(samples, channel_map=None):
+    """
+    Inverse of live_64_channel.decode_frames: wire encoding of samples as sent by the HDSensor board.
+    The LSB of every sample carries the sync bits (0 for the first hardware channel, 1 for the others).
+
+    :param samples: np.ndarray, (n_frames, 64) int16 samples, in the order decode_frames returns them
+    :param channel_map: list, channel map given to decode_frames, None for the raw channel order
+    :return: bytes, n_frames * 128 bytes
+    """
+    samples = np.asarray(samples, dtype=np.int16)
+    raw = np.empty_like(samples)
+    if channel_map is None:
+        raw[:] = samples
+    else:
+        raw[:, channel_map] = samples
+    raw = (raw & ~1) | 1
+    raw[:, 0] &= ~1
+    return raw.astype(">i2").tobytes()
+
+
+class FakeHDSensorSerial:
+    def __init__(self, source=None, channel_map=None, sampling_rate=1010, speed=1.0, corrupt_rate=0.0,
+                 buffer_size=1 << 16, timeout=1, port="fake", seed=0):
+        """
+        pyserial like HDSensor board to run live_64_channel without hardware: `HDSensor(None, 0, serial_device=...)`.
+
+        Frames are produced on schedule while the port is open (frame i is due at open time + (i + 1) /
+        (sampling_rate * speed)) and wait in an input buffer of `buffer_size` bytes, whole frames arriving on a full
+        buffer are lost like on an overrun UART. A `corrupt_rate` fraction of the frames gets a wrong sync bit.
+        The source is looped.
+
+        :param source: samples to send, see utils.synthetic_streamer.load_source
+        :param channel_map: list, channel map of the HDSensor decoding the stream (HDSensor.channelMap)
+        :param sampling_rate: float, sampling rate of the source in Hz
+        :param speed: float, playback speed, 1 for realtime
+        :param corrupt_rate: float, fraction of corrupted frames
+        :param buffer_size: int, input buffer size in bytes
+        :param timeout: float, read timeout (s), like serial.Serial
+        :param port: str, port name
+        :param seed: int, random seed of the corrupted frames
+        """
+        data = np.asarray(load_source(source, sampling_rate))
+        self.stream = np.frombuffer(bytearray(encode_frames(data, channel_map)), dtype=np.uint8)
+        self.n_frames = len(data)
+        self.corrupted_frames = np.random.default_rng(seed).random(self.n_frames) < corrupt_rate
+        for i in np.flatnonzero(self.corrupted_frames):
+            self.stream[i * FRAME_SIZE + 3] ^= 1  # Sync bit of the second channel
+        self.ns_per_frame = 1e9 / (sampling_rate * speed)
+        self.buffer_size = buffer_size - buffer_size % FRAME_SIZE
+        self.timeout = timeout
+        self.port = port
+        self.is_open = False
+
+        self.lock = threading.Lock()
+        self.buffer = bytearray()
+        self.opened = 0           # time.monotonic_ns() of the last open
+        self.emitted = 0          # frames produced since the last open
+        self.frames_sent = 0      # frames put in the input buffer
+        self.frames_overrun = 0   # frames lost on a full input buffer
+        self.frames_corrupted = 0
+        self.frames_flushed = 0   # frames discarded by reset_input_buffer
+
+    def open(self):
+        with self.lock:
+            if self.is_open:
+                return
+            self.is_open = True
+            self.buffer.clear()
+            self.opened = time.monotonic_ns()
+            self.emitted = 0
+
+    def close(self):
+        with self.lock:
+            self.is_open = False
+
+    def frame_time(self, index):
+        """
+        :param index: int, frame index since the last open
+        :return: int, time.monotonic_ns at which the frame was sent
+        """
+        return int(self.opened + (index + 1) * self.ns_per_frame)
+
+    def stats(self):
+        return {"frames_sent": self.frames_sent, "frames_overrun": self.frames_overrun,
+                "frames_corrupted": self.frames_corrupted, "frames_flushed": self.frames_flushed}
+
+    def _produce(self):
+        """Move the frames due by now to the input buffer, the lock must be held."""
+        if not self.is_open:
+            return
+        due = int((time.monotonic_ns() - self.opened) / self.ns_per_frame) - self.emitted
+        if due <= 0:
+            return
+        first = self.emitted
+        self.emitted += due
+        room = (self.buffer_size - len(self.buffer)) // FRAME_SIZE
+        kept = min(due, room)
+        self.frames_overrun += due - kept
+        indices = np.arange(first, first + kept) % self.n_frames
+        self.frames_sent += kept
+        self.frames_corrupted += int(np.count_nonzero(self.corrupted_frames[indices]))
+        frames = self.stream.reshape(self.n_frames, FRAME_SIZE)
+        self.buffer += frames.take(indices, axis=0).tobytes()
+
+    def inWaiting(self):
+        with self.lock:
+            self._produce()
+            return len(self.buffer)
+
+    @property
+    def in_waiting(self):
+        return self.inWaiting()
+
+    def reset_input_buffer(self):
+        with self.lock:
+            self._produce()
+            self.frames_flushed += len(self.buffer) // FRAME_SIZE
+            self.buffer.clear()
+
+    def read(self, size=1):
+        deadline = None if self.timeout is None else time.monotonic_ns() + self.timeout * 1e9
+        while True:
+            with self.lock:
+                self._produce()
+                if len(self.buffer) >= size or not self.is_open:
+                    break
+                missing = -(-(size - len(self.buffer)) // FRAME_SIZE)
+                ready = self.frame_time(self.emitted + missing - 1)
+            now = time.monotonic_ns()
+            if deadline is not None and now >= deadline:
+                break
+            wake = ready if deadline is None else min(ready, deadline)
+            time.sleep(max(0, wake - now) / 1e9)
+        with self.lock:
+            data = bytes(self.buffer[:size])
+            del self.buffer[:size]
+        return data
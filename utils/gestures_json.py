@@ -1,10 +1,13 @@
 import os
 import json
+import time
+import functools
 
 ### GESTURES JSON UTILS ###
 
 def get_images_list(images_folder:str):
-    images = [images_folder + f for f in os.listdir(images_folder) if os.path.isfile(os.path.join(images_folder, f)) and (f.endswith('.png') or f.endswith('.jpg'))]
+    # Sorted so the class indexes do not depend on the os.listdir order
+    images = [images_folder + f for f in sorted(os.listdir(images_folder)) if os.path.isfile(os.path.join(images_folder, f)) and (f.endswith('.png') or f.endswith('.jpg'))]
     return images
 
 def get_images_folder(images_list:list):
@@ -70,4 +73,88 @@ def get_label_from_index(index:int, images, gestures_dict=None):
         if value == images_name:
             label = int(key)
             break
-    return label
\ No newline at end of file
+    return label
+
+
+### GESTURE CATALOG ###
+
+class GestureCatalog:
+    def __init__(self, images, reload_interval=None):
+        """
+        Gestures of a media folder with every lookup prebuilt: class index <-> gesture label <-> image name.
+        The folder and the JSON are read once, lookups are dict/list accesses without filesystem access.
+
+        :param images: list of images or a string of a folder containing images (listed in sorted order)
+        :param reload_interval: float, minimum time (s) between two checks of the folder and JSON modification
+                                times during lookups, the catalog is rebuilt if they changed. None to never reload
+        """
+        self.source = images
+        self.reload_interval = reload_interval
+        self.build()
+
+    def build(self):
+        """(Re)build the lookup tables from the files."""
+        if isinstance(self.source, str):
+            self.folder = self.source
+            self.images = get_images_list(self.source)
+        else:
+            self.folder = get_images_folder(self.source)
+            self.images = list(self.source)
+        self.gestures_dict = get_gestures_dict(self.folder) or {}
+
+        self.names = {int(label): name for label, name in self.gestures_dict.items()}
+        self.labels_by_name = {name: label for label, name in self.names.items()}
+        self.image_names = [os.path.splitext(os.path.basename(img))[0] for img in self.images]
+        self.labels = [self.labels_by_name.get(name) for name in self.image_names]
+        self.indices = {}
+        for label, name in self.names.items():
+            if name in self.image_names:
+                self.indices[label] = self.image_names.index(name)
+            else:
+                # Same matching as get_index_from_label
+                self.indices[label] = next((i for i, img in enumerate(self.images) if name in img), None)
+
+        self.signature = self._signature()
+        self.next_check = time.monotonic() + (self.reload_interval or 0)
+
+    def _signature(self):
+        folder = str(self.folder)
+        jsons = [os.path.join(folder, f) for f in os.listdir(folder) if f.endswith("json")]
+        return os.stat(folder).st_mtime_ns, tuple(os.stat(f).st_mtime_ns for f in jsons)
+
+    def _check(self):
+        if self.reload_interval is None or time.monotonic() < self.next_check:
+            return
+        self.next_check = time.monotonic() + self.reload_interval
+        if self._signature() != self.signature:
+            self.build()
+
+    def label_of(self, index:int):
+        """Gesture label of a class index, None if its image is not in the JSON."""
+        self._check()
+        return self.labels[index]
+
+    def index_of(self, label:int):
+        """Class index of a gesture label, None if it has no image."""
+        self._check()
+        return self.indices.get(int(label))
+
+    def name_of(self, label:int):
+        """Gesture name of a gesture label."""
+        self._check()
+        return self.names[int(label)]
+
+    def image_of(self, index:int):
+        """Image path of a class index."""
+        self._check()
+        return self.images[index]
+
+    def __len__(self):
+        return len(self.images)
+
+@functools.cache
+def get_catalog(images_folder:str, reload_interval=None) -> GestureCatalog:
+    """
+    GestureCatalog of a folder, built on the first call and shared by the next ones.
+    """
+    return GestureCatalog(images_folder, reload_interval)
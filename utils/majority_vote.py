@@ -1,13 +1,18 @@
 from collections import deque
-from scipy import stats
 import numpy as np
 
 
-class MajorityVote(deque):
+class MajorityVote:
     def __init__(self, max_len):
         """
         MajorityVote object abstracts the classic majority voting algorithm.
 
+        The count of every label in the queue is updated when a label is pushed or evicted and the vote is
+        tracked, so `vote()` is O(1) whatever the queue length. Like `scipy.stats.mode`, ties go to the smallest
+        label. Labels are non-negative integers (class indices).
+
+        The queue is a private deque, only the methods below change it so the counts always match its content.
+
         :param max_len: int, the maximum length of the queue
 
         Example:
@@ -18,17 +23,91 @@ class MajorityVote(deque):
         >>>    q.append(r)
         >>>    vote = q.vote() # Get the majority vote
         """
-        super().__init__(maxlen=max_len)
+        self._queue = deque(maxlen=max_len)
+        self.counts = []
+        self.best = None
+
+    @property
+    def maxlen(self):
+        return self._queue.maxlen
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __iter__(self):
+        return iter(self._queue)
+
+    def __getitem__(self, index):
+        return self._queue[index]
+
+    def __repr__(self):
+        return f"MajorityVote({list(self._queue)}, maxlen={self.maxlen})"
+
+    def append(self, label):
+        label = int(label)
+        if len(self._queue) == self.maxlen:
+            self._evict(self._queue[0])
+        self._queue.append(label)
+        if label >= len(self.counts):
+            self.counts.extend([0] * (label + 1 - len(self.counts)))
+        self.counts[label] += 1
+        if self.best is None or self.counts[label] > self.counts[self.best] or \
+                (self.counts[label] == self.counts[self.best] and label < self.best):
+            self.best = label
+
+    def extend(self, labels):
+        for label in labels:
+            self.append(label)
+
+    def popleft(self):
+        label = self._queue.popleft()
+        self._evict(label)
+        return label
+
+    def clear(self):
+        self._queue.clear()
+        self.counts = []
+        self.best = None
+
+    def _evict(self, label):
+        self.counts[label] -= 1
+        if label == self.best:
+            # Only when the vote loses a count another label can take over, find it in the counts (not the queue)
+            self.best = max(range(len(self.counts)), key=lambda i: (self.counts[i], -i))
+            if self.counts[self.best] == 0:
+                self.best = None
+
+    def vote(self) -> int:
+        """
+        :return: int, most frequent label of the queue (smallest one on ties)
+        """
+        if self.best is None:
+            raise IndexError("vote of an empty MajorityVote")
+        return self.best
 
-    def vote(self) -> np.ndarray:
-        return stats.mode(self).mode
 
+def majority_vote(arr: np.ndarray, n_votes, chunk_size=1 << 16) -> np.ndarray:
+    """
+    Majority vote of every label over the `n_votes` previous labels (fewer at the beginning), same result as
+    pushing the labels one by one in a MajorityVote.
 
-def majority_vote(arr: np.ndarray, n_votes):
-    # arr.shape == (n_votes,)
-    ret = np.zeros((0,), dtype=np.uint8)
-    q = MajorityVote(n_votes)
-    for i in arr:
-        q.append(i)
-        ret = np.append(ret, q.vote())
+    :param arr: np.ndarray of shape (n_labels,), integer labels
+    :param n_votes: int, number of labels in the vote
+    :param chunk_size: int, number of labels processed at once, bounds the memory to chunk_size * n_classes counts
+    :return: np.ndarray of shape (n_labels,), voted labels
+    """
+    arr = np.asarray(arr).reshape(-1)
+    labels, index = np.unique(arr, return_inverse=True)
+    ret = np.empty(len(arr), dtype=arr.dtype)
+    for start in range(0, len(arr), chunk_size):
+        stop = min(start + chunk_size, len(arr))
+        first = max(0, start - n_votes + 1)
+        # Counts of every label in the window ending at each position, from the cumulative one-hot counts
+        one_hot = np.zeros((stop - first + 1, len(labels)), dtype=np.int32)
+        one_hot[np.arange(1, stop - first + 1), index[first:stop]] = 1
+        np.cumsum(one_hot, axis=0, out=one_hot)
+        ends = np.arange(start, stop) + 1 - first
+        begins = np.maximum(ends - n_votes, 0)
+        # argmax returns the first maximum, labels are sorted so ties go to the smallest label
+        ret[start:stop] = labels[np.argmax(one_hot[ends] - one_hot[begins], axis=1)]
     return ret
@@ -0,0 +1,129 @@
+import time
+import ctypes
+import multiprocessing
+from typing import NamedTuple
+import numpy as np
+
+# Slot layout, 8 bytes per field: sequence number, prediction, closed flag (int64), confidence, timestamp (float64),
+# sample time (int64)
+SEQ, PREDICTION, CLOSED, CONFIDENCE, TIMESTAMP, SAMPLE_TIME = range(6)
+
+
+class Prediction(NamedTuple):
+    prediction: int
+    confidence: float
+    timestamp: float
+    seq: int
+    sample_time: int = -1
+
+
+class PredictionSlot:
+    def __init__(self, ctx=None):
+        """
+        Latest-value prediction channel between two processes, replaces a Pipe when only the freshest
+        prediction matters: nothing is pickled, there is no backlog to drain and the reader sleeps on an event
+        instead of polling.
+
+        The slot is a seqlock in shared memory: the writer makes the sequence number odd while it writes and even
+        when it is done, the reader retries if the number changed or was odd while it was reading.
+        There must be a single writer.
+
+        Pass the slot to both processes at creation (like a Pipe end):
+
+        >>> slot = PredictionSlot()
+        >>> Process(target=predictor, args=(slot,)).start()   # slot.publish(prediction, confidence)
+        >>> Process(target=controller, args=(slot,)).start()  # p = slot.wait(timeout=0.5)
+
+        :param ctx: multiprocessing context, default context if None
+        """
+        ctx = multiprocessing if ctx is None else ctx
+        self.raw = ctx.RawArray(ctypes.c_int64, 6)
+        self.event = ctx.Event()
+        self.last_seq = 0
+        self._views()
+
+    def _views(self):
+        self.ints = np.frombuffer(self.raw, dtype=np.int64)
+        self.floats = self.ints.view(np.float64)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["ints"], state["floats"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views()
+
+    def publish(self, prediction: int, confidence: float = np.nan, timestamp: float | None = None,
+                sample_time: int = -1):
+        """
+        Overwrite the slot with a new prediction and wake up the reader.
+
+        :param prediction: int, predicted class
+        :param confidence: float, confidence of the prediction, nan if unknown
+        :param timestamp: float, time.time() of the prediction, now if None
+        :param sample_time: int, time.monotonic_ns() when the samples of the prediction arrived (see
+            utils.tracing.BatchClock), -1 if unknown
+        :return: int, sequence number of the prediction (Prediction.seq)
+        """
+        ints, floats = self.ints, self.floats
+        seq = int(ints[SEQ])
+        ints[SEQ] = seq + 1
+        ints[PREDICTION] = prediction
+        floats[CONFIDENCE] = confidence
+        floats[TIMESTAMP] = time.time() if timestamp is None else timestamp
+        ints[SAMPLE_TIME] = sample_time
+        ints[SEQ] = seq + 2
+        self.event.set()
+        return seq // 2 + 1
+
+    def close(self):
+        """Tell the reader that no more predictions will be published."""
+        self.ints[CLOSED] = 1
+        self.event.set()
+
+    @property
+    def closed(self) -> bool:
+        return bool(self.ints[CLOSED])
+
+    def read(self) -> Prediction | None:
+        """
+        :return: Prediction, latest published prediction, None if nothing was ever published
+        """
+        ints, floats = self.ints, self.floats
+        while True:
+            seq = int(ints[SEQ])
+            if seq & 1:
+                continue
+            prediction = Prediction(int(ints[PREDICTION]), float(floats[CONFIDENCE]), float(floats[TIMESTAMP]), seq // 2,
+                                    int(ints[SAMPLE_TIME]))
+            if int(ints[SEQ]) == seq:
+                break
+        if prediction.seq == 0:
+            return None
+        self.last_seq = prediction.seq
+        return prediction
+
+    def wait(self, timeout: float | None = None) -> Prediction | None:
+        """
+        Block until a prediction newer than the last one read is published.
+
+        :param timeout: float, maximum waiting time in seconds, None to wait forever
+        :return: Prediction, latest prediction, None on timeout or when the slot is closed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if int(self.ints[SEQ]) // 2 > self.last_seq:
+                # Clear before reading, a prediction published after this read sets the event again
+                self.event.clear()
+                return self.read()
+            if self.closed:
+                return None
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            self.event.wait(remaining)
+            if not self.event.is_set():
+                return None
+            self.event.clear()
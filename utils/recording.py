@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import struct
+import numpy as np
+
+### BINARY EMG RECORDINGS ###
+#
+# File layout (little-endian):
+#   preamble  : magic "EMGB", version (uint16), padding, footer offset (uint64), footer size (uint64) -> 64 bytes
+#   data      : (n_samples, n_channels) samples, C order, segments stored one after the other
+#   footer    : JSON header (sampling rate, channel map, dtype, segments index with class/rep/start/stop/source)
+# The footer is written on close, so samples can be appended while recording.
+
+RECORDING_EXTENSION = ".emgb"
+RECORDING_NAME = "recording" + RECORDING_EXTENSION
+MAGIC = b"EMGB"
+VERSION = 1
+PREAMBLE = struct.Struct("<4sH10xQQ")
+DATA_OFFSET = 64
+CSV_PATTERN = re.compile(r"C_(\d+)_R_(\d+)_emg\.csv$")
+
+
+class RecordingWriter:
+    def __init__(self, path: str, sampling_rate: float, n_channels: int = 64, channel_map: list | None = None,
+                 dtype=np.int16):
+        """
+        Write a binary recording segment by segment.
+
+        :param path: str, output file path
+        :param sampling_rate: float, sampling rate in Hz
+        :param n_channels: int, number of channels
+        :param channel_map: list, channel map applied to the hardware channels (stored for reference)
+        :param dtype: numpy dtype of the stored samples
+
+        Example:
+        >>> with RecordingWriter("Datasets/D0/recording.emgb", 1010) as writer:
+        >>>     writer.write(samples, class_index=2, rep_index=0)
+        """
+        self.path = path
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        self.header = {
+            "version": VERSION,
+            "sampling_rate": sampling_rate,
+            "n_channels": n_channels,
+            "channel_map": list(channel_map) if channel_map is not None else None,
+            "dtype": self.dtype.str,
+            "n_samples": 0,
+            "segments": [],
+        }
+        self.file = open(path, "wb")
+        self.file.write(PREAMBLE.pack(MAGIC, VERSION, 0, 0).ljust(DATA_OFFSET, b"\0"))
+
+    def write(self, samples: np.ndarray, class_index: int = -1, rep_index: int = -1, source: str | None = None):
+        """
+        Append a segment.
+
+        :param samples: np.ndarray of shape (n_samples, n_channels)
+        :param class_index: int, class of the segment, -1 if unknown
+        :param rep_index: int, repetition of the segment, -1 if unknown
+        :param source: str, optional name of the original file
+        """
+        samples = np.asarray(samples)
+        if samples.ndim != 2 or samples.shape[1] != self.header["n_channels"]:
+            raise ValueError(f"Expected samples of shape (n, {self.header['n_channels']}), got {samples.shape}")
+        start = self.header["n_samples"]
+        self.file.write(np.ascontiguousarray(samples, dtype=self.dtype).tobytes())
+        self.header["n_samples"] += len(samples)
+        self.header["segments"].append({
+            "class": int(class_index),
+            "rep": int(rep_index),
+            "start": start,
+            "stop": self.header["n_samples"],
+            "source": source,
+        })
+
+    def close(self):
+        if self.file.closed:
+            return
+        footer = json.dumps(self.header).encode()
+        footer_offset = self.file.tell()
+        self.file.write(footer)
+        self.file.seek(0)
+        self.file.write(PREAMBLE.pack(MAGIC, VERSION, footer_offset, len(footer)))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recording:
+    def __init__(self, path: str):
+        """
+        Open a binary recording, samples are memory-mapped and only read from disk when accessed.
+
+        :param path: str, recording file path
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, footer_offset, footer_size = PREAMBLE.unpack(f.read(PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"Not an EMG recording: {path}")
+            if version > VERSION:
+                raise ValueError(f"Unsupported recording version {version}: {path}")
+            if footer_offset == 0:
+                raise ValueError(f"Recording was not closed properly: {path}")
+            f.seek(footer_offset)
+            self.header = json.loads(f.read(footer_size))
+
+        self.sampling_rate = self.header["sampling_rate"]
+        self.channel_map = self.header["channel_map"]
+        self.segments = self.header["segments"]
+        shape = (self.header["n_samples"], self.header["n_channels"])
+        if shape[0] > 0:
+            self.data = np.memmap(path, dtype=np.dtype(self.header["dtype"]), mode="r", offset=DATA_OFFSET, shape=shape)
+        else:
+            self.data = np.zeros(shape, dtype=np.dtype(self.header["dtype"]))
+
+    def __len__(self):
+        return len(self.segments)
+
+    def segment(self, index: int) -> np.ndarray:
+        """
+        :param index: int, segment index
+        :return: np.ndarray, memory-mapped (n_samples, n_channels) view of the segment
+        """
+        seg = self.segments[index]
+        return self.data[seg["start"]:seg["stop"]]
+
+    def select(self, classes: list | None = None, reps: list | None = None) -> list[int]:
+        """
+        :param classes: list of class indices to keep, None for all
+        :param reps: list of rep indices to keep, None for all
+        :return: list of the matching segment indices
+        """
+        return [i for i, seg in enumerate(self.segments)
+                if (classes is None or seg["class"] in classes) and (reps is None or seg["rep"] in reps)]
+
+    def to_offline_data_handler(self, classes: list | None = None, reps: list | None = None):
+        """
+        Build a libemg OfflineDataHandler with the same "classes" and "reps" metadata as the CSV loader,
+        the data of each segment stays memory-mapped.
+
+        :param classes: list of class indices to keep, None for all
+        :param reps: list of rep indices to keep, None for all
+        :return: OfflineDataHandler
+        """
+        from libemg.data_handler import OfflineDataHandler
+
+        odh = OfflineDataHandler()
+        odh.extra_attributes = ["classes", "reps"]
+        odh.classes = []
+        odh.reps = []
+        for i in self.select(classes, reps):
+            data = self.segment(i)
+            odh.data.append(data)
+            odh.classes.append(np.full((len(data), 1), self.segments[i]["class"], dtype=int))
+            odh.reps.append(np.full((len(data), 1), self.segments[i]["rep"], dtype=int))
+        return odh
+
+
+def dataset_files(folder: str) -> list[str]:
+    """
+    :param folder: str, session folder
+    :return: list of the files a session is loaded from, the binary recording if present or the CSV files
+    """
+    if os.path.exists(os.path.join(folder, RECORDING_NAME)):
+        return [os.path.join(folder, RECORDING_NAME)]
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if CSV_PATTERN.search(f))
+
+
+def save_recording(path: str, samples: np.ndarray, sampling_rate: float, channel_map: list | None = None,
+                   class_index: int = -1, rep_index: int = -1):
+    """
+    Save a single segment recording.
+    """
+    samples = np.asarray(samples)
+    with RecordingWriter(path, sampling_rate, samples.shape[1], channel_map) as writer:
+        writer.write(samples, class_index, rep_index)
+
+
+def csv_to_recording(folder: str, path: str | None = None, sampling_rate: float = 1010,
+                     channel_map: list | None = None) -> str:
+    """
+    Convert the `C_{class}_R_{rep}_emg.csv` files of a session folder to a single binary recording.
+    Samples are stored as int16 when the CSV values are integers that fit, as float32 otherwise.
+
+    :param folder: str, session folder containing the CSV files
+    :param path: str, output file, defaults to RECORDING_NAME in the session folder
+    :param sampling_rate: float, sampling rate in Hz
+    :param channel_map: list, channel map applied by the acquisition (stored for reference)
+    :return: str, output file path
+    """
+    if path is None:
+        path = os.path.join(folder, RECORDING_NAME)
+    files = []
+    for f in sorted(os.listdir(folder)):
+        match = CSV_PATTERN.search(f)
+        if match:
+            files.append((int(match.group(1)), int(match.group(2)), f))
+    if not files:
+        raise FileNotFoundError(f"No C_*_R_*_emg.csv file found in {folder}")
+    files.sort()
+
+    data = [np.loadtxt(os.path.join(folder, f), delimiter=",", ndmin=2) for _, _, f in files]
+    lossless = all(np.array_equal(d, np.round(d)) and np.abs(d).max(initial=0) <= np.iinfo(np.int16).max for d in data)
+    dtype = np.int16 if lossless else np.float32
+
+    with RecordingWriter(path, sampling_rate, data[0].shape[1], channel_map, dtype) as writer:
+        for (class_index, rep_index, f), d in zip(files, data):
+            writer.write(d, class_index, rep_index, source=f)
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert CSV session folders to binary EMG recordings")
+    parser.add_argument("folders", nargs="+", help="session folders containing C_*_R_*_emg.csv files")
+    parser.add_argument("--sampling-rate", type=float, default=1010)
+    args = parser.parse_args()
+
+    for folder in args.folders:
+        out = csv_to_recording(folder, sampling_rate=args.sampling_rate)
+        rec = Recording(out)
+        print(f"{folder}: {len(rec)} segments, {rec.data.shape[0]} samples ({rec.data.dtype}) -> {out}")
@@ -0,0 +1,194 @@
+import time
+import numpy as np
+from scipy import signal
+
+
+class StreamFilter:
+    def __init__(self, sampling_frequency=None, n_channels=64):
+        """
+        Stateful causal filter processing all channels at once. The `sosfilt` state is kept between calls so
+        filtering a stream chunk by chunk costs O(new samples) and gives the same output as filtering it at once.
+
+        Filters are installed with the same dictionaries as `libemg.filtering.Filter`, plus a decimation stage:
+
+        >>> fi = StreamFilter(1010)
+        >>> fi.install_filters({"name": "notch", "cutoff": 60, "bandwidth": 3})
+        >>> fi.install_filters({"name": "bandpass", "cutoff": [20, 450], "order": 4})
+        >>> fi.install_filters({"name": "decimate", "factor": 2})
+        >>> y = fi.filter(x)  # x.shape == (n_samples, n_channels), oldest sample first
+
+        Unlike libemg's `filtfilt`, filtering is causal, so it is the same online and offline.
+
+        :param sampling_frequency: float, sampling frequency in Hz, only needed for notch and band filters
+        :param n_channels: int, number of channels
+        """
+        self.sampling_frequency = sampling_frequency
+        self.n_channels = n_channels
+        self.filters = []
+        self.sos = np.zeros((0, 6))
+        self.decimation = 1
+        self.reset()
+
+    def install_filters(self, filter_dictionary):
+        """
+        Install a filter after the already installed ones. Decimation is always applied last.
+
+        :param filter_dictionary: dict, e.g. {"name": "notch", "cutoff": 60, "bandwidth": 3},
+            {"name": "bandpass", "cutoff": [20, 450], "order": 4} or {"name": "decimate", "factor": 2}
+        """
+        name = filter_dictionary["name"]
+        if name == "decimate":
+            if self.decimation > 1:
+                raise ValueError("Decimation is already installed")
+            factor = int(filter_dictionary["factor"])
+            # Same anti-aliasing filter as scipy.signal.decimate
+            sos = signal.cheby1(8, 0.05, 0.8 / factor, output="sos")
+            self.decimation = factor
+        elif name in ["notch", "lowpass", "highpass", "bandpass", "bandstop"]:
+            if self.sampling_frequency is None:
+                raise ValueError(f"A sampling frequency is required for a {name} filter")
+            nyquist = self.sampling_frequency / 2
+            if name == "notch":
+                if filter_dictionary["cutoff"] >= nyquist:
+                    raise ValueError("Cutoff given too high for nyquist rate")
+                b, a = signal.iirnotch(
+                    w0=filter_dictionary["cutoff"],
+                    Q=filter_dictionary["cutoff"] / filter_dictionary["bandwidth"],
+                    fs=self.sampling_frequency,
+                )
+                sos = signal.tf2sos(b, a)
+            else:
+                if np.any(np.asarray(filter_dictionary["cutoff"]) >= nyquist):
+                    raise ValueError("Cutoff given too high for nyquist rate")
+                sos = signal.butter(
+                    N=filter_dictionary["order"],
+                    Wn=filter_dictionary["cutoff"],
+                    btype=name,
+                    fs=self.sampling_frequency,
+                    output="sos",
+                )
+        else:
+            raise ValueError(f"Unsupported filter: {name}")
+
+        self.filters.append(filter_dictionary)
+        self.sos = np.concatenate((self.sos, sos))
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the stream, the next sample is treated as the beginning of a new stream.
+        """
+        self.zi = None
+        self.phase = 0
+
+    def filter(self, data):
+        """
+        Filter the next chunk of the stream.
+
+        :param data: np.ndarray of shape (n_samples, n_channels) oldest sample first, or an OfflineDataHandler whose
+            files are filtered in place as independent streams
+        :return: np.ndarray, filtered (and decimated) chunk, None for an OfflineDataHandler
+        """
+        if not isinstance(data, np.ndarray) and hasattr(data, "data"):
+            for f in range(len(data.data)):
+                self.reset()
+                data.data[f] = self._stream(data.data[f])
+            self.reset()
+            return None
+        return self._stream(data)
+
+    def _stream(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        if len(x) == 0:
+            return x[::self.decimation]
+        if len(self.sos):
+            if self.zi is None:
+                # Start in steady state with the first sample to avoid the startup transient
+                self.zi = signal.sosfilt_zi(self.sos)[:, :, None] * x[0]
+            y, self.zi = signal.sosfilt(self.sos, x, axis=0, zi=self.zi)
+        else:
+            y = x
+        if self.decimation > 1:
+            y = y[self.phase::self.decimation]
+            self.phase = (self.phase - len(x)) % self.decimation
+        return y
+
+
+class OnlineStreamFilter(StreamFilter):
+    def __init__(self, sampling_frequency=None, n_channels=64, odh=None, clock=None):
+        """
+        StreamFilter for `libemg.data_handler.OnlineDataHandler.install_filter`.
+
+        The online data handler passes its whole shared memory buffer (newest sample first) to the filter every
+        time it is read. Only the samples received since the previous call are filtered and the filtered buffer
+        is kept, so the cost no longer depends on the buffer length.
+
+        The number of new samples is the increase of the "emg_count" sample counter of `odh`. Without it, the
+        newest raw samples of the previous call are searched in the buffer, and the whole buffer is filtered again
+        when they are not found exactly once (repeated samples of a zero, saturated or disconnected stream).
+
+        >>> odh.install_filter(OnlineStreamFilter(1010, odh=odh))
+
+        :param odh: libemg.data_handler.OnlineDataHandler the filter is installed on, None to match samples instead
+        :param clock: utils.tracing.BatchClock stamped with the calls that see new samples, None to disable
+        """
+        super().__init__(sampling_frequency, n_channels)
+        self.odh = odh
+        self.clock = clock
+        self.count = None
+        self.raw_head = None
+        self.output = None
+
+    def install_filters(self, filter_dictionary):
+        if filter_dictionary["name"] == "decimate":
+            raise ValueError("Decimation is not supported on the online data handler buffer")
+        super().install_filters(filter_dictionary)
+        self.output = None
+
+    def filter(self, data):
+        """
+        :param data: np.ndarray of shape (buffer_size, n_channels), newest sample first
+        :return: np.ndarray, filtered buffer, newest sample first
+        """
+        if self.clock is None:
+            return self._filter_buffer(data)[0]
+        start = time.monotonic_ns()
+        output, new = self._filter_buffer(data)
+        if new > 0:
+            self.clock.batch(start, time.monotonic_ns())
+        return output
+
+    def _read_count(self):
+        if self.odh is None:
+            return None
+        return int(self.odh.smm.get_variable("emg_count")[0, 0])
+
+    def _new_samples(self, data, count):
+        """Number of samples received since the previous call, len(data) to filter the whole buffer again."""
+        if self.output is None or self.output.shape != data.shape:
+            return len(data)
+        if count is not None and self.count is not None and count >= self.count:
+            new = count - self.count
+            if new >= len(data) - 1:
+                return len(data)
+            # The buffer and the counter are not read at once, check that they agree
+            if np.array_equal(data[new:new + 2], self.raw_head):
+                return new
+        match = np.flatnonzero((data[:-1] == self.raw_head[0]).all(axis=1) & (data[1:] == self.raw_head[1]).all(axis=1))
+        # Ambiguous (repeated samples) or lost (buffer reset): filter everything again
+        return match[0] if len(match) == 1 else len(data)
+
+    def _filter_buffer(self, data):
+        data = np.asarray(data)
+        count = self._read_count()
+        new = self._new_samples(data, count)
+        if new == len(data):
+            self.reset()
+            self.output = np.zeros(data.shape)
+        self.count = count
+
+        if new > 0:
+            self.output[new:] = self.output[:-new]
+            self.output[:new] = self._stream(data[new - 1::-1])[::-1]
+            self.raw_head = data[:2].copy()
+        return self.output.copy(), new
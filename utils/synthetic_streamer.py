@@ -0,0 +1,151 @@
+import time
+import ctypes
+import multiprocessing
+import numpy as np
+from multiprocessing import Lock
+
+# Status layout (int64): start time (ns), samples written, late writes, largest write (samples)
+START, WRITTEN, LATE, LARGEST = range(4)
+
+
+def synthetic_emg(n_samples: int, n_classes: int = 5, n_channels: int = 64, sampling_rate: float = 1010,
+                  segment: float = 2.0, amplitude: float = 2000, seed: int = 0):
+    """
+    Generate EMG-like samples: white noise with a class dependent gain per channel and 60 Hz hum.
+    Classes follow each other in segments, class 0 is a low amplitude rest class.
+
+    :param n_samples: int, number of samples
+    :param n_classes: int, number of classes
+    :param n_channels: int, number of channels
+    :param sampling_rate: float, sampling rate in Hz
+    :param segment: float, duration (s) of each class segment
+    :param amplitude: float, standard deviation of a fully active channel
+    :param seed: int, random seed
+    :return: tuple, (n_samples, n_channels) int16 samples and (n_samples,) class labels
+    """
+    rng = np.random.default_rng(seed)
+    patterns = rng.uniform(0.1, 1.0, (n_classes, n_channels)).astype(np.float32)
+    patterns[0] = 0.05
+    labels = (np.arange(n_samples) // max(1, int(segment * sampling_rate))) % n_classes
+    samples = rng.standard_normal((n_samples, n_channels), dtype=np.float32)
+    samples *= patterns[labels] * amplitude
+    samples += (100 * np.sin(2 * np.pi * 60 * np.arange(n_samples) / sampling_rate))[:, None]
+    return np.clip(samples, -32768, 32767).astype(np.int16), labels
+
+
+def load_source(source, sampling_rate: float = 1010) -> np.ndarray:
+    """
+    :param source: None for 60 s of synthetic_emg, a recording path, a utils.recording.Recording or a
+        (n_samples, n_channels) array
+    :param sampling_rate: float, sampling rate of the synthetic samples
+    :return: np.ndarray, (n_samples, n_channels) samples (memory-mapped for a recording)
+    """
+    if source is None:
+        return synthetic_emg(int(60 * sampling_rate), sampling_rate=sampling_rate)[0]
+    if isinstance(source, str):
+        from utils.recording import Recording
+        source = Recording(source)
+    data = getattr(source, "data", source)
+    if data.ndim != 2 or len(data) == 0:
+        raise ValueError(f"Expected samples of shape (n, n_channels), got {data.shape}")
+    return data
+
+
+class SyntheticStreamer(multiprocessing.Process):
+    def __init__(self, shared_memory_items, source=None, sampling_rate: float = 1010, speed: float = 1.0,
+                 chunk: int = 10):
+        """
+        Drop-in replacement of libemg's EmagerStreamer: plays recorded or synthetic samples in the same shared
+        memory variables ("emg", newest sample first, and "emg_count"), so OnlineDataHandler and everything after it
+        run without the board.
+
+        Samples are written in chunks, on schedule: sample k is due at start + k / (sampling_rate * speed). When the
+        process falls behind, every due sample is written at once and the write is counted as late.
+        The source is looped.
+
+        :param shared_memory_items: list, [tag, shape, dtype, lock] items, as returned by synthetic_streamer
+        :param source: samples to play, see load_source
+        :param sampling_rate: float, sampling rate of the source in Hz
+        :param speed: float, playback speed, 1 for realtime
+        :param chunk: int, number of samples per write
+        """
+        super().__init__(daemon=True)
+        self.shared_memory_items = shared_memory_items
+        self.source = source
+        self.sampling_rate = sampling_rate
+        self.speed = speed
+        self.chunk = chunk
+        self.ns_per_sample = 1e9 / (sampling_rate * speed)
+        self.stop_event = multiprocessing.Event()
+        self.raw = multiprocessing.RawArray(ctypes.c_int64, 4)
+
+    def status(self) -> dict:
+        """
+        :return: dict, start time (time.monotonic_ns), samples written, late writes and largest write
+        """
+        status = np.frombuffer(self.raw, dtype=np.int64)
+        return {"start": int(status[START]), "written": int(status[WRITTEN]), "late": int(status[LATE]),
+                "largest": int(status[LARGEST])}
+
+    def sample_time(self, count: int) -> int:
+        """
+        :param count: int, value of "emg_count"
+        :return: int, time.monotonic_ns at which the newest of `count` samples was due
+        """
+        return int(np.frombuffer(self.raw, dtype=np.int64)[START] + count * self.ns_per_sample)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        from libemg.shared_memory_manager import SharedMemoryManager
+
+        smm = SharedMemoryManager()
+        for item in self.shared_memory_items:
+            smm.create_variable(*item)
+        data = load_source(self.source, self.sampling_rate)
+        status = np.frombuffer(self.raw, dtype=np.int64)
+
+        written = 0
+        start = time.monotonic_ns()
+        status[START] = start
+        try:
+            while not self.stop_event.is_set():
+                due = int((time.monotonic_ns() - start) / self.ns_per_sample) - written
+                if due > 0:
+                    newest_first = data.take(np.arange(written + due - 1, written - 1, -1), axis=0, mode="wrap")
+                    smm.modify_variable("emg", lambda x: np.vstack((newest_first, x))[:x.shape[0], :])
+                    smm.modify_variable("emg_count", lambda x: x + due)
+                    written += due
+                    status[WRITTEN] = written
+                    status[LARGEST] = max(status[LARGEST], due)
+                    if due > 2 * self.chunk:
+                        status[LATE] += 1
+                wake = start + (written + self.chunk) * self.ns_per_sample
+                time.sleep(max(0.0, (wake - time.monotonic_ns()) / 1e9))
+        finally:
+            smm.cleanup()
+
+
+def synthetic_streamer(shared_memory_items=None, source=None, sampling_rate: float = 1010, speed: float = 1.0,
+                       chunk: int = 10):
+    """
+    Same interface as libemg.streamers.emager_streamer, with a SyntheticStreamer instead of the board.
+
+    >>> p, smi = synthetic_streamer(source="Datasets/D0/recording.emgb", speed=5)
+    >>> odh = OnlineDataHandler(shared_memory_items=smi)
+
+    :param shared_memory_items: list, [tag, shape, dtype] items, the emager_streamer ones if None
+    :param source: samples to play, see load_source
+    :param sampling_rate: float, sampling rate of the source in Hz
+    :param speed: float, playback speed, 1 for realtime
+    :param chunk: int, number of samples per write
+    :return: tuple, the started streamer and the shared memory items (with their locks)
+    """
+    if shared_memory_items is None:
+        shared_memory_items = [["emg", (2000, 64), np.double], ["emg_count", (1, 1), np.int32]]
+    for item in shared_memory_items:
+        item.append(Lock())
+    streamer = SyntheticStreamer(shared_memory_items, source, sampling_rate, speed, chunk)
+    streamer.start()
+    return streamer, shared_memory_items
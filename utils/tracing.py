@@ -0,0 +1,351 @@
+import os
+import sys
+import json
+import glob
+import time
+import ctypes
+import itertools
+import multiprocessing
+from typing import NamedTuple
+import numpy as np
+
+# Stages of the realtime pipeline, a span stores the index of its stage
+STAGES = (
+    "filter",       # OnlineStreamFilter.filter call that first saw the samples of a prediction (classifier process)
+    "inference",    # InferenceEngine.predict_proba (classifier process)
+    "labels",       # update_labels_process, classifier output received -> prediction published
+    "controller",   # run_controller_process, prediction read -> gesture sent
+    "send",         # PsyonicHandControl._send_packet (submit to the dispatcher or blocking write)
+    "write",        # CommandDispatcher serial write
+)
+STAGE_IDS = {stage: i for i, stage in enumerate(STAGES)}
+
+# Row layout: stage, start (ns), end (ns), trace id
+STAGE, START, END, TRACE = range(4)
+
+
+class Span:
+    __slots__ = ("tracer", "stage", "trace", "start")
+
+    def __init__(self, tracer, stage, trace):
+        self.tracer = tracer
+        self.stage = stage
+        self.trace = trace
+
+    def __enter__(self):
+        self.start = time.monotonic_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.stage, self.start, time.monotonic_ns(), self.trace)
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+# BatchClock layout: sequence number, then the BatchStamp fields (int64 ns)
+CLOCK_SEQ = 0
+
+
+class BatchStamp(NamedTuple):
+    sample: int             # the filter first saw the newest samples of the window (start of the "filter" span)
+    filter_end: int
+    inference_start: int
+    inference_end: int
+
+
+class BatchClock:
+    def __init__(self, ctx=None):
+        """
+        Carries the time the samples of a prediction arrived, from the classifier process to the predictor.
+
+        libemg's classifier output only has a wall clock time taken after the inference. Instead,
+        `OnlineStreamFilter` stamps time.monotonic_ns() when it first sees a batch of new samples, and
+        `InferenceEngine` publishes that stamp with the time of its prediction. When the classifier output
+        arrives, the predictor reads the stamp and publishes its sample time with the prediction.
+        It then records the "filter" and "inference" spans under the prediction's trace id, so the trace of a
+        prediction starts at its samples.
+
+        Same seqlock in shared memory as PredictionSlot, written by the classifier process only. The predictor gets
+        the latest stamp, the classifier sends its output right after writing it.
+
+        >>> clock = BatchClock()
+        >>> odh.install_filter(OnlineStreamFilter(1010, odh=odh, clock=clock))
+        >>> classi = EMGClassifier(InferenceEngine(model, clock=clock))
+        >>> stamp = clock.read()  # predictor, when the classifier output arrives
+        >>> seq = slot.publish(prediction, sample_time=stamp.sample)
+        >>> clock.record(tracer, stamp, seq)
+
+        :param ctx: multiprocessing context, default context if None
+        """
+        ctx = multiprocessing if ctx is None else ctx
+        self.raw = ctx.RawArray(ctypes.c_int64, 1 + len(BatchStamp._fields))
+        self.batch_times = (-1, -1)
+        self._views()
+
+    def _views(self):
+        self.ints = np.frombuffer(self.raw, dtype=np.int64)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["ints"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views()
+
+    def batch(self, sample, end):
+        """
+        New samples were filtered, kept for the next `output` (same process).
+
+        :param sample: int, time.monotonic_ns() when the filter call that first saw them started
+        :param end: int, time.monotonic_ns() at the end of that call
+        """
+        self.batch_times = (sample, end)
+
+    def output(self, start, end):
+        """
+        Publish the stamp of a prediction made from the last batch.
+
+        :param start: int, time.monotonic_ns() at the start of the inference
+        :param end: int, time.monotonic_ns() at the end of the inference
+        """
+        ints = self.ints
+        seq = int(ints[CLOCK_SEQ])
+        ints[CLOCK_SEQ] = seq + 1
+        ints[1:] = (*self.batch_times, start, end)
+        ints[CLOCK_SEQ] = seq + 2
+
+    def read(self) -> BatchStamp | None:
+        """
+        :return: BatchStamp, stamp of the latest prediction, None if nothing was ever published
+        """
+        ints = self.ints
+        while True:
+            seq = int(ints[CLOCK_SEQ])
+            if seq & 1:
+                continue
+            stamp = BatchStamp(*(int(t) for t in ints[1:]))
+            if int(ints[CLOCK_SEQ]) == seq:
+                break
+        return None if seq == 0 else stamp
+
+    @staticmethod
+    def record(tracer, stamp, trace):
+        """
+        Record the "filter" and "inference" spans of a stamp.
+
+        :param tracer: Tracer
+        :param stamp: BatchStamp, None to record nothing
+        :param trace: int, trace id of the prediction
+        """
+        if stamp is None:
+            return
+        if stamp.sample >= 0:
+            tracer.record("filter", stamp.sample, stamp.filter_end, trace)
+        tracer.record("inference", stamp.inference_start, stamp.inference_end, trace)
+
+
+class Tracer:
+    def __init__(self, name, capacity=1 << 16, enabled=True, ctx=None):
+        """
+        Ring buffer of timed spans, cheap enough to stay enabled (about a microsecond per span).
+
+        Spans are timed with time.monotonic_ns, the same clock in every process, so the spans of several
+        processes can be put on one timeline. A span carries a trace id (the PredictionSlot sequence number of the
+        prediction, -1 if unknown) to follow a prediction from process to process.
+
+        The buffer is in shared memory (like PredictionSlot): a tracer created before starting a process can be
+        written by that process and saved by its parent. Slots are reserved with an itertools.count, so the
+        threads of one process can record without a lock, but a tracer must be written by a single process.
+        When the buffer is full the oldest spans are overwritten.
+
+        >>> tracer = Tracer("controller")
+        >>> with tracer.span("controller", trace=prediction.seq):
+        ...     hand.send_gesture(gesture)
+        >>> tracer.save(TRACE_FOLDER)
+
+        :param name: str, name of the tracer (process) in the exported traces
+        :param capacity: int, number of spans kept
+        :param enabled: bool, record the spans, a disabled tracer costs a function call
+        :param ctx: multiprocessing context, default context if None
+        """
+        ctx = multiprocessing if ctx is None else ctx
+        self.name = name
+        self.capacity = capacity
+        self.enabled = enabled
+        self.current = -1
+        self.raw = ctx.RawArray(ctypes.c_int64, 1 + capacity * 4)
+        self._views()
+
+    def _views(self):
+        ints = np.frombuffer(self.raw, dtype=np.int64)
+        self.head = ints[:1]
+        self.rows = ints[1:].reshape(self.capacity, 4)
+        self.slots = itertools.count(int(self.head[0]))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["head"], state["rows"], state["slots"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views()
+
+    def record(self, stage, start, end, trace=-1):
+        """
+        Add a span.
+
+        :param stage: str | int, stage name (STAGES) or index
+        :param start: int, time.monotonic_ns() at the start of the span
+        :param end: int, time.monotonic_ns() at the end of the span
+        :param trace: int, trace id, -1 if unknown
+        """
+        if not self.enabled:
+            return
+        if isinstance(stage, str):
+            stage = STAGE_IDS[stage]
+        i = next(self.slots)
+        self.rows[i % self.capacity] = (stage, start, end, trace)
+        self.head[0] = i + 1
+
+    def span(self, stage, trace=-1):
+        """
+        Context manager recording the time spent in its block.
+
+        :param stage: str, stage name (STAGES)
+        :param trace: int, trace id, -1 if unknown
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, STAGE_IDS[stage], trace)
+
+    def spans(self):
+        """
+        :return: np.ndarray of shape (n_spans, 4), stage, start, end, trace id of the recorded spans, oldest first
+        """
+        n = int(self.head[0])
+        if n <= self.capacity:
+            return self.rows[:n].copy()
+        return np.roll(self.rows, -(n % self.capacity), axis=0).copy()
+
+    def chrome_events(self, pid=None):
+        """
+        :param pid: int, process id of the events, the current process if None
+        :return: list, spans as Chrome trace complete events ("ph": "X", times in microseconds)
+        """
+        pid = os.getpid() if pid is None else pid
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": self.name}}]
+        for stage, start, end, trace in self.spans().tolist():
+            events.append({"name": STAGES[stage], "ph": "X", "pid": pid, "tid": stage, "ts": start / 1e3,
+                           "dur": (end - start) / 1e3, "args": {"trace": trace}})
+        return events
+
+    def save(self, folder):
+        """
+        Export the spans as a Chrome trace JSON file (chrome://tracing, https://ui.perfetto.dev).
+
+        :param folder: str, destination folder, the file is named after the tracer and the process id
+        :return: str, path of the file
+        """
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{self.name}-{os.getpid()}.json")
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.chrome_events(), "displayTimeUnit": "ms"}, f)
+        return path
+
+
+_tracer = None
+_tracer_pid = None
+
+def get_tracer(name=None) -> Tracer:
+    """
+    Tracer of the current process, created on the first call (a forked process gets its own).
+    Enabled if config.TRACING is True.
+
+    :param name: str, name of the tracer, the process name if None
+    """
+    global _tracer, _tracer_pid
+    if _tracer is None or _tracer_pid != os.getpid():
+        from config import TRACING
+        _tracer = Tracer(name or multiprocessing.current_process().name, enabled=TRACING)
+        _tracer_pid = os.getpid()
+    return _tracer
+
+
+### ANALYSIS ###
+
+def load_events(paths):
+    """
+    :param paths: list of str, Chrome trace JSON files saved by Tracer.save
+    :return: list, complete events of every file
+    """
+    events = []
+    for path in paths:
+        with open(path, "r") as f:
+            events += [e for e in json.load(f)["traceEvents"] if e["ph"] == "X"]
+    return events
+
+def summarize(events, percentiles=(50, 95, 99)):
+    """
+    Per stage duration and end to end latency percentiles.
+    The end to end latency of a trace id is from the start of its first span to the end of its last one: from its
+    samples (the "filter" span, see BatchClock) to the hand when the whole pipeline is traced.
+
+    :param events: list, Chrome trace complete events
+    :param percentiles: tuple, percentiles to compute
+    :return: dict, {stage or "end_to_end": {"count": int, "p50": ms, ...}}
+    """
+    durations = {}
+    traces = {}
+    for e in events:
+        durations.setdefault(e["name"], []).append(e["dur"] / 1e3)
+        trace = e["args"].get("trace", -1)
+        if trace >= 0:
+            start, end = traces.get(trace, (np.inf, -np.inf))
+            traces[trace] = (min(start, e["ts"]), max(end, e["ts"] + e["dur"]))
+    if traces:
+        durations["end_to_end"] = [(end - start) / 1e3 for start, end in traces.values()]
+
+    summary = {}
+    for stage in [s for s in STAGES if s in durations] + [s for s in durations if s not in STAGES]:
+        values = np.array(durations[stage])
+        summary[stage] = {"count": len(values), **{f"p{p}": float(np.percentile(values, p)) for p in percentiles}}
+    return summary
+
+def print_summary(summary):
+    columns = [c for c in next(iter(summary.values()), {}) if c != "count"]
+    print(f"{'stage':12s} {'count':>7s}" + "".join(f"{c:>10s}" for c in columns))
+    for stage, stats in summary.items():
+        print(f"{stage:12s} {stats['count']:7d}" + "".join(f"{stats[c]:8.3f}ms" for c in columns))
+
+def merge(paths, output):
+    """
+    Merge the Chrome traces of several processes in one file.
+    """
+    events = []
+    for path in paths:
+        with open(path, "r") as f:
+            events += json.load(f)["traceEvents"]
+    with open(output, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+if __name__ == "__main__":
+    # python -m utils.tracing [trace folder]: merge the traces of a run and print the latency summary
+    from config import TRACE_FOLDER
+    folder = sys.argv[1] if len(sys.argv) > 1 else TRACE_FOLDER
+    paths = sorted(p for p in glob.glob(os.path.join(folder, "*.json")) if not p.endswith("merged.json"))
+    merge(paths, os.path.join(folder, "merged.json"))
+    print_summary(summarize(load_events(paths)))
+    print(f"Chrome trace: {os.path.join(folder, 'merged.json')}")
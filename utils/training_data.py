@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import hashlib
+import multiprocessing
+import numpy as np
+
+from utils.recording import Recording, CSV_PATTERN, dataset_files
+from utils.stream_filter import StreamFilter
+from utils.windowing import get_mav, hash_files, FeatureCache
+
+### MULTI-SESSION TRAINING DATA ###
+#
+# Every recording segment or CSV file of every session is a job: it is loaded, filtered and windowed (MAV) by a
+# worker of a process pool, which writes its windows straight into a preallocated .npy file at the job offset.
+# Window counts are known beforehand (recording header, or the rows counted while hashing the CSV files),
+# so the parent only allocates the output and fills the metadata. The output is a memory-mapped FeatureCache entry.
+
+
+def find_sessions(base_path: str) -> list[str]:
+    """
+    :param base_path: str, folder containing the session folders (D0, D1, ...)
+    :return: list of the session folders holding a recording or CSV files, D2 before D10
+    """
+    def natural(name):
+        return [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", name)]
+
+    sessions = []
+    for name in sorted(os.listdir(base_path), key=natural):
+        folder = os.path.join(base_path, name)
+        if os.path.isdir(folder) and dataset_files(folder):
+            sessions.append(folder)
+    return sessions
+
+
+def inspect_file(path: str) -> tuple[str, int, int]:
+    """
+    One read of a dataset file.
+
+    :param path: str, recording or CSV file
+    :return: tuple, sha1 of the file (see windowing.hash_files), number of CSV rows and columns (0, 0 for a
+        recording, its header has them)
+    """
+    if not CSV_PATTERN.search(path):
+        return hash_files([path]), 0, 0
+    sha = hashlib.sha1(os.path.basename(path).encode())
+    rows, columns, last = 0, 0, b"\n"
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+            if not columns:
+                columns = chunk.split(b"\n", 1)[0].count(b",") + 1
+            rows += chunk.count(b"\n")
+            last = chunk[-1:]
+    return sha.hexdigest(), rows + (last != b"\n"), columns
+
+
+# Per worker process: output files opened and filters designed by the previous jobs
+_outputs = {}
+_filters = {}
+
+def _window_job(job):
+    """Load, filter and window one file or segment in a worker, the windows are written to the shared output."""
+    output, offset, path, segment, settings = job
+    if segment >= 0:
+        data = Recording(path).segment(segment)
+    else:
+        data = np.loadtxt(path, delimiter=",", ndmin=2)
+    key = json.dumps([settings["sampling"], settings["filters"], data.shape[1]])
+    if key not in _filters:
+        _filters[key] = StreamFilter(settings["sampling"], data.shape[1])
+        for f in settings["filters"]:
+            _filters[key].install_filters(f)
+    fi = _filters[key]
+    fi.reset()
+    features = get_mav(fi.filter(data), settings["window_size"], settings["window_increment"])
+    if output not in _outputs:
+        _outputs[output] = np.load(output, mmap_mode="r+")
+    _outputs[output][offset:offset + len(features)] = features
+    return len(features)
+
+
+def load_sessions(folders: list[str], window_size: int, window_increment: int, sampling: float | None = None,
+                  filters: list | None = None, classes: list | None = None, reps: list | None = None,
+                  cache_folder: str = ".cache/", workers: int | None = None) -> tuple[np.ndarray, dict]:
+    """
+    Filtered MAV features of several sessions, computed in a process pool. Same features as
+    `parse_mav(odh, ...)` after `StreamFilter.filter(odh)` for each session, sessions are concatenated.
+
+    The features are stored in a FeatureCache in `cache_folder` and returned memory-mapped, they are reused until
+    the dataset files or the parameters change.
+
+    :param folders: list of session folders (see find_sessions)
+    :param window_size: int, number of samples in a window
+    :param window_increment: int, number of samples between two windows
+    :param sampling: float, sampling frequency in Hz, only needed for notch and band filters
+    :param filters: list of StreamFilter filter dictionaries
+    :param classes: list of class indices to keep, None for all
+    :param reps: list of rep indices to keep, None for all
+    :param cache_folder: str, FeatureCache folder of the output
+    :param workers: int, number of worker processes, os.cpu_count() if None
+    :return: features of shape (n_windows, n_channels) and the windows metadata dictionary ("classes", "reps",
+        "sessions": index of the session in `folders`)
+    """
+    filters = list(filters or [])
+    classes = None if classes is None else [int(c) for c in classes]
+    reps = None if reps is None else [int(r) for r in reps]
+    settings = {"sampling": sampling, "filters": filters, "window_size": window_size,
+                "window_increment": window_increment}
+
+    # Jobs: (session, path, segment, class, rep, n_samples, n_channels), segment -1 for a CSV file
+    files = [(s, path) for s, folder in enumerate(folders) for path in dataset_files(folder)]
+    ctx = multiprocessing.get_context()
+    with ctx.Pool(workers) as pool:
+        inspected = pool.map(inspect_file, [path for _, path in files])
+
+        jobs = []
+        for (session, path), (_, rows, columns) in zip(files, inspected):
+            match = CSV_PATTERN.search(path)
+            if match:
+                jobs.append((session, path, -1, int(match.group(1)), int(match.group(2)), rows, columns))
+                continue
+            recording = Recording(path)
+            for i, seg in enumerate(recording.segments):
+                jobs.append((session, path, i, seg["class"], seg["rep"], seg["stop"] - seg["start"],
+                             recording.header["n_channels"]))
+        jobs = [j for j in jobs if (classes is None or j[3] in classes) and (reps is None or j[4] in reps)]
+        if not jobs:
+            raise FileNotFoundError(f"No recording or CSV file found in {folders}")
+        if len({j[6] for j in jobs}) > 1:
+            raise ValueError(f"Sessions have different numbers of channels: {sorted({j[6] for j in jobs})}")
+
+        cache = FeatureCache(cache_folder)
+        key = cache.key([path for _, path in files], [h for h, _, _ in inspected], classes=classes, reps=reps,
+                        **settings)
+        n_windows = np.array([max(0, (j[5] - window_size) // window_increment + 1) for j in jobs])
+        metadata = {
+            "classes": np.repeat([j[3] for j in jobs], n_windows).astype(np.int64),
+            "reps": np.repeat([j[4] for j in jobs], n_windows).astype(np.int64),
+            "sessions": np.repeat([j[0] for j in jobs], n_windows).astype(np.int64),
+        }
+        features = cache.load_memmap(key)
+        if features is not None:
+            return features, metadata
+
+        tmp_path = cache.create_memmap(key, (int(n_windows.sum()), jobs[0][6]))
+        offsets = np.concatenate(([0], np.cumsum(n_windows)[:-1]))
+        # Largest jobs first, so the pool does not end on a long one
+        order = np.argsort(-n_windows, kind="stable")
+        tasks = [(tmp_path, int(offsets[i]), jobs[i][1], jobs[i][2], settings) for i in order]
+        for i, n in zip(order, pool.imap(_window_job, tasks)):
+            if n != n_windows[i]:
+                raise RuntimeError(f"Expected {n_windows[i]} windows from {jobs[i][1]}, got {n}")
+
+    return cache.commit_memmap(key), metadata
@@ -0,0 +1,135 @@
+import os
+import numpy as np
+import torch
+from scipy import signal
+from torch.utils.data import Dataset
+
+from utils.recording import Recording, RECORDING_NAME
+from utils.stream_filter import StreamFilter
+
+# Segment table columns: recording, first sample, last sample (excluded), first window index, class, rep
+RECORDING, START, STOP, OFFSET, CLASS, REP = range(6)
+
+
+def mav(windows: np.ndarray) -> np.ndarray:
+    """
+    :param windows: np.ndarray of shape (n_windows, window_size, n_channels)
+    :return: np.ndarray of shape (n_windows, n_channels), mean absolute value of each window
+    """
+    return np.abs(windows).mean(axis=1)
+
+
+class WindowDataset(Dataset):
+    def __init__(self, sources: list[str], window_size: int, window_increment: int, sampling: float | None = None,
+                 filters: list | None = None, classes: list | None = None, reps: list | None = None,
+                 warmup: float = 0.5, feature=mav):
+        """
+        Training windows computed on demand from memory-mapped binary recordings, so memory stays bounded whatever
+        the length of the recordings: only the samples of the requested windows are read, filtered and turned into
+        features. Windows are indexed like `load_sessions` (segment after segment) and `labels`, `reps` and
+        `sessions` hold their metadata.
+
+        Filtering is causal (StreamFilter). A window is filtered with the `warmup` seconds of samples before it,
+        from the beginning of its segment when it is closer than that, in which case the features are the same as
+        filtering the whole segment. DataLoader batches are loaded with one vectorized filter call
+        (`__getitems__`) and the dataset can be used from DataLoader workers.
+
+        >>> train = WindowDataset(["Datasets/D0/", "Datasets/D1/"], 200, 10, 1010, [NOTCH_FILTER], reps=[0, 1, 2])
+        >>> model.fit(train, num_workers=4)
+
+        :param sources: list of session folders or recording files (convert CSV sessions with
+            `python -m utils.recording <folders>`)
+        :param window_size: int, number of samples in a window
+        :param window_increment: int, number of samples between two windows
+        :param sampling: float, sampling frequency in Hz, only needed for notch and band filters
+        :param filters: list of StreamFilter filter dictionaries
+        :param classes: list of class indices to keep, None for all
+        :param reps: list of rep indices to keep, None for all
+        :param warmup: float, filter warm-up duration in seconds
+        :param feature: callable, (n_windows, window_size, n_channels) windows -> (n_windows, n_features) features
+        """
+        self.paths = []
+        for source in sources:
+            path = os.path.join(source, RECORDING_NAME) if os.path.isdir(source) else source
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No binary recording in {source}, convert it with python -m utils.recording")
+            self.paths.append(path)
+        self.window_size = window_size
+        self.window_increment = window_increment
+        self.feature = feature
+
+        segments = []
+        n_windows = 0
+        for r, path in enumerate(self.paths):
+            for seg in Recording(path).segments:
+                if classes is not None and seg["class"] not in classes or reps is not None and seg["rep"] not in reps:
+                    continue
+                n = max(0, (seg["stop"] - seg["start"] - window_size) // window_increment + 1)
+                if n:
+                    segments.append((r, seg["start"], seg["stop"], n_windows, seg["class"], seg["rep"]))
+                    n_windows += n
+        self.segments = np.array(segments, dtype=np.int64).reshape(-1, 6)
+        self.offsets = np.append(self.segments[:, OFFSET], n_windows)
+        counts = np.diff(self.offsets)
+        self.labels = np.repeat(self.segments[:, CLASS], counts)
+        self.reps = np.repeat(self.segments[:, REP], counts)
+        self.sessions = np.repeat(self.segments[:, RECORDING], counts)
+
+        self.filter = StreamFilter(sampling)
+        for f in filters or []:
+            if f["name"] == "decimate":
+                raise ValueError("Decimation is not supported on training windows")
+            self.filter.install_filters(f)
+        self.warmup = int(round(warmup * sampling)) if filters else 0
+        self._data = {}
+
+    def __getstate__(self):
+        # Recordings are opened again by each DataLoader worker instead of pickling the memory maps
+        state = self.__dict__.copy()
+        state["_data"] = {}
+        return state
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def data(self, recording: int) -> np.ndarray:
+        """
+        :param recording: int, recording index
+        :return: np.ndarray, memory-mapped (n_samples, n_channels) samples
+        """
+        if recording not in self._data:
+            self._data[recording] = Recording(self.paths[recording]).data
+        return self._data[recording]
+
+    def windows(self, indices) -> np.ndarray:
+        """
+        :param indices: list of window indices
+        :return: np.ndarray of shape (n_windows, window_size, n_channels), filtered windows
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        segments = self.segments[np.searchsorted(self.offsets, indices, side="right") - 1]
+        starts = segments[:, START] + (indices - segments[:, OFFSET]) * self.window_increment
+        length = self.warmup + self.window_size
+        chunks = []
+        for segment, start in zip(segments, starts):
+            first = max(segment[START], start - self.warmup)
+            chunk = self.data(segment[RECORDING])[first:start + self.window_size]
+            # Repeating the first sample of a segment leaves the filter in the steady state it starts from
+            chunks.append(np.concatenate((np.repeat(chunk[:1], length - len(chunk), axis=0), chunk)))
+        chunks = np.stack(chunks)
+        if not len(self.filter.sos):
+            return chunks
+        # Same filter as StreamFilter, along the last axis where sosfilt does not copy its input
+        n, _, n_channels = chunks.shape
+        x = np.ascontiguousarray(chunks.transpose(0, 2, 1), dtype=np.float64).reshape(n * n_channels, length)
+        zi = signal.sosfilt_zi(self.filter.sos)[:, None, :] * x[None, :, :1]
+        filtered, _ = signal.sosfilt(self.filter.sos, x, axis=-1, zi=zi)
+        return filtered.reshape(n, n_channels, length)[:, :, self.warmup:].transpose(0, 2, 1)
+
+    def __getitems__(self, indices):
+        x = torch.from_numpy(np.asarray(self.feature(self.windows(indices)), dtype=np.float32))
+        y = torch.from_numpy(self.labels[indices])
+        return list(zip(x, y))
+
+    def __getitem__(self, index):
+        return self.__getitems__([index])[0]
@@ -0,0 +1,182 @@
+import os
+import json
+import hashlib
+import numpy as np
+from numpy.lib.format import open_memmap
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def get_windows(data: np.ndarray, window_size: int, window_increment: int) -> np.ndarray:
+    """
+    Strided view of the windows of a recording, same layout as `libemg.utils.get_windows` without copying.
+
+    :param data: np.ndarray of shape (n_samples, n_channels)
+    :param window_size: int, number of samples in a window
+    :param window_increment: int, number of samples between two windows
+    :return: np.ndarray, read-only view of shape (n_windows, n_channels, window_size)
+    """
+    if len(data) < window_size:
+        return np.zeros((0, data.shape[1], window_size), dtype=data.dtype)
+    return sliding_window_view(data, window_size, axis=0)[::window_increment]
+
+
+def get_mav(data: np.ndarray, window_size: int, window_increment: int) -> np.ndarray:
+    """
+    Mean absolute value of every window in O(n_samples) with a cumulative sum,
+    same result as `FeatureExtractor().getMAVfeat(get_windows(...))`.
+
+    :param data: np.ndarray of shape (n_samples, n_channels)
+    :param window_size: int, number of samples in a window
+    :param window_increment: int, number of samples between two windows
+    :return: np.ndarray of shape (n_windows, n_channels)
+    """
+    n_windows = max(0, (len(data) - window_size) // window_increment + 1)
+    csum = np.zeros((len(data) + 1, data.shape[1]))
+    np.cumsum(np.abs(data), axis=0, out=csum[1:])
+    starts = np.arange(n_windows) * window_increment
+    return (csum[starts + window_size] - csum[starts]) / window_size
+
+
+def get_window_metadata(metadata: np.ndarray, window_size: int, window_increment: int) -> np.ndarray:
+    """
+    Metadata of every window, taken as the mode of the window like `OfflineDataHandler.parse_windows`.
+
+    :param metadata: np.ndarray of shape (n_samples, 1) or (n_samples,)
+    :return: np.ndarray of shape (n_windows,)
+    """
+    metadata = np.asarray(metadata).reshape(-1)
+    n_windows = max(0, (len(metadata) - window_size) // window_increment + 1)
+    if n_windows and np.all(metadata == metadata[0]):
+        return np.full(n_windows, metadata[0])
+    windows = get_windows(metadata[:, None], window_size, window_increment)[:, 0, :].astype(np.int64)
+    return np.array([np.bincount(w).argmax() for w in windows], dtype=np.int64)
+
+
+def parse_mav(odh, window_size: int, window_increment: int) -> tuple[np.ndarray, dict]:
+    """
+    Windowing + MAV of an OfflineDataHandler without materializing the windows,
+    equivalent to `getMAVfeat(odh.parse_windows(window_size, window_increment))`.
+
+    :param odh: OfflineDataHandler
+    :return: features of shape (n_windows, n_channels) and the windows metadata dictionary
+    """
+    features = [get_mav(np.asarray(d), window_size, window_increment) for d in odh.data]
+    metadata = {
+        k: np.concatenate([get_window_metadata(m, window_size, window_increment) for m in getattr(odh, k)])
+        for k in odh.extra_attributes
+    }
+    return np.concatenate(features), metadata
+
+
+def hash_files(paths: list[str], chunk_size: int = 1 << 20) -> str:
+    """
+    :param paths: list of file paths
+    :return: str, sha1 of the files names and contents
+    """
+    sha = hashlib.sha1()
+    for path in sorted(paths):
+        sha.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                sha.update(chunk)
+    return sha.hexdigest()
+
+
+class FeatureCache:
+    def __init__(self, cache_folder: str):
+        """
+        On-disk cache of windowed features, one file per key: a .npz of the features and metadata
+        (`get_or_compute`), or a .npy of the features only, filled in place and returned memory-mapped
+        (`create_memmap`, `commit_memmap` and `load_memmap`) when they do not fit in memory or are written by
+        several processes.
+
+        :param cache_folder: str, folder where the cache files are stored
+
+        Example:
+        >>> cache = FeatureCache("./Datasets/D0/.cache/")
+        >>> key = cache.key(files=dataset_files, window_size=200, window_increment=10)
+        >>> features, metadata = cache.get_or_compute(key, lambda: parse_mav(odh, 200, 10))
+        """
+        self.cache_folder = cache_folder
+
+    @staticmethod
+    def key(files: list[str], file_hashes: list[str] | None = None, **params) -> str:
+        """
+        :param files: list of the dataset files the features are computed from, in the order they are used
+        :param file_hashes: list, `hash_files([path])` of each file if the caller already has them, None to hash them
+        :param params: JSON serializable parameters of the computation (filters, windowing...)
+        :return: str, cache key
+        """
+        if file_hashes is None:
+            file_hashes = [hash_files([path]) for path in files]
+        sha = hashlib.sha1(json.dumps(list(file_hashes)).encode())
+        sha.update(json.dumps(params, sort_keys=True).encode())
+        return sha.hexdigest()[:16]
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_folder, f"features_{key}.npz")
+
+    def npy_path(self, key: str) -> str:
+        return os.path.join(self.cache_folder, f"features_{key}.npy")
+
+    def load(self, key: str) -> tuple[np.ndarray, dict] | None:
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as f:
+            features = f["features"]
+            metadata = {k[len("meta_"):]: f[k] for k in f.files if k.startswith("meta_")}
+        return features, metadata
+
+    def save(self, key: str, features: np.ndarray, metadata: dict):
+        os.makedirs(self.cache_folder, exist_ok=True)
+        tmp_path = self.path(key) + ".tmp.npz"
+        np.savez(tmp_path, features=features, **{f"meta_{k}": v for k, v in metadata.items()})
+        os.replace(tmp_path, self.path(key))
+
+    def get_or_compute(self, key: str, compute) -> tuple[np.ndarray, dict]:
+        """
+        :param key: str, cache key from `FeatureCache.key`
+        :param compute: callable returning (features, metadata) on a cache miss
+        :return: features and metadata dictionary
+        """
+        cached = self.load(key)
+        if cached is not None:
+            return cached
+        features, metadata = compute()
+        self.save(key, features, metadata)
+        return features, metadata
+
+    def load_memmap(self, key: str) -> np.ndarray | None:
+        """
+        :param key: str, cache key from `FeatureCache.key`
+        :return: np.ndarray, read-only memory-mapped features committed by `commit_memmap`, None if missing
+        """
+        path = self.npy_path(key)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode="r")
+
+    def create_memmap(self, key: str, shape: tuple, dtype=np.float64) -> str:
+        """
+        Preallocate the features of a key, to be filled in place (`np.load(path, mmap_mode="r+")`, from any process).
+        `load_memmap` does not see them before `commit_memmap`.
+
+        :param key: str, cache key from `FeatureCache.key`
+        :param shape: tuple, (n_windows, n_channels)
+        :param dtype: features type
+        :return: str, path of the file to fill
+        """
+        os.makedirs(self.cache_folder, exist_ok=True)
+        tmp_path = self.npy_path(key)[:-len(".npy")] + ".tmp.npy"
+        open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape).flush()
+        return tmp_path
+
+    def commit_memmap(self, key: str) -> np.ndarray:
+        """
+        :param key: str, cache key of a filled `create_memmap` file
+        :return: np.ndarray, the committed features, memory-mapped read-only
+        """
+        tmp_path = self.npy_path(key)[:-len(".npy")] + ".tmp.npy"
+        os.replace(tmp_path, self.npy_path(key))
+        return self.load_memmap(key)
@@ -17,9 +17,10 @@ class RealTimeGestureUi(QWidget):
 
         self.images_path = images
 
-        # Get the gestures dictionary
-        self.images_folder = gjutils.get_images_folder(self.images_path)
-        self.gestures_dict = gjutils.get_gestures_dict(self.images_folder)
+        # Get the gestures dictionary and the label <-> index lookups
+        self.catalog = gjutils.GestureCatalog(self.images_path)
+        self.images_folder = self.catalog.folder
+        self.gestures_dict = self.catalog.gestures_dict
 
         self.images_name = ""
         self.img_label = 1
@@ -59,8 +60,8 @@ class RealTimeGestureUi(QWidget):
 
     def update_label(self, label:int):
         # Get images path and index
-        self.images_name = self.gestures_dict[str(label)]
-        self.img_index = gjutils.get_index_from_label(label, self.images_path, self.gestures_dict)
+        self.images_name = self.catalog.name_of(label)
+        self.img_index = self.catalog.index_of(label)
         if self.img_index is None:
             self.img_index = 0
             return
@@ -70,9 +71,9 @@ class RealTimeGestureUi(QWidget):
     def update_index(self, index:int):
         # Get images path and index
         self.img_index = index
-        if self.gestures_dict is not None:
-            self.img_label = gjutils.get_label_from_index(index, self.images_path, self.gestures_dict)
-            self.images_name = self.gestures_dict[str(self.img_label)]
+        if self.gestures_dict:
+            self.img_label = self.catalog.label_of(index)
+            self.images_name = self.catalog.name_of(self.img_label)
         else:
             self.images_name = self.images_path[index].split("/")[-1].split(".")[0]
         if self.img_label is None: